@@ -13,25 +13,44 @@ def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
     
+    # Logging and metrics
+    from app.utils import metrics
+    from app.utils.log import configure_logging
+    configure_logging(app.config['LOG_LEVEL'], app.config['LOG_FORMAT'])
+    metrics.set_enabled(app.config['METRICS_ENABLED'])
+    
     # Initialize extensions
+    from app.utils.database import engine_options, is_sqlite, tune_sqlite
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
     db.init_app(app)
+    if is_sqlite(app.config['SQLALCHEMY_DATABASE_URI']):
+        with app.app_context():
+            tune_sqlite(db.engine, app.config['SQLITE_WAL'], app.config['SQLITE_BUSY_TIMEOUT_MS'])
     migrate.init_app(app, db)
     jwt.init_app(app)
     CORS(app, resources={r"/api/*": {
-        "origins": ["http://localhost:5173", "http://localhost:5174"],
+        "origins": app.config['CORS_ORIGINS'],
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
         "allow_headers": ["Content-Type", "Authorization"]
     }}, supports_credentials=True)
     
+    # Shared per-process services (heavy state loads lazily, after fork)
+    from app.services.rag_service import RAGService
+    from app.services.llm_manager import LLMManager
+    RAGService(app)
+    LLMManager(app)
+    
     # Register blueprints
     from app.routes.auth import auth_bp
     from app.routes.admin import admin_bp
     from app.routes.staff import staff_bp
     from app.routes.student import student_bp
+    from app.routes.monitoring import monitoring_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(admin_bp, url_prefix='/api/admin')
     app.register_blueprint(staff_bp, url_prefix='/api/staff')
     app.register_blueprint(student_bp, url_prefix='/api/student')
+    app.register_blueprint(monitoring_bp, url_prefix='/api')
     
     return app
@@ -0,0 +1,202 @@
+"""ASGI application with a non-blocking chat path.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 2
+
+``POST /api/student/chat/<id>/message`` is served as a coroutine: intent
+classification and generation are awaited over non-blocking HTTP and wait for
+an LLM slot on the event loop, so a conversation no longer pins a thread for
+the whole generation. The blocking steps (database, embedding, Chroma) run on
+a bounded thread pool (``ASGI_EXECUTOR_WORKERS``), each in its own app context.
+One process can then hold hundreds of open conversations; how many generate
+at once is still ``LLM_MAX_CONCURRENCY``.
+
+Request checks (JWT, role, rate limit, session) and the database steps are
+the Flask route's own (``student.open_chat``, ``app.services.chat_service``).
+
+Every other route goes to the Flask app through ``a2wsgi``'s WSGI adapter.
+"""
+import asyncio
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+from flask import Flask
+from app.services import chat_service
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+CHAT_MESSAGE_PATH = re.compile(r'^/api/student/chat/(\d+)/message$')
+
+
+class Reply(Exception):
+    """Ends a chat request early with a JSON response"""
+
+    def __init__(self, status: int, body: Dict, headers: Dict = None):
+        super().__init__(status)
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+
+def _wsgi_adapter(flask_app: Flask, workers: int):
+    from a2wsgi import WSGIMiddleware
+    return WSGIMiddleware(flask_app, workers=workers)
+
+
+class AsyncChatApp:
+    def __init__(self, flask_app: Flask):
+        self.flask_app = flask_app
+        self.manager = flask_app.extensions['llm_manager']
+        workers = flask_app.config['ASGI_EXECUTOR_WORKERS']
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix='asgi-chat')
+        self.wsgi = _wsgi_adapter(flask_app, workers)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        match = CHAT_MESSAGE_PATH.match(scope.get('path', '')) if scope['type'] == 'http' else None
+        if match and scope['method'] == 'POST':
+            return await self._chat(scope, receive, send, int(match.group(1)))
+        await self.wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                from app.services import warmup
+                warmup.start_warmup(self.flask_app)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.manager.aclose()
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _in_context(self, fn, *args):
+        with self.flask_app.app_context():
+            return fn(*args)
+
+    async def _run(self, fn, *args):
+        """Run blocking ``fn`` on the executor inside a fresh app context"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self._in_context, fn, *args)
+
+    async def _chat(self, scope, receive, send, session_id: int):
+        start = time.perf_counter()
+        headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope.get('headers', [])}
+        try:
+            body = await self._read_body(receive)
+            status, payload, extra = 200, await self._send_message(session_id, headers, body), {}
+        except Reply as r:
+            status, payload, extra = r.status, r.body, r.headers
+        except Exception as e:
+            from app.services.llm_scheduler import SchedulerTimeout
+            if isinstance(e, SchedulerTimeout):
+                logger.warning("LLM queue timeout", extra={'session_id': session_id})
+                status, payload, extra = 503, {'error': str(e)}, {'Retry-After': '30'}
+            else:
+                logger.exception("failed to generate response", extra={'session_id': session_id})
+                status, payload, extra = 500, {'error': f'Failed to generate response: {str(e)}'}, {}
+
+        response_headers = {'content-type': 'application/json', **{k.lower(): v for k, v in extra.items()}}
+        origin = headers.get('origin')
+        if origin and origin in self.flask_app.config['CORS_ORIGINS']:
+            response_headers.update({'access-control-allow-origin': origin,
+                                     'access-control-allow-credentials': 'true', 'vary': 'Origin'})
+        data = self.flask_app.json.dumps(payload).encode()
+        response_headers['content-length'] = str(len(data))
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(k.encode('latin-1'), v.encode('latin-1')) for k, v in response_headers.items()]})
+        await send({'type': 'http.response.body', 'body': data})
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint='student.send_message',
+                                        method='POST', status=status)
+
+    async def _read_body(self, receive) -> bytes:
+        body, more = b'', True
+        while more:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            body += message.get('body', b'')
+            more = message.get('more_body', False)
+            if len(body) > self.flask_app.config['MAX_CONTENT_LENGTH']:
+                raise Reply(413, {'error': 'Request too large'})
+        return body
+
+    async def _send_message(self, session_id: int, headers: Dict, body: bytes) -> Dict:
+        """Same pipeline as ``student.send_message``, with the LLM calls awaited"""
+        chat = await self._run(self._open_chat, session_id, headers, body)
+        if 'reply' in chat:
+            return chat['reply']
+        try:
+            return await self._answer(chat)
+        except Reply:
+            raise
+        except Exception:
+            await self._run(chat_service.save_question, chat)
+            raise
+
+    async def _answer(self, chat: Dict) -> Dict:
+        session_id, user_id, message = chat['session_id'], chat['user_id'], chat['message']
+        with metrics.span('classify'):
+            intent = await self.manager.aclassify_intent(message, chat['subject_name'], requester=user_id,
+                                                         settings=chat['llm_settings'])
+        logger.debug("intent classified", extra={'session_id': session_id, 'intent': intent})
+
+        context = []
+        if intent == 'SUBJECT_SPECIFIC':
+            context = await self._run(chat_service.retrieve_context, chat)
+            prompt_query = message
+        elif intent == 'GENERAL_CONVERSATION':
+            prompt_query = chat_service.general_conversation_prompt(message)
+        else:  # OFF_TOPIC
+            await self._run(chat_service.save_messages, chat)
+            return chat_service.off_topic_reply(chat['subject_name'], session_id)
+
+        llm_model = chat['llm_model']
+        if not llm_model:
+            logger.error("no active LLM models found")
+            await self._run(chat_service.save_messages, chat)
+            raise Reply(500, {'error': 'No active LLM models found'})
+
+        with metrics.span('generate'):
+            response = await self.manager.agenerate_response(
+                provider=llm_model['provider'],
+                model_identifier=llm_model['model_identifier'],
+                context=context,
+                query=prompt_query,
+                learning_level=chat['learning_level'],
+                requester=user_id,
+                subject_name=chat['subject_name'],
+                settings=chat['llm_settings']
+            )
+
+        saved = await self._run(chat_service.save_answer, chat, response, context)
+        return {'message': saved, 'context_used': len(context)}
+
+    def _open_chat(self, session_id: int, headers: Dict, body: bytes) -> Dict:
+        """``student.open_chat`` (JWT, role, rate limit, session checks) in a request context of its own"""
+        from app.routes.student import open_chat
+
+        with self.flask_app.test_request_context(
+                f"/api/student/chat/{session_id}/message", method='POST', data=body,
+                headers={k: v for k, v in headers.items() if k in ('authorization', 'content-type')}):
+            try:
+                rv = open_chat(session_id)
+            except Exception as e:
+                # JWT errors get the app's own responses (flask_jwt_extended's handlers)
+                rv = self.flask_app.handle_user_exception(e)
+            if isinstance(rv, dict):
+                return rv
+            response = self.flask_app.make_response(rv)
+            raise Reply(response.status_code, response.get_json(silent=True) or {'error': response.status},
+                        {k: v for k, v in response.headers.items()
+                         if k.lower() not in ('content-type', 'content-length')})
+
+
+def create_asgi_app(flask_app: Flask = None) -> AsyncChatApp:
+    if flask_app is None:
+        from app import create_app
+        flask_app = create_app()
+    return AsyncChatApp(flask_app)
@@ -12,10 +12,27 @@ class Config:
         f"sqlite:///{os.path.join(BASE_DIR, 'instance', 'dev.db')}"
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Connection pool per process for server databases (PostgreSQL); keep
+    # DB_POOL_SIZE + DB_MAX_OVERFLOW times the worker count under max_connections
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+    # SQLite: WAL journaling with synchronous=NORMAL, and how long a writer
+    # waits for the lock before "database is locked"
+    SQLITE_WAL = os.getenv('SQLITE_WAL', 'true').lower() == 'true'
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
     
     # JWT
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'dev-secret-key-change-in-production')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
+
+    # Browser origins allowed to call /api/* (comma-separated)
+    CORS_ORIGINS = [o.strip() for o in os.getenv(
+        'CORS_ORIGINS', 'http://localhost:5173,http://localhost:5174').split(',') if o.strip()]
+
+    # Authorization cache (department memberships / subject ownership), seconds
+    ACCESS_CACHE_TTL = int(os.getenv('ACCESS_CACHE_TTL', 300))
     
     # File Upload - Force absolute path relative to BASE_DIR
     env_upload = os.getenv('UPLOAD_FOLDER', 'uploads')
@@ -37,15 +54,104 @@ class Config:
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
     ANTHROPIC_API_KEY = os.getenv('ANTHROPIC_API_KEY')
     OLLAMA_BASE_URL = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
+    # Comma-separated Ollama servers to spread calls over (default: OLLAMA_BASE_URL).
+    # Raise LLM_MAX_CONCURRENCY to the sum of their OLLAMA_NUM_PARALLEL.
+    OLLAMA_HOSTS = [h.strip() for h in os.getenv('OLLAMA_HOSTS', '').split(',') if h.strip()] or [OLLAMA_BASE_URL]
+    OLLAMA_HEALTH_INTERVAL = float(os.getenv('OLLAMA_HEALTH_INTERVAL', 15))
+    # A host without the model loaded counts as this many extra in-flight calls
+    OLLAMA_COLD_PENALTY = float(os.getenv('OLLAMA_COLD_PENALTY', 2))
+    # How long Ollama keeps a model (and its cached prompt prefix) loaded after a call
+    OLLAMA_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '30m')
     
     # Embedding Model - Force absolute path relative to BASE_DIR
     EMBEDDING_MODEL = os.path.abspath(os.path.join(BASE_DIR, 'models', 'all-MiniLM-L6-v2'))
+    # 'torch' (sentence-transformers), 'onnx' or 'onnx-int8' (ONNX Runtime export
+    # produced by `python download_model.py --onnx`)
+    EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'torch')
+    EMBEDDING_ONNX_DIR = os.path.join(EMBEDDING_MODEL, 'onnx')
+    EMBEDDING_ONNX_THREADS = int(os.getenv('EMBEDDING_ONNX_THREADS', 0))  # 0 = onnxruntime default
+
+    # Optional shared embedding server (app/services/embedding_server.py).
+    # e.g. http://127.0.0.1:8765 or unix:///tmp/edu_embed.sock; unset = load in-process
+    EMBEDDING_SERVICE_URL = os.getenv('EMBEDDING_SERVICE_URL')
+    EMBEDDING_SERVICE_TIMEOUT = float(os.getenv('EMBEDDING_SERVICE_TIMEOUT', 30))
+    EMBEDDING_BATCH_WINDOW_MS = float(os.getenv('EMBEDDING_BATCH_WINDOW_MS', 5))
+    EMBEDDING_MAX_BATCH = int(os.getenv('EMBEDDING_MAX_BATCH', 64))
     
+    # Observability
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')  # 'text' (key=value) or 'json'
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+
+    # Per-user rate limits ("<count>/<second|minute|hour|day>", token bucket).
+    # Buckets are per process unless RATE_LIMIT_STORAGE_URL points at Redis.
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    RATE_LIMIT_CHAT = os.getenv('RATE_LIMIT_CHAT', '10/minute')
+    RATE_LIMIT_STORAGE_URL = os.getenv('RATE_LIMIT_STORAGE_URL')  # e.g. redis://localhost:6379/0
+
+    # LLM calls in flight per process (match Ollama's OLLAMA_NUM_PARALLEL); the
+    # rest queue by tier (classify > interactive > batch), fairly per student
+    LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 4))
+    LLM_QUEUE_TIMEOUT = float(os.getenv('LLM_QUEUE_TIMEOUT', 120))
+    LLM_CLASSIFY_QUEUE_TIMEOUT = float(os.getenv('LLM_CLASSIFY_QUEUE_TIMEOUT', 5))
+    LLM_BATCH_MAX_CONCURRENCY = int(os.getenv('LLM_BATCH_MAX_CONCURRENCY', max(1, LLM_MAX_CONCURRENCY // 2)))
+
+    # Used when an LLMModel row leaves max_tokens/temperature unset, and for
+    # models without a row (fallbacks, classification)
+    LLM_DEFAULT_MAX_TOKENS = int(os.getenv('LLM_DEFAULT_MAX_TOKENS', 1500))
+    LLM_DEFAULT_TEMPERATURE = float(os.getenv('LLM_DEFAULT_TEMPERATURE', 0.7))
+    # Active LLMModel rows are cached per process; admin changes invalidate the
+    # cache of the worker that handled them, others refresh within this TTL
+    MODEL_REGISTRY_TTL = int(os.getenv('MODEL_REGISTRY_TTL', 60))
+
+    # 'primary': answer with the session's model (Ollama only as failure fallback).
+    # 'local_first': answer with LLM_LOCAL_MODEL on Ollama and escalate to the
+    # session's cloud model only when the local answer looks unreliable
+    LLM_ROUTING_MODE = os.getenv('LLM_ROUTING_MODE', 'primary')
+    LLM_LOCAL_MODEL = os.getenv('LLM_LOCAL_MODEL', 'llama3.2')
+    LLM_LOCAL_MIN_ANSWER_CHARS = int(os.getenv('LLM_LOCAL_MIN_ANSWER_CHARS', 120))
+    # Escalate when the closest retrieved chunk is further than this (Chroma L2
+    # distance; 1.0 is cosine similarity 0.5 for normalized embeddings)
+    LLM_ESCALATE_DISTANCE = float(os.getenv('LLM_ESCALATE_DISTANCE', 1.0))
+
+    # Pre-generated FAQ answers (POST /api/staff/subjects/<id>/faqs/build)
+    FAQ_MATCH_THRESHOLD = float(os.getenv('FAQ_MATCH_THRESHOLD', 0.9))  # cosine to a cluster centroid
+    FAQ_CLUSTERS = int(os.getenv('FAQ_CLUSTERS', 50))
+    FAQ_TOP_CLUSTERS = int(os.getenv('FAQ_TOP_CLUSTERS', 20))
+    FAQ_MIN_CLUSTER_SIZE = int(os.getenv('FAQ_MIN_CLUSTER_SIZE', 3))
+    FAQ_MAX_QUESTIONS = int(os.getenv('FAQ_MAX_QUESTIONS', 5000))
+    FAQ_CACHE_TTL = int(os.getenv('FAQ_CACHE_TTL', 300))
+
+    # ASGI entry point (asgi.py): threads for the blocking parts of async chat
+    # requests (database, embedding, Chroma); LLM calls wait on the event loop
+    ASGI_EXECUTOR_WORKERS = int(os.getenv('ASGI_EXECUTOR_WORKERS', 16))
+
+    # Warm-up: load the embedding model and open the N busiest subject collections
+    # in the background when a worker starts; /api/health is 503 until done
+    WARMUP_ON_STARTUP = os.getenv('WARMUP_ON_STARTUP', 'true').lower() == 'true'
+    WARMUP_COLLECTIONS = int(os.getenv('WARMUP_COLLECTIONS', 10))
+    # After a failed warm-up the next request (e.g. a health probe) retries it,
+    # waiting this long after the first failure and twice as long after each next one
+    WARMUP_RETRY_SECONDS = float(os.getenv('WARMUP_RETRY_SECONDS', 5))
+
     # RAG Configuration
     CHUNK_SIZE = 1000
     CHUNK_OVERLAP = 200
     TOP_K_RETRIEVAL = 5
 
+    # Bulk ingestion (POST /api/staff/subjects/<id>/upload/bulk)
+    INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', min(4, os.cpu_count() or 1)))
+    BULK_UPLOAD_MAX_FILES = int(os.getenv('BULK_UPLOAD_MAX_FILES', 200))
+    BULK_UPLOAD_MAX_BYTES = int(os.getenv('BULK_UPLOAD_MAX_BYTES', 1024 * 1024 * 1024))  # extracted ZIP size
+
+    # Resumable uploads (POST /api/staff/subjects/<id>/uploads); parts must fit MAX_CONTENT_LENGTH
+    UPLOAD_PART_SIZE = int(os.getenv('UPLOAD_PART_SIZE', 8 * 1024 * 1024))
+    UPLOAD_MAX_FILE_SIZE = int(os.getenv('UPLOAD_MAX_FILE_SIZE', 2 * 1024 * 1024 * 1024))
+    UPLOAD_SESSION_TTL = int(os.getenv('UPLOAD_SESSION_TTL', 24 * 3600))  # seconds
+
+    # `flask reindex` progress, used by --resume
+    REINDEX_CHECKPOINT = os.getenv('REINDEX_CHECKPOINT', os.path.join(BASE_DIR, 'instance', 'reindex_checkpoint.json'))
+
     # Ensure upload and chroma directories exist
     os.makedirs(UPLOAD_FOLDER, exist_ok=True)
     os.makedirs(CHROMA_PERSIST_DIRECTORY, exist_ok=True)
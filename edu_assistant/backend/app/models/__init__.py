@@ -1,6 +1,7 @@
 from app.models.user import User
 from app.models.department import Department, StaffDepartment, StudentDepartment
 from app.models.subject import Subject
-from app.models.document import SubjectDocument
+from app.models.document import SubjectDocument, DocumentChunk
 from app.models.llm import LLMModel
 from app.models.chat import ChatSession, ChatMessage
+from app.models.faq import SubjectFAQ
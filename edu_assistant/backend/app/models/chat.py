@@ -30,6 +30,8 @@ class ChatMessage(db.Model):
     message_type = db.Column(db.String(20)) # user, assistant
     content = db.Column(db.Text, nullable=False)
     retrieved_context = db.Column(db.Text)
+    # Ids of the retrieved chunks (see DocumentChunk), for citations
+    context_chunk_ids = db.Column(db.JSON)
     model_used = db.Column(db.String(100))
     tokens_used = db.Column(db.Integer)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -39,5 +41,6 @@ class ChatMessage(db.Model):
             'id': self.id,
             'type': self.message_type,
             'content': self.content,
+            'chunk_ids': self.context_chunk_ids or [],
             'created_at': self.created_at.isoformat()
         }
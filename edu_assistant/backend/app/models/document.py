@@ -22,3 +22,25 @@ class SubjectDocument(db.Model):
             'is_processed': self.is_processed,
             'upload_date': self.upload_date.isoformat()
         }
+
+class DocumentChunk(db.Model):
+    """Where an indexed chunk came from; rows share ids with the vector store"""
+    __tablename__ = 'document_chunks'
+    
+    id = db.Column(db.String(64), primary_key=True) # doc_<document_id>_<hash of text and position>
+    document_id = db.Column(db.Integer, db.ForeignKey('subject_documents.id'), nullable=False, index=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subjects.id'), index=True)
+    chunk_index = db.Column(db.Integer, nullable=False)
+    page_number = db.Column(db.Integer)
+    heading = db.Column(db.String(255))
+    char_offset = db.Column(db.Integer) # start of the chunk in the page's extracted text
+    
+    def to_dict(self):
+        return {
+            'chunk_id': self.id,
+            'document_id': self.document_id,
+            'chunk_index': self.chunk_index,
+            'page_number': self.page_number,
+            'heading': self.heading,
+            'offset': self.char_offset
+        }
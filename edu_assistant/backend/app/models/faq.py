@@ -0,0 +1,31 @@
+from app import db
+from datetime import datetime
+
+class SubjectFAQ(db.Model):
+    """Pre-generated answer for a cluster of frequently asked questions"""
+    __tablename__ = 'subject_faqs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subjects.id'), nullable=False)
+    learning_level = db.Column(db.String(20), nullable=False) # beginner, intermediate, advanced
+    question = db.Column(db.Text, nullable=False) # representative question of the cluster
+    answer = db.Column(db.Text, nullable=False)
+    # Normalized float32 cluster centroid in the embedding space
+    centroid = db.Column(db.LargeBinary, nullable=False)
+    cluster_size = db.Column(db.Integer)
+    model_used = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (db.Index('ix_subject_faqs_subject_level', 'subject_id', 'learning_level'),)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'subject_id': self.subject_id,
+            'learning_level': self.learning_level,
+            'question': self.question,
+            'answer': self.answer,
+            'cluster_size': self.cluster_size,
+            'model_used': self.model_used,
+            'created_at': self.created_at.isoformat()
+        }
@@ -1,4 +1,5 @@
 from app import db
+from app.config import Config
 from datetime import datetime
 
 class LLMModel(db.Model):
@@ -14,6 +15,14 @@ class LLMModel(db.Model):
     temperature = db.Column(db.Numeric(3,2), default=0.7)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    def generation_settings(self):
+        """Effective per-call limits and endpoint for this model"""
+        return {
+            'max_tokens': self.max_tokens or Config.LLM_DEFAULT_MAX_TOKENS,
+            'temperature': float(self.temperature) if self.temperature is not None else Config.LLM_DEFAULT_TEMPERATURE,
+            'api_endpoint': self.api_endpoint or None
+        }
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -1,4 +1,5 @@
 from app import db
+from app.config import Config
 from datetime import datetime
 
 class Subject(db.Model):
@@ -10,16 +11,37 @@ class Subject(db.Model):
     description = db.Column(db.Text)
     department_id = db.Column(db.Integer, db.ForeignKey('departments.id'))
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    # Per-subject RAG overrides; NULL falls back to Config defaults
+    chunk_size = db.Column(db.Integer)
+    chunk_overlap = db.Column(db.Integer)
+    top_k = db.Column(db.Integer)
+    # Chroma collection chat reads from; reindex points it at a rebuilt one.
+    # NULL means the original subject_<id>
+    collection_name = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     __table_args__ = (db.UniqueConstraint('code', 'department_id'),)
     
+    def active_collection(self) -> str:
+        return self.collection_name or f"subject_{self.id}"
+
+    def rag_settings(self):
+        """Effective chunking/retrieval settings for this subject"""
+        return {
+            'chunk_size': self.chunk_size or Config.CHUNK_SIZE,
+            'chunk_overlap': self.chunk_overlap if self.chunk_overlap is not None else Config.CHUNK_OVERLAP,
+            'top_k': self.top_k or Config.TOP_K_RETRIEVAL
+        }
+    
     def to_dict(self):
         return {
             'id': self.id,
             'name': self.name,
             'code': self.code,
             'description': self.description,
-            'department_id': self.department_id
+            'department_id': self.department_id,
+            'chunk_size': self.chunk_size,
+            'chunk_overlap': self.chunk_overlap,
+            'top_k': self.top_k
         }
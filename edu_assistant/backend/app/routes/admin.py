@@ -3,6 +3,9 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models.user import User
 from app.models.department import Department, StaffDepartment, StudentDepartment
+from app.models.llm import LLMModel
+from app.services.access_cache import access_cache
+from app.services.model_registry import model_registry
 from app.utils.decorators import admin_required
 
 admin_bp = Blueprint('admin', __name__)
@@ -47,6 +50,7 @@ def create_user():
             db.session.add(StudentDepartment(student_id=user.id, department_id=data['department_id']))
         db.session.commit()
     
+    access_cache.invalidate_user(user.id)
     return jsonify(user.to_dict()), 201
 
 @admin_bp.route('/users/<int:user_id>', methods=['PUT'])
@@ -83,6 +87,7 @@ def update_user(user_id):
                 db.session.add(StudentDepartment(student_id=user.id, department_id=data['department_ids'][0]))
 
     db.session.commit()
+    access_cache.invalidate_user(user.id)
     return jsonify(user.to_dict()), 200
 
 @admin_bp.route('/users/<int:user_id>', methods=['DELETE'])
@@ -95,6 +100,7 @@ def delete_user(user_id):
     StudentDepartment.query.filter_by(student_id=user_id).delete()
     db.session.delete(user)
     db.session.commit()
+    access_cache.invalidate_user(user_id)
     return jsonify({'message': 'User deleted successfully'}), 200
 
 @admin_bp.route('/users', methods=['GET'])
@@ -168,6 +174,7 @@ def delete_department(dept_id):
     StudentDepartment.query.filter_by(department_id=dept_id).delete()
     db.session.delete(dept)
     db.session.commit()
+    access_cache.invalidate_department(dept_id)
     return jsonify({'message': 'Department deleted'}), 200
 
 @admin_bp.route('/departments', methods=['GET'])
@@ -176,3 +183,90 @@ def delete_department(dept_id):
 def get_departments():
     departments = Department.query.all()
     return jsonify([d.to_dict() for d in departments]), 200
+
+LLM_PROVIDERS = ('openai', 'anthropic', 'ollama')
+
+def _apply_model_fields(model, data):
+    """Copy LLM model fields from request data; returns an error message or None"""
+    for field in ('name', 'model_identifier'):
+        if field in data:
+            if not data[field]:
+                return f'{field} is required'
+            setattr(model, field, data[field])
+    if 'provider' in data:
+        if data['provider'] not in LLM_PROVIDERS:
+            return f"provider must be one of {', '.join(LLM_PROVIDERS)}"
+        model.provider = data['provider']
+    if 'api_endpoint' in data:
+        model.api_endpoint = data['api_endpoint'] or None
+    if 'is_active' in data:
+        model.is_active = bool(data['is_active'])
+    if 'max_tokens' in data:
+        value = data['max_tokens']
+        if value is not None:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                return 'max_tokens must be an integer'
+            if value < 1:
+                return 'max_tokens is out of range'
+        model.max_tokens = value
+    if 'temperature' in data:
+        value = data['temperature']
+        if value is not None:
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                return 'temperature must be a number'
+            if not 0 <= value <= 2:
+                return 'temperature is out of range'
+        model.temperature = value
+    if not (model.name and model.provider and model.model_identifier):
+        return 'name, provider and model_identifier are required'
+    return None
+
+def _model_dict(model):
+    return {
+        **model.to_dict(),
+        'api_endpoint': model.api_endpoint,
+        'max_tokens': model.max_tokens,
+        'temperature': float(model.temperature) if model.temperature is not None else None
+    }
+
+@admin_bp.route('/llm-models', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_llm_models():
+    models = LLMModel.query.order_by(LLMModel.id).all()
+    return jsonify([_model_dict(m) for m in models]), 200
+
+@admin_bp.route('/llm-models', methods=['POST'])
+@jwt_required()
+@admin_required
+def create_llm_model():
+    data = request.get_json()
+    model = LLMModel()
+    error = _apply_model_fields(model, data)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    db.session.add(model)
+    db.session.commit()
+    model_registry.invalidate()
+    return jsonify(_model_dict(model)), 201
+
+@admin_bp.route('/llm-models/<int:model_id>', methods=['PUT'])
+@jwt_required()
+@admin_required
+def update_llm_model(model_id):
+    data = request.get_json()
+    model = LLMModel.query.get_or_404(model_id)
+    
+    error = _apply_model_fields(model, data)
+    if error:
+        db.session.rollback()
+        return jsonify({'error': error}), 400
+    
+    db.session.commit()
+    model_registry.invalidate()
+    return jsonify(_model_dict(model)), 200
@@ -0,0 +1,56 @@
+import logging
+import time
+from flask import Blueprint, Response, current_app, g, jsonify, request
+from app.services import warmup
+from app.utils import metrics
+
+monitoring_bp = Blueprint('monitoring', __name__)
+logger = logging.getLogger(__name__)
+
+@monitoring_bp.before_app_request
+def start_request_timer():
+    # Workers not started through gunicorn's post_fork warm up on first contact
+    warmup.start_warmup(current_app._get_current_object())
+    if metrics.enabled():
+        g.request_started = time.perf_counter()
+
+@monitoring_bp.after_app_request
+def record_request_timing(response):
+    started = g.get('request_started')
+    if started is None:
+        return response
+
+    elapsed = time.perf_counter() - started
+    endpoint = request.endpoint or 'unmatched'
+    metrics.REQUEST_SECONDS.observe(
+        elapsed, endpoint=endpoint, method=request.method, status=response.status_code)
+
+    spans = g.get('spans', [])
+    if spans:
+        # Per-request stage timings, visible in browser devtools
+        response.headers['Server-Timing'] = ', '.join(
+            f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in spans)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("request timing", extra={
+                'endpoint': endpoint,
+                'status': response.status_code,
+                'total_ms': round(elapsed * 1000, 1),
+                **{f"{stage}_ms": round(seconds * 1000, 1) for stage, seconds in spans}
+            })
+    return response
+
+@monitoring_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus-format metrics for this worker process"""
+    if not current_app.config.get('METRICS_ENABLED', True):
+        return Response('metrics disabled\n', status=404, mimetype='text/plain')
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@monitoring_bp.route('/health', methods=['GET'])
+def health():
+    """Readiness for load balancers: 503 until this worker has warmed up"""
+    ollama_hosts = current_app.extensions['llm_manager'].ollama_pool.stats()
+    if not current_app.config['WARMUP_ON_STARTUP']:
+        return jsonify({'status': 'ready', 'warmup': 'disabled', 'ollama_hosts': ollama_hosts}), 200
+    state = warmup.readiness()
+    return jsonify({**state, 'ollama_hosts': ollama_hosts}), 200 if state['status'] == 'ready' else 503
@@ -1,18 +1,46 @@
-from flask import Blueprint, request, jsonify
+import logging
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.utils import secure_filename
 import os
 from app import db
 from app.models.subject import Subject
 from app.models.document import SubjectDocument
-from app.models.department import StaffDepartment
-from app.services.rag_service import RAGService
+from app.services.rag_service import rag_service
+from app.services.access_cache import access_cache
+from app.services.ingestion import (save_uploads, ingest_files, reserve_upload_path,
+                                    reprocess_document, delete_document, live_collection)
+from app.services import citations, faq_service, upload_sessions
+from app.services.document_chunker import prepare_chunks
+from app.services.upload_sessions import UploadError
 from app.utils.decorators import staff_required
+from app.utils.metrics import span
 from app.config import Config
 
 staff_bp = Blueprint('staff', __name__)
-# rag_service will be initialized lazily or per request if needed, but safe here
-rag_service = RAGService()
+logger = logging.getLogger(__name__)
+
+RAG_SETTING_FIELDS = ('chunk_size', 'chunk_overlap', 'top_k')
+
+def _apply_rag_settings(subject, data):
+    """Copy per-subject RAG overrides from request data; returns an error message or None"""
+    for field in RAG_SETTING_FIELDS:
+        if field not in data:
+            continue
+        value = data[field]
+        if value is not None:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                return f'{field} must be an integer'
+            if value < (0 if field == 'chunk_overlap' else 1):
+                return f'{field} is out of range'
+        setattr(subject, field, value)
+    
+    settings = subject.rag_settings()
+    if settings['chunk_overlap'] >= settings['chunk_size']:
+        return 'chunk_overlap must be smaller than chunk_size'
+    return None
 
 @staff_bp.route('/subjects', methods=['POST'])
 @jwt_required()
@@ -23,12 +51,7 @@ def create_subject():
     user_id = get_jwt_identity()
     
     # Verify staff belongs to department
-    mapping = StaffDepartment.query.filter_by(
-        staff_id=user_id,
-        department_id=data['department_id']
-    ).first()
-    
-    if not mapping:
+    if not access_cache.staff_can_access(user_id, data['department_id']):
         return jsonify({'error': 'Not authorized for this department'}), 403
     
     subject = Subject(
@@ -38,6 +61,9 @@ def create_subject():
         department_id=data['department_id'],
         created_by=user_id
     )
+    error = _apply_rag_settings(subject, data)
+    if error:
+        return jsonify({'error': error}), 400
     
     db.session.add(subject)
     db.session.commit()
@@ -56,16 +82,11 @@ def upload_document(subject_id):
     # subject_id comes from route param
     
     # Verify access
-    subject = Subject.query.get(subject_id)
+    subject = access_cache.subject_info(subject_id)
     if not subject:
         return jsonify({'error': 'Subject not found'}), 404
     
-    mapping = StaffDepartment.query.filter_by(
-        staff_id=user_id,
-        department_id=subject.department_id
-    ).first()
-    
-    if not mapping:
+    if not access_cache.staff_can_access(user_id, subject['department_id']):
         return jsonify({'error': 'Not authorized'}), 403
     
     # Handle file upload
@@ -101,18 +122,17 @@ def upload_document(subject_id):
     
     # Process document and add to vector store
     try:
-        print(f"DEBUG: Starting RAG processing for document {document.id}")
-        collection_name = f"subject_{subject_id}"
-        rag_service.add_document_to_collection(
-            collection_name,
-            file_path,
-            document.id
-        )
+        collection_name = live_collection(subject_id)
+        with span('ingest'):
+            with span('ingest_extract'):
+                chunks = prepare_chunks(file_path, subject['chunk_size'], subject['chunk_overlap'])
+            rag_service.index_chunks(collection_name, document.id, chunks)
+        citations.record_chunks(document.id, subject_id, chunks)
         
         document.is_processed = True
         document.chroma_collection_name = collection_name
         db.session.commit()
-        print(f"DEBUG: RAG processing completed for document {document.id}")
+        logger.info("document processed", extra={'document_id': document.id, 'subject_id': subject_id})
         
         return jsonify({
             'message': 'Document uploaded and processed successfully',
@@ -120,10 +140,160 @@ def upload_document(subject_id):
         }), 201
         
     except Exception as e:
-        import traceback
-        print(f"ERROR: Processing failed for document {document.id}: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("document processing failed", extra={'document_id': document.id})
+        return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+
+@staff_bp.route('/subjects/<int:subject_id>/upload/bulk', methods=['POST'])
+@jwt_required()
+@staff_required
+def bulk_upload_documents(subject_id):
+    """Upload several PDFs and/or ZIP archives of PDFs to a subject"""
+    user_id = get_jwt_identity()
+    
+    subject = access_cache.subject_info(subject_id)
+    if not subject:
+        return jsonify({'error': 'Subject not found'}), 404
+    
+    if not access_cache.staff_can_access(user_id, subject['department_id']):
+        return jsonify({'error': 'Not authorized'}), 403
+    
+    files = request.files.getlist('files') + request.files.getlist('file')
+    if not files:
+        return jsonify({'error': 'No files provided'}), 400
+    
+    upload_path = os.path.join(Config.UPLOAD_FOLDER, f"subject_{subject_id}")
+    saved, errors = save_uploads(files, upload_path)
+    if not saved:
+        return jsonify({'error': 'No PDF documents to process', 'errors': errors}), 400
+    
+    try:
+        with span('ingest'):
+            report = ingest_files(subject, user_id, saved)
+    except Exception as e:
+        logger.exception("bulk upload failed", extra={'subject_id': subject_id})
+        return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+    
+    report['failed'] += len(errors)
+    report['errors'] = errors + report['errors']
+    report['received'] = report['processed'] + report['failed']
+    report['message'] = f"{report['processed']} of {report['received']} documents processed"
+    return jsonify(report), 201 if report['processed'] else 400
+
+def _load_upload(upload_id, user_id):
+    """Upload manifest and subject info for a session the caller may use"""
+    manifest = upload_sessions.load_session(upload_id, user_id)
+    subject = access_cache.subject_info(manifest['subject_id'])
+    if not subject:
+        raise UploadError('Subject not found', 404)
+    if not access_cache.staff_can_access(user_id, subject['department_id']):
+        raise UploadError('Not authorized', 403)
+    return manifest, subject
+
+@staff_bp.route('/subjects/<int:subject_id>/uploads', methods=['POST'])
+@jwt_required()
+@staff_required
+def init_upload(subject_id):
+    """Start a resumable upload; parts are then sent with PUT .../parts/<n>"""
+    user_id = get_jwt_identity()
+    data = request.get_json() or {}
+    
+    subject = access_cache.subject_info(subject_id)
+    if not subject:
+        return jsonify({'error': 'Subject not found'}), 404
+    
+    if not access_cache.staff_can_access(user_id, subject['department_id']):
+        return jsonify({'error': 'Not authorized'}), 403
+    
+    try:
+        file_size = int(data.get('file_size'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'file_name and file_size are required'}), 400
+    
+    upload_path = os.path.join(Config.UPLOAD_FOLDER, f"subject_{subject_id}")
+    file_path, error = reserve_upload_path(upload_path, data.get('file_name') or '')
+    if error:
+        return jsonify({'error': error}), 400
+    
+    try:
+        manifest = upload_sessions.create_session(
+            subject_id, user_id, os.path.basename(file_path), file_size, data.get('sha256'))
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    
+    return jsonify(upload_sessions.session_status(manifest)), 201
+
+@staff_bp.route('/uploads/<upload_id>', methods=['GET'])
+@jwt_required()
+@staff_required
+def get_upload_status(upload_id):
+    """Received and missing parts, for resuming an interrupted upload"""
+    try:
+        manifest, _ = _load_upload(upload_id, get_jwt_identity())
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    return jsonify(upload_sessions.session_status(manifest)), 200
+
+@staff_bp.route('/uploads/<upload_id>/parts/<int:part_number>', methods=['PUT'])
+@jwt_required()
+@staff_required
+def upload_part(upload_id, part_number):
+    """Store one part (raw request body); X-Content-SHA256 is verified when sent"""
+    try:
+        manifest, _ = _load_upload(upload_id, get_jwt_identity())
+        part = upload_sessions.write_part(manifest, part_number, request.stream,
+                                          request.headers.get('X-Content-SHA256'))
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    return jsonify(part), 200
+
+@staff_bp.route('/uploads/<upload_id>/complete', methods=['POST'])
+@jwt_required()
+@staff_required
+def complete_upload(upload_id):
+    """Assemble the parts and process the document like a regular upload"""
+    user_id = get_jwt_identity()
+    try:
+        manifest, subject = _load_upload(upload_id, user_id)
+        with upload_sessions.completing(manifest):
+            return _complete_upload(manifest, subject, user_id)
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+
+def _complete_upload(manifest, subject, user_id):
+    upload_path = os.path.join(Config.UPLOAD_FOLDER, f"subject_{subject['id']}")
+    file_path, error = reserve_upload_path(upload_path, manifest['file_name'])
+    if error:
+        raise UploadError(error, 409)
+    upload_sessions.assemble(manifest, file_path)
+    
+    # On failure the assembled file is removed but the parts are kept, so
+    # /complete can be retried without re-sending the file
+    try:
+        with span('ingest'):
+            report = ingest_files(subject, user_id, [(manifest['file_name'], file_path)])
+    except Exception as e:
+        logger.exception("document processing failed", extra={'upload_id': manifest['upload_id']})
         return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+    
+    if not report['processed']:
+        return jsonify({'error': report['errors'][0]['error']}), 400
+    upload_sessions.discard_session(manifest['upload_id'])
+    return jsonify({
+        'message': 'Document uploaded and processed successfully',
+        'document': report['documents'][0]
+    }), 201
+
+@staff_bp.route('/uploads/<upload_id>', methods=['DELETE'])
+@jwt_required()
+@staff_required
+def abort_upload(upload_id):
+    """Abandon an upload and remove its parts"""
+    try:
+        _load_upload(upload_id, get_jwt_identity())
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    upload_sessions.discard_session(upload_id)
+    return jsonify({'message': 'Upload discarded'}), 200
 
 @staff_bp.route('/subjects/<int:subject_id>/documents', methods=['GET'])
 @jwt_required()
@@ -133,29 +303,138 @@ def get_subject_documents(subject_id):
     user_id = get_jwt_identity()
     
     # Verify access - staff must be associated with the subject's department
-    subject = Subject.query.get(subject_id)
+    subject = access_cache.subject_info(subject_id)
     if not subject:
         return jsonify({'error': 'Subject not found'}), 404
         
-    mapping = StaffDepartment.query.filter_by(
-        staff_id=user_id,
-        department_id=subject.department_id
-    ).first()
-    
-    if not mapping:
+    if not access_cache.staff_can_access(user_id, subject['department_id']):
         return jsonify({'error': 'Not authorized'}), 403
         
     documents = SubjectDocument.query.filter_by(subject_id=subject_id).all()
     return jsonify([d.to_dict() for d in documents]), 200
 
+def _get_document(subject_id, document_id, user_id):
+    """(subject info, document) or an error response tuple"""
+    subject = access_cache.subject_info(subject_id)
+    if not subject:
+        return None, (jsonify({'error': 'Subject not found'}), 404)
+    
+    if not access_cache.staff_can_access(user_id, subject['department_id']):
+        return None, (jsonify({'error': 'Not authorized'}), 403)
+    
+    document = SubjectDocument.query.filter_by(id=document_id, subject_id=subject_id).first()
+    if not document:
+        return None, (jsonify({'error': 'Document not found'}), 404)
+    return (subject, document), None
+
+@staff_bp.route('/subjects/<int:subject_id>/documents/<int:document_id>', methods=['DELETE'])
+@jwt_required()
+@staff_required
+def delete_subject_document(subject_id, document_id):
+    """Delete one document and only its chunks from the subject's collection"""
+    found, error = _get_document(subject_id, document_id, get_jwt_identity())
+    if error:
+        return error
+    _, document = found
+    
+    try:
+        delete_document(document)
+        db.session.commit()
+        faq_service.faq_index.invalidate(subject_id)
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("document deletion failed", extra={'document_id': document_id})
+        return jsonify({'error': f'Deletion failed: {str(e)}'}), 500
+    
+    logger.info("document deleted", extra={'document_id': document_id, 'subject_id': subject_id})
+    return jsonify({'message': 'Document deleted successfully'}), 200
+
+@staff_bp.route('/subjects/<int:subject_id>/documents/<int:document_id>/reprocess', methods=['POST'])
+@jwt_required()
+@staff_required
+def reprocess_subject_document(subject_id, document_id):
+    """Re-index one document (e.g. after changing the subject's chunk settings)"""
+    found, error = _get_document(subject_id, document_id, get_jwt_identity())
+    if error:
+        return error
+    subject, document = found
+    
+    try:
+        with span('ingest'):
+            chunk_count = reprocess_document(document, subject)
+        db.session.commit()
+        faq_service.faq_index.invalidate(subject_id)
+    except Exception as e:
+        logger.exception("document reprocessing failed", extra={'document_id': document_id})
+        # The session may have failed too; record that the old chunks are gone
+        # (not the case if the file did not parse) in a fresh transaction
+        chunks_removed = not document.is_processed
+        db.session.rollback()
+        if chunks_removed:
+            try:
+                document.is_processed = False
+                faq_service.forget_faqs(subject_id)
+                db.session.commit()
+                faq_service.faq_index.invalidate(subject_id)
+            except Exception:
+                db.session.rollback()
+                logger.exception("failed to mark document unprocessed", extra={'document_id': document_id})
+        return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+    
+    logger.info("document reprocessed", extra={'document_id': document_id, 'chunks': chunk_count})
+    return jsonify({
+        'message': 'Document reprocessed successfully',
+        'document': {**document.to_dict(), 'chunks': chunk_count}
+    }), 200
+
+@staff_bp.route('/subjects/<int:subject_id>/faqs/build', methods=['POST'])
+@jwt_required()
+@staff_required
+def build_subject_faqs(subject_id):
+    """Cluster past student questions and pre-generate FAQ answers in the background"""
+    user_id = get_jwt_identity()
+    
+    subject = access_cache.subject_info(subject_id)
+    if not subject:
+        return jsonify({'error': 'Subject not found'}), 404
+    
+    if not access_cache.staff_can_access(user_id, subject['department_id']):
+        return jsonify({'error': 'Not authorized'}), 403
+    
+    if not faq_service.start_build(current_app._get_current_object(), subject_id):
+        return jsonify({'error': 'A FAQ build is already running for this subject'}), 409
+    
+    return jsonify({'message': 'FAQ build started', 'build': faq_service.build_status(subject_id)}), 202
+
+@staff_bp.route('/subjects/<int:subject_id>/faqs', methods=['GET'])
+@jwt_required()
+@staff_required
+def get_subject_faqs(subject_id):
+    """Stored FAQ answers and the status of the last build"""
+    user_id = get_jwt_identity()
+    
+    subject = access_cache.subject_info(subject_id)
+    if not subject:
+        return jsonify({'error': 'Subject not found'}), 404
+    
+    if not access_cache.staff_can_access(user_id, subject['department_id']):
+        return jsonify({'error': 'Not authorized'}), 403
+    
+    from app.models.faq import SubjectFAQ
+    faqs = SubjectFAQ.query.filter_by(subject_id=subject_id).order_by(
+        SubjectFAQ.cluster_size.desc(), SubjectFAQ.id).all()
+    return jsonify({
+        'build': faq_service.build_status(subject_id),
+        'faqs': [f.to_dict() for f in faqs]
+    }), 200
+
 @staff_bp.route('/departments', methods=['GET'])
 @jwt_required()
 @staff_required
 def get_staff_departments():
     """Get departments assigned to the staff member"""
     user_id = get_jwt_identity()
-    dept_mappings = StaffDepartment.query.filter_by(staff_id=user_id).all()
-    dept_ids = [m.department_id for m in dept_mappings]
+    dept_ids = list(access_cache.staff_departments(user_id))
     
     if not dept_ids:
         return jsonify([]), 200
@@ -171,8 +450,7 @@ def get_my_subjects():
     """Get subjects for staff's departments"""
     user_id = get_jwt_identity()
     
-    dept_mappings = StaffDepartment.query.filter_by(staff_id=user_id).all()
-    dept_ids = [m.department_id for m in dept_mappings]
+    dept_ids = list(access_cache.staff_departments(user_id))
     
     if not dept_ids:
         return jsonify([]), 200
@@ -191,28 +469,25 @@ def update_subject(subject_id):
     subject = Subject.query.get_or_404(subject_id)
     
     # Verify access
-    mapping = StaffDepartment.query.filter_by(
-        staff_id=user_id,
-        department_id=subject.department_id
-    ).first()
-    
-    if not mapping:
+    if not access_cache.staff_can_access(user_id, subject.department_id):
         return jsonify({'error': 'Not authorized for this subject'}), 403
         
     subject.name = data.get('name', subject.name)
     subject.code = data.get('code', subject.code)
     subject.description = data.get('description', subject.description)
     
+    error = _apply_rag_settings(subject, data)
+    if error:
+        db.session.rollback()
+        return jsonify({'error': error}), 400
+    
     if 'department_id' in data and int(data['department_id']) != subject.department_id:
-        new_mapping = StaffDepartment.query.filter_by(
-            staff_id=user_id,
-            department_id=data['department_id']
-        ).first()
-        if not new_mapping:
+        if not access_cache.staff_can_access(user_id, data['department_id']):
             return jsonify({'error': 'Not authorized for the new department'}), 403
         subject.department_id = data['department_id']
         
     db.session.commit()
+    access_cache.invalidate_subject(subject_id)
     return jsonify(subject.to_dict()), 200
 
 @staff_bp.route('/subjects/<int:subject_id>', methods=['DELETE'])
@@ -224,15 +499,11 @@ def delete_subject(subject_id):
     subject = Subject.query.get_or_404(subject_id)
     
     # Verify access
-    mapping = StaffDepartment.query.filter_by(
-        staff_id=user_id,
-        department_id=subject.department_id
-    ).first()
-    
-    if not mapping:
+    if not access_cache.staff_can_access(user_id, subject.department_id):
         return jsonify({'error': 'Not authorized for this subject'}), 403
         
     # Delete docs
+    citations.forget_subject(subject_id)
     docs = SubjectDocument.query.filter_by(subject_id=subject_id).all()
     for doc in docs:
         if os.path.exists(doc.file_path):
@@ -241,11 +512,15 @@ def delete_subject(subject_id):
     
     # Delete Chroma collection
     try:
-        rag_service.delete_subject_collection(subject_id)
+        rag_service.delete_subject_collection(subject.active_collection())
     except Exception as e:
-        print(f"Error deleting collection: {e}")
+        logger.error("error deleting collection", extra={'subject_id': subject_id, 'error': str(e)})
         
+    faq_service.forget_faqs(subject_id)
+    
     db.session.delete(subject)
     db.session.commit()
+    access_cache.invalidate_subject(subject_id)
+    faq_service.faq_index.invalidate(subject_id)
     
     return jsonify({'message': 'Subject deleted successfully'}), 200
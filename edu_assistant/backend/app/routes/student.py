@@ -1,17 +1,21 @@
+import logging
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models.subject import Subject
-from app.models.department import StudentDepartment
 from app.models.chat import ChatSession, ChatMessage
 from app.models.llm import LLMModel
-from app.services.rag_service import RAGService
-from app.services.llm_manager import LLMManager
+from app.services.llm_manager import llm_manager
+from app.services.access_cache import access_cache
+from app.services import chat_service, citations
+from app.services.chat_service import ChatError, general_conversation_prompt, off_topic_reply
+from app.services.llm_scheduler import SchedulerTimeout
 from app.utils.decorators import student_required
+from app.utils.rate_limit import rate_limit
+from app.utils.metrics import span
 
 student_bp = Blueprint('student', __name__)
-rag_service = RAGService()
-llm_manager = LLMManager()
+logger = logging.getLogger(__name__)
 
 @student_bp.route('/test', methods=['GET'])
 def test_route():
@@ -24,13 +28,11 @@ def get_available_subjects():
     """Get subjects available to student"""
     user_id = get_jwt_identity()
     
-    dept_mapping = StudentDepartment.query.filter_by(student_id=user_id).first()
-    if not dept_mapping:
+    dept_ids = list(access_cache.student_departments(user_id))
+    if not dept_ids:
         return jsonify([]), 200
     
-    subjects = Subject.query.filter_by(
-        department_id=dept_mapping.department_id
-    ).all()
+    subjects = Subject.query.filter(Subject.department_id.in_(dept_ids)).all()
     
     return jsonify([s.to_dict() for s in subjects]), 200
 
@@ -43,16 +45,11 @@ def start_chat_session():
     user_id = get_jwt_identity()
     
     # Validate subject access
-    subject = Subject.query.get(data['subject_id'])
+    subject = access_cache.subject_info(data['subject_id'])
     if not subject:
         return jsonify({'error': 'Subject not found'}), 404
     
-    dept_mapping = StudentDepartment.query.filter_by(
-        student_id=user_id,
-        department_id=subject.department_id
-    ).first()
-    
-    if not dept_mapping:
+    if not access_cache.student_can_access(user_id, subject['department_id']):
         return jsonify({'error': 'Not authorized for this subject'}), 403
     
     # Create chat session
@@ -68,121 +65,86 @@ def start_chat_session():
     
     return jsonify(session.to_dict()), 201
 
-@student_bp.route('/chat/<int:session_id>/message', methods=['POST'])
 @jwt_required()
 @student_required
+@rate_limit('chat', 'RATE_LIMIT_CHAT')
+def open_chat(session_id):
+    """Checks of the message route and ``chat_service.open_chat``: the chat dict, or an error response.
+
+    Also called by the async chat path (app/asgi.py), in a request context of its own.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data.get('message'):
+        return jsonify({'error': 'Message is required'}), 400
+    try:
+        return chat_service.open_chat(session_id, get_jwt_identity(), data['message'])
+    except ChatError as e:
+        return jsonify({'error': str(e)}), e.status
+
+@student_bp.route('/chat/<int:session_id>/message', methods=['POST'])
 def send_message(session_id):
     """Send message and get AI response"""
-    data = request.get_json()
-    user_id = get_jwt_identity()
-    # session_id from url arg
-    
-    # Verify session ownership
-    print(f"DEBUG: Looking for session {session_id} for user {user_id} (type: {type(user_id)})")
-    session = ChatSession.query.get(session_id)
-    if not session:
-        print(f"DEBUG: Session {session_id} not found in database")
-        return jsonify({'error': 'Session not found'}), 404
-    
-    print(f"DEBUG: Session found. session.student_id={session.student_id} (type: {type(session.student_id)}), user_id={user_id} (type: {type(user_id)})")
-    
-    # Convert both to int for comparison (JWT might return string)
-    if int(session.student_id) != int(user_id):
-        print(f"DEBUG: Session {session_id} belongs to user {session.student_id}, but requested by {user_id} - UNAUTHORIZED")
-        return jsonify({'error': 'Not authorized for this session'}), 403
-    
-    print(f"DEBUG: Authorization successful for session {session_id}")
-    
-    # Save user message
-    print(f"DEBUG: Saving user message for session {session_id}")
-    user_message = ChatMessage(
-        session_id=session_id,
-        message_type='user',
-        content=data['message']
-    )
-    db.session.add(user_message)
-    db.session.commit()
-    
-    # Get subject for classification
-    subject = Subject.query.get(session.subject_id)
-    subject_name = subject.name if subject else "General Subject"
+    chat = open_chat(session_id)
+    if not isinstance(chat, dict):
+        return chat
+    if 'reply' in chat:
+        return jsonify(chat['reply']), 200
+
+    # Everything is read: give the connection back to the pool rather than
+    # hold it while the LLM works
+    db.session.close()
 
     try:
         # Classify intent
-        print(f"DEBUG: Classifying intent for: {data['message']}")
-        intent = llm_manager.classify_intent(data['message'], subject_name)
-        print(f"DEBUG: Detected intent: {intent}")
+        with span('classify'):
+            intent = llm_manager.classify_intent(chat['message'], chat['subject_name'], requester=chat['user_id'])
+        logger.debug("intent classified", extra={'session_id': session_id, 'intent': intent})
 
         context = []
         if intent == 'SUBJECT_SPECIFIC':
             # Retrieve context using RAG
-            collection_name = f"subject_{session.subject_id}"
-            print(f"DEBUG: Retrieving context for session {session_id}, subject {session.subject_id}")
-            context = rag_service.retrieve_context(
-                collection_name,
-                data['message'],
-                top_k=5
-            )
-            print(f"DEBUG: Retrieved {len(context)} context chunks")
-            
-            prompt_query = data['message']
+            context = chat_service.retrieve_context(chat)
+            prompt_query = chat['message']
         elif intent == 'GENERAL_CONVERSATION':
             # No RAG needed for general conversation
-            print("DEBUG: General conversation detected, bypassing RAG")
-            prompt_query = f"Greeting/General question from student: {data['message']}. Please respond as a helpful educational assistant."
+            prompt_query = general_conversation_prompt(chat['message'])
         else: # OFF_TOPIC
-            print("DEBUG: Off-topic query detected")
-            return jsonify({
-                'message': {
-                    'content': f"I'm sorry, I'm here to help you with {subject_name} and general educational queries. That question seems outside our current scope. How can I help you with your studies?",
-                    'message_type': 'assistant',
-                    'session_id': session_id
-                },
-                'context_used': 0
-            }), 200
+            chat_service.save_messages(chat)
+            return jsonify(off_topic_reply(chat['subject_name'], session_id)), 200
 
-        # Get LLM model details
-        llm_model = LLMModel.query.get(session.llm_model_id)
-        if not llm_model:
-            llm_model = LLMModel.query.filter_by(is_active=True).first()
-        
+        llm_model = chat['llm_model']
         if not llm_model:
-             print("ERROR: No active LLM models found")
+             logger.error("no active LLM models found")
+             chat_service.save_messages(chat)
              return jsonify({'error': 'No active LLM models found'}), 500
 
         # Generate response
-        print(f"DEBUG: Generating response with level: {session.learning_level}")
-        response = llm_manager.generate_response(
-            provider=llm_model.provider,
-            model_identifier=llm_model.model_identifier,
-            context=context,
-            query=prompt_query,
-            learning_level=session.learning_level
-        )
-        print("DEBUG: Response generated successfully")
-        
-        # Save assistant message
-        assistant_message = ChatMessage(
-            session_id=session_id,
-            message_type='assistant',
-            content=response['content'],
-            retrieved_context=str(context) if context else None,
-            model_used=response['model'],
-            tokens_used=response['tokens_used']
-        )
-        
-        db.session.add(assistant_message)
-        db.session.commit()
+        with span('generate'):
+            response = llm_manager.generate_response(
+                provider=llm_model['provider'],
+                model_identifier=llm_model['model_identifier'],
+                context=context,
+                query=prompt_query,
+                learning_level=chat['learning_level'],
+                requester=chat['user_id'],
+                subject_name=chat['subject_name']
+            )
         
         return jsonify({
-            'message': assistant_message.to_dict(),
+            'message': chat_service.save_answer(chat, response, context),
             'context_used': len(context)
         }), 200
         
+    except SchedulerTimeout as e:
+        logger.warning("LLM queue timeout", extra={'session_id': session_id, 'user_id': chat['user_id']})
+        chat_service.save_question(chat)
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+        
     except Exception as e:
-        import traceback
-        print(f"ERROR: Failed to generate response for session {session_id}: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("failed to generate response", extra={'session_id': session_id})
+        chat_service.save_question(chat)
         return jsonify({'error': f'Failed to generate response: {str(e)}'}), 500
 
 @student_bp.route('/chat/<int:session_id>/history', methods=['GET'])
@@ -193,7 +155,7 @@ def get_chat_history(session_id):
     user_id = get_jwt_identity()
     
     session = ChatSession.query.get(session_id)
-    if not session or session.student_id != user_id:
+    if not session or int(session.student_id) != int(user_id):
         return jsonify({'error': 'Session not found'}), 404
     
     messages = ChatMessage.query.filter_by(
@@ -202,6 +164,26 @@ def get_chat_history(session_id):
     
     return jsonify([m.to_dict() for m in messages]), 200
 
+@student_bp.route('/chat/<int:session_id>/messages/<int:message_id>/citations', methods=['GET'])
+@jwt_required()
+@student_required
+def get_message_citations(session_id, message_id):
+    """Sources of an assistant message: document, page, heading and offset per retrieved chunk"""
+    user_id = get_jwt_identity()
+    
+    session = ChatSession.query.get(session_id)
+    if not session or int(session.student_id) != int(user_id):
+        return jsonify({'error': 'Session not found'}), 404
+    
+    message = ChatMessage.query.filter_by(id=message_id, session_id=session_id).first()
+    if not message:
+        return jsonify({'error': 'Message not found'}), 404
+    
+    return jsonify({
+        'message_id': message.id,
+        'citations': citations.resolve(message.context_chunk_ids or [])
+    }), 200
+
 @student_bp.route('/llm-models', methods=['GET'])
 @jwt_required()
 def get_available_models():
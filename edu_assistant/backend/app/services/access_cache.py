@@ -0,0 +1,75 @@
+from typing import Dict, FrozenSet, Optional
+from app.config import Config
+from app.utils.ttl_cache import TTLCache
+
+
+class AccessCache:
+    """Per-process cache of department memberships and subject ownership.
+
+    Admin/staff mutation routes invalidate the affected entries explicitly.
+    Entries also expire after ``Config.ACCESS_CACHE_TTL`` seconds so that
+    changes made through another worker process are picked up eventually.
+    """
+
+    def __init__(self, ttl: int = None):
+        self.ttl = Config.ACCESS_CACHE_TTL if ttl is None else ttl
+        self._staff = TTLCache(self.ttl, 'access')
+        self._students = TTLCache(self.ttl, 'access')
+        self._subjects = TTLCache(self.ttl, 'access')
+
+    def staff_departments(self, staff_id) -> FrozenSet[int]:
+        """Department ids the staff member is assigned to"""
+        def load():
+            from app.models.department import StaffDepartment
+            rows = StaffDepartment.query.filter_by(staff_id=int(staff_id)).all()
+            return frozenset(r.department_id for r in rows)
+        return self._staff.get_or_load(int(staff_id), load)
+
+    def student_departments(self, student_id) -> FrozenSet[int]:
+        """Department ids the student is enrolled in"""
+        def load():
+            from app.models.department import StudentDepartment
+            rows = StudentDepartment.query.filter_by(student_id=int(student_id)).all()
+            return frozenset(r.department_id for r in rows)
+        return self._students.get_or_load(int(student_id), load)
+
+    def staff_can_access(self, staff_id, department_id) -> bool:
+        return department_id is not None and int(department_id) in self.staff_departments(staff_id)
+
+    def student_can_access(self, student_id, department_id) -> bool:
+        return department_id is not None and int(department_id) in self.student_departments(student_id)
+
+    def subject_info(self, subject_id) -> Optional[Dict]:
+        """Cached id/name/department_id, active collection and effective RAG settings, or None"""
+        def load():
+            from app.models.subject import Subject
+            subject = Subject.query.get(int(subject_id))
+            if not subject:
+                return None
+            return {
+                'id': subject.id,
+                'name': subject.name,
+                'department_id': subject.department_id,
+                'collection': subject.active_collection(),
+                **subject.rag_settings()
+            }
+        return self._subjects.get_or_load(int(subject_id), load)
+
+    def invalidate_user(self, user_id):
+        self._staff.invalidate(int(user_id))
+        self._students.invalidate(int(user_id))
+
+    def invalidate_subject(self, subject_id):
+        self._subjects.invalidate(int(subject_id))
+
+    def invalidate_department(self, department_id=None):
+        """Department changes can touch any membership, so drop everything"""
+        self.clear()
+
+    def clear(self):
+        self._staff.clear()
+        self._students.clear()
+        self._subjects.clear()
+
+
+access_cache = AccessCache()
@@ -0,0 +1,150 @@
+"""Database-side steps of answering a chat message.
+
+Shared by ``student.send_message`` and the async chat path (app/asgi.py),
+which differ only in how they wait for the LLM. ``open_chat`` does every
+read a message needs up front and returns a plain dict, so no connection is
+held while the LLM works; the question is stored together with its answer
+in one commit.
+
+All functions run in the caller's app context.
+"""
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+from app import db
+from app.config import Config
+from app.models.chat import ChatMessage, ChatSession
+from app.services.access_cache import access_cache
+from app.services.faq_service import faq_index
+from app.services.llm_manager import get_llm_manager
+from app.services.model_registry import model_registry
+from app.services.rag_service import get_rag_service
+from app.utils.metrics import span
+
+logger = logging.getLogger(__name__)
+
+
+class ChatError(Exception):
+    """The message cannot be answered in this session; carries an HTTP status"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def general_conversation_prompt(message: str) -> str:
+    return f"Greeting/General question from student: {message}. Please respond as a helpful educational assistant."
+
+
+def off_topic_reply(subject_name: str, session_id: int) -> dict:
+    return {
+        'message': {
+            'content': f"I'm sorry, I'm here to help you with {subject_name} and general educational queries. That question seems outside our current scope. How can I help you with your studies?",
+            'message_type': 'assistant',
+            'session_id': session_id
+        },
+        'context_used': 0
+    }
+
+
+def open_chat(session_id: int, user_id, message: str) -> Dict:
+    """Check the session and load what the LLM steps need.
+
+    A question matching a stored FAQ is answered (and saved) here; the reply
+    is then under ``'reply'``.
+    """
+    session = db.session.get(ChatSession, session_id)
+    if not session:
+        logger.debug("session not found", extra={'session_id': session_id, 'user_id': user_id})
+        raise ChatError('Session not found', 404)
+    # JWT identities are strings
+    if int(session.student_id) != int(user_id):
+        logger.warning("session access denied", extra={
+            'session_id': session_id, 'owner_id': session.student_id, 'user_id': user_id})
+        raise ChatError('Not authorized for this session', 403)
+
+    subject = access_cache.subject_info(session.subject_id)
+    llm_model = model_registry.get(session.llm_model_id) or model_registry.default()
+    chat = {
+        'session_id': session_id,
+        'user_id': user_id,
+        'message': message,
+        'asked_at': datetime.utcnow(),
+        'subject_id': session.subject_id,
+        'subject': subject,
+        'subject_name': subject['name'] if subject else "General Subject",
+        'learning_level': session.learning_level,
+        'llm_model': llm_model,
+        # For the coroutine LLM calls, which must not query the registry themselves
+        'llm_settings': get_llm_manager().model_settings(llm_model),
+        'query_embedding': None,
+    }
+
+    # Frequent questions are answered from pre-generated FAQs when the subject
+    # has any; the embedding is reused for retrieval otherwise
+    if faq_index.has_faqs(session.subject_id):
+        try:
+            chat['query_embedding'] = get_rag_service().embed_query(message)
+            faq = faq_index.match(session.subject_id, session.learning_level or 'intermediate',
+                                  chat['query_embedding'])
+        except Exception:
+            logger.exception("FAQ lookup failed", extra={'session_id': session_id})
+            faq = None
+        if faq:
+            logger.debug("FAQ answer served", extra={
+                'session_id': session_id, 'faq_id': faq['id'], 'score': faq['score']})
+            answer = ChatMessage(session_id=session_id, message_type='assistant', content=faq['answer'],
+                                 model_used=f"faq:{faq['model_used']}", tokens_used=0)
+            chat['reply'] = {'message': save_messages(chat, answer), 'context_used': 0, 'faq_id': faq['id']}
+    return chat
+
+
+def retrieve_context(chat: Dict) -> List[Dict]:
+    subject = chat['subject']
+    rag = get_rag_service()
+    collection_name = subject['collection'] if subject else f"subject_{chat['subject_id']}"
+    top_k = subject['top_k'] if subject else Config.TOP_K_RETRIEVAL
+    with span('retrieve'):
+        context = rag.retrieve_context(collection_name, chat['message'], top_k=top_k,
+                                       query_embedding=chat['query_embedding'])
+        if not context and subject and not rag.collection_exists(collection_name):
+            # Reindexed by another process since this one cached the subject
+            access_cache.invalidate_subject(chat['subject_id'])
+            fresh = access_cache.subject_info(chat['subject_id'])
+            if fresh and fresh['collection'] != collection_name:
+                context = rag.retrieve_context(fresh['collection'], chat['message'], top_k=top_k,
+                                               query_embedding=chat['query_embedding'])
+    logger.debug("context retrieved", extra={'session_id': chat['session_id'], 'chunks': len(context)})
+    return context
+
+
+def save_messages(chat: Dict, answer: ChatMessage = None) -> Optional[Dict]:
+    """Commit the question and, if given, its answer together; returns the answer's dict"""
+    question = ChatMessage(session_id=chat['session_id'], message_type='user', content=chat['message'],
+                           created_at=chat['asked_at'])
+    db.session.add_all([question] + ([answer] if answer is not None else []))
+    with span('db_commit'):
+        db.session.commit()
+    return answer.to_dict() if answer is not None else None
+
+
+def save_answer(chat: Dict, response: Dict, context: List[Dict]) -> Dict:
+    return save_messages(chat, ChatMessage(
+        session_id=chat['session_id'],
+        message_type='assistant',
+        content=response['content'],
+        retrieved_context=str(context) if context else None,
+        context_chunk_ids=[c['id'] for c in context if c.get('id')] or None,
+        model_used=response['model'],
+        tokens_used=response['tokens_used']
+    ))
+
+
+def save_question(chat: Dict):
+    """Keep the student's message when the request failed before its answer was stored"""
+    try:
+        db.session.rollback()
+        save_messages(chat)
+    except Exception:
+        db.session.rollback()
+        logger.exception("failed to save message", extra={'session_id': chat['session_id']})
@@ -0,0 +1,66 @@
+"""Citation index: where each indexed chunk came from.
+
+Chunks have the same id in the vector store and in the ``document_chunks``
+table, which records document, page, heading and character offset per chunk.
+Assistant messages keep the ids of the chunks retrieved for them, so their
+citations resolve by primary-key lookups without querying Chroma.
+
+Ids are derived from a chunk's text and position (``rag_service.chunk_ids``):
+after a document is re-chunked or replaced, chunks that changed get new ids,
+and citations of older messages to them are dropped rather than pointing at
+different text.
+
+All functions work on the current session; callers commit.
+"""
+from typing import Dict, List
+from app import db
+from app.models.document import DocumentChunk, SubjectDocument
+from app.services.rag_service import chunk_ids, rag_service
+
+
+def record_chunks(document_id: int, subject_id: int, chunks: List[Dict]):
+    """Replace a document's rows with ``chunks`` as passed to ``index_chunks``"""
+    forget_document(document_id)
+    ids = chunk_ids(document_id, chunks)
+    db.session.add_all([DocumentChunk(
+        id=ids[i],
+        document_id=document_id,
+        subject_id=subject_id,
+        chunk_index=i,
+        page_number=chunk.get('page_number'),
+        heading=chunk.get('heading'),
+        char_offset=chunk.get('offset')
+    ) for i, chunk in enumerate(chunks)])
+
+
+def rebuild_from_collection(collection_name: str, document_id: int, subject_id: int):
+    """Re-create a document's rows from the chunk metadata stored in ``collection_name``"""
+    result = rag_service.get_collection(collection_name).get(
+        where={"document_id": document_id}, include=['metadatas', 'documents'])
+    stored = sorted(zip(result['metadatas'] or [], result['documents'] or []), key=lambda r: r[0]['chunk_index'])
+    record_chunks(document_id, subject_id, [{
+        'text': text,
+        'page_number': m.get('page_number'),
+        'heading': m.get('heading'),
+        'offset': m.get('offset')
+    } for m, text in stored])
+
+
+def forget_document(document_id: int):
+    DocumentChunk.query.filter_by(document_id=document_id).delete()
+
+
+def forget_subject(subject_id: int):
+    DocumentChunk.query.filter_by(subject_id=subject_id).delete()
+
+
+def resolve(chunk_ids: List[str]) -> List[Dict]:
+    """Citations for ``chunk_ids`` in the given order; chunks since deleted are skipped"""
+    if not chunk_ids:
+        return []
+    rows = (db.session.query(DocumentChunk, SubjectDocument.file_name)
+            .join(SubjectDocument, DocumentChunk.document_id == SubjectDocument.id)
+            .filter(DocumentChunk.id.in_(chunk_ids))
+            .all())
+    found = {chunk.id: {**chunk.to_dict(), 'file_name': file_name} for chunk, file_name in rows}
+    return [found[i] for i in chunk_ids if i in found]
@@ -0,0 +1,131 @@
+"""Page- and section-aware chunking for PDF course material.
+
+Text is extracted per page, running headers/footers and table-of-contents
+pages are dropped, and each page is split at detected section headings before
+the character splitter runs. Chunks therefore never straddle a page or a
+section, and carry ``page_number`` and ``heading`` for citations.
+"""
+import logging
+import re
+from collections import Counter
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Pages with less text than this after cleanup are skipped
+MIN_PAGE_CHARS = 40
+# A header/footer line must repeat on this share of pages to count as boilerplate
+BOILERPLATE_RATIO = 0.5
+EDGE_LINES = 2
+MAX_HEADING_CHARS = 80
+
+NUMBERED_HEADING = re.compile(r'^(chapter|section|unit|part|lecture|module)\s+\d+\b|^\d+(\.\d+)*\.?\s+\S', re.I)
+TOC_LINE = re.compile(r'(\.{2,}|\s{2,}|\t)\s*\d+\s*$')
+TOC_TITLE = re.compile(r'^\s*(table of\s+)?contents\s*$', re.I)
+
+
+def extract_pages(pdf_path: str) -> List[str]:
+    """Text of every page (empty string for unreadable pages)"""
+    import PyPDF2
+    pages = []
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        for page in reader.pages:
+            try:
+                pages.append(page.extract_text() or '')
+            except Exception as e:
+                logger.warning("could not extract page", extra={'path': pdf_path, 'error': str(e)})
+                pages.append('')
+    return pages
+
+
+def _normalize(line: str) -> str:
+    # Page numbers change from page to page; compare lines without them
+    return re.sub(r'\d+', '#', line.strip().lower())
+
+
+def _edge_lines(lines: List[str]) -> List[str]:
+    content = [l for l in lines if l.strip()]
+    return content[:EDGE_LINES] + content[-EDGE_LINES:]
+
+
+def detect_boilerplate(pages: List[List[str]]) -> set:
+    """Normalized header/footer lines repeated across most pages"""
+    if len(pages) < 3:
+        return set()
+    counts = Counter()
+    for lines in pages:
+        counts.update({_normalize(l) for l in _edge_lines(lines)})
+    threshold = max(3, BOILERPLATE_RATIO * len(pages))
+    return {line for line, count in counts.items() if count >= threshold and line}
+
+
+def is_toc_page(lines: List[str]) -> bool:
+    content = [l for l in lines if l.strip()]
+    if not content:
+        return False
+    if any(TOC_TITLE.match(l) for l in content[:3]):
+        return True
+    return len(content) >= 5 and sum(bool(TOC_LINE.search(l)) for l in content) / len(content) >= 0.6
+
+
+def is_heading(line: str) -> bool:
+    text = line.strip()
+    if not text or len(text) > MAX_HEADING_CHARS or text.endswith(('.', ',', ';', ':')):
+        return False
+    if NUMBERED_HEADING.match(text):
+        return True
+    letters = [c for c in text if c.isalpha()]
+    return len(letters) >= 4 and all(c.isupper() for c in letters)
+
+
+def split_sections(lines: List[str], current_heading: Optional[str]):
+    """Yield (heading, text) sections of one page, continuing ``current_heading``"""
+    heading, buffer = current_heading, []
+    for line in lines:
+        if is_heading(line):
+            if any(l.strip() for l in buffer):
+                yield heading, '\n'.join(buffer)
+            heading, buffer = line.strip(), [line]
+        else:
+            buffer.append(line)
+    if any(l.strip() for l in buffer):
+        yield heading, '\n'.join(buffer)
+
+
+def chunk_pages(pages: List[str], splitter) -> List[Dict]:
+    """Chunks as ``{'text', 'page_number', 'heading', 'offset'}``.
+
+    Page numbers are 1-based; ``offset`` is where the chunk starts in the
+    page's extracted text (None if it does not appear there verbatim).
+    """
+    page_lines = [text.splitlines() for text in pages]
+    boilerplate = detect_boilerplate(page_lines)
+
+    chunks, heading = [], None
+    for page_number, lines in enumerate(page_lines, start=1):
+        if is_toc_page(lines):
+            continue
+        lines = [l for l in lines if _normalize(l) not in boilerplate]
+        if sum(len(l.strip()) for l in lines) < MIN_PAGE_CHARS:
+            continue
+        page_text, search_from = pages[page_number - 1], 0
+        for heading, text in split_sections(lines, heading):
+            for piece in splitter.split_text(text):
+                offset = page_text.find(piece, search_from)
+                if offset >= 0:
+                    # Chunks come in page order; overlapping ones start later
+                    search_from = offset + 1
+                chunks.append({'text': piece, 'page_number': page_number, 'heading': heading,
+                               'offset': offset if offset >= 0 else None})
+    return chunks
+
+
+def prepare_chunks(pdf_path: str, chunk_size: int, chunk_overlap: int) -> List[Dict]:
+    """Extract and chunk one PDF; module-level so it can run in a process pool"""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    pages = extract_pages(pdf_path)
+    if not any(p.strip() for p in pages):
+        raise ValueError("Empty or unreadable PDF")
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return chunk_pages(pages, splitter)
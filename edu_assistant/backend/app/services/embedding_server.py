@@ -0,0 +1,181 @@
+"""Standalone embedding server shared by all API workers.
+
+Loads the embedding model once and micro-batches concurrent ``/encode``
+requests: the first request opens a batch window of ``--window-ms`` and every
+request that arrives before it closes (up to ``--max-batch`` texts) is encoded
+in a single forward pass.
+
+    python -m app.services.embedding_server --port 8765
+    python -m app.services.embedding_server --socket /tmp/edu_embed.sock
+
+Point the API at it with ``EMBEDDING_SERVICE_URL=http://127.0.0.1:8765`` or
+``EMBEDDING_SERVICE_URL=unix:///tmp/edu_embed.sock``.
+"""
+import argparse
+import json
+import os
+import queue
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+from app.config import Config
+from app.services.embeddings import load_local_embedding_model
+from app.utils.metrics import Histogram, render
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class EmbeddingBatcher:
+    """Collects concurrent encode requests into batches for one model"""
+
+    def __init__(self, model, max_batch: int = None, window_ms: float = None):
+        self.model = model
+        self.max_batch = max_batch or Config.EMBEDDING_MAX_BATCH
+        self.window = (Config.EMBEDDING_BATCH_WINDOW_MS if window_ms is None else window_ms) / 1000.0
+        self._queue = queue.Queue()
+        self.batch_size = Histogram(
+            'embedding_batch_size', 'Texts encoded per forward pass', BATCH_SIZE_BUCKETS)
+        self.encode_seconds = Histogram(
+            'embedding_encode_seconds', 'Model time per batch')
+        self.request_seconds = Histogram(
+            'embedding_request_seconds', 'Queue wait plus encode time per request')
+        self._thread = threading.Thread(target=self._run, name='embedding-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, texts: List[str]) -> Future:
+        future = Future()
+        self._queue.put((texts, future, time.perf_counter()))
+        return future
+
+    def encode(self, texts: List[str]):
+        return self.submit(texts).result()
+
+    def _collect(self):
+        pending = [self._queue.get()]
+        count = len(pending[0][0])
+        deadline = time.perf_counter() + self.window
+        while count < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.append(item)
+            count += len(item[0])
+        return pending, count
+
+    def _run(self):
+        while True:
+            pending, count = self._collect()
+            texts = [t for item in pending for t in item[0]]
+            started = time.perf_counter()
+            try:
+                vectors = self.model.encode(texts, batch_size=max(len(texts), 1))
+            except Exception as e:
+                for _, future, _ in pending:
+                    future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+            self.batch_size.observe(count)
+            self.encode_seconds.observe(finished - started)
+
+            offset = 0
+            for item_texts, future, enqueued in pending:
+                future.set_result(vectors[offset:offset + len(item_texts)].tolist())
+                offset += len(item_texts)
+                self.request_seconds.observe(finished - enqueued)
+
+    def metrics_text(self) -> str:
+        return render(self.batch_size, self.encode_seconds, self.request_seconds)
+
+
+class EmbeddingRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    batcher: EmbeddingBatcher = None
+
+    def _send(self, status: int, body: bytes, content_type: str = 'application/json'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path != '/encode':
+            return self._send(404, b'{"error": "Not found"}')
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            texts = json.loads(self.rfile.read(length))['texts']
+            if isinstance(texts, str):
+                texts = [texts]
+            embeddings = self.batcher.encode(texts) if texts else []
+        except (ValueError, KeyError, TypeError) as e:
+            return self._send(400, json.dumps({'error': str(e)}).encode())
+        except Exception as e:
+            return self._send(500, json.dumps({'error': str(e)}).encode())
+        self._send(200, json.dumps({'embeddings': embeddings}).encode())
+
+    def do_GET(self):
+        if self.path == '/health':
+            return self._send(200, b'{"status": "ok"}')
+        if self.path == '/metrics':
+            return self._send(200, self.batcher.metrics_text().encode(), 'text/plain; version=0.0.4')
+        self._send(404, b'{"error": "Not found"}')
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ('unix', 0)
+
+
+def build_server(batcher: EmbeddingBatcher, host: str = '127.0.0.1', port: int = 8765,
+                 socket_path: str = None):
+    handler = type('BoundEmbeddingRequestHandler', (EmbeddingRequestHandler,), {'batcher': batcher})
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        return ThreadingUnixHTTPServer(socket_path, handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Shared embedding server with dynamic batching')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--socket', help='Listen on this Unix socket instead of TCP')
+    parser.add_argument('--max-batch', type=int, default=Config.EMBEDDING_MAX_BATCH)
+    parser.add_argument('--window-ms', type=float, default=Config.EMBEDDING_BATCH_WINDOW_MS)
+    args = parser.parse_args()
+
+    print("Loading embedding model...")
+    batcher = EmbeddingBatcher(load_local_embedding_model(), args.max_batch, args.window_ms)
+    server = build_server(batcher, args.host, args.port, args.socket)
+    where = args.socket or f"{args.host}:{args.port}"
+    print(f"Embedding server listening on {where} (max batch {args.max_batch}, window {args.window_ms}ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+import http.client
+import json
+import os
+import socket
+import threading
+from typing import List, Union
+from urllib.parse import urlparse
+import numpy as np
+from app.config import Config
+
+ONNX_MODEL_FILES = {
+    'onnx': 'model.onnx',
+    'onnx-int8': 'model_int8.onnx',
+}
+
+
+def load_local_embedding_model(backend: str = None):
+    """Load the embedding model into this process using the configured backend"""
+    backend = backend or Config.EMBEDDING_BACKEND
+    if backend in ONNX_MODEL_FILES:
+        return OnnxEmbeddingModel(
+            Config.EMBEDDING_MODEL,
+            os.path.join(Config.EMBEDDING_ONNX_DIR, ONNX_MODEL_FILES[backend])
+        )
+    if backend != 'torch':
+        raise ValueError(f"Unsupported embedding backend: {backend}")
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(Config.EMBEDDING_MODEL)
+
+
+class OnnxEmbeddingModel:
+    """MiniLM sentence embeddings on ONNX Runtime (CPU).
+
+    Reproduces the sentence-transformers pipeline of the bundled model:
+    transformer -> attention-masked mean pooling -> L2 normalisation.
+    """
+
+    def __init__(self, model_dir: str, onnx_path: str, num_threads: int = None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        if not os.path.exists(onnx_path):
+            raise FileNotFoundError(
+                f"ONNX model not found at {onnx_path}. Run `python download_model.py --onnx` first.")
+
+        max_length = 256
+        config_path = os.path.join(model_dir, 'sentence_bert_config.json')
+        if os.path.exists(config_path):
+            with open(config_path) as f:
+                max_length = json.load(f).get('max_seq_length', max_length)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, 'tokenizer.json'))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding(pad_id=0, pad_token='[PAD]')
+
+        options = ort.SessionOptions()
+        threads = Config.EMBEDDING_ONNX_THREADS if num_threads is None else num_threads
+        if threads:
+            options.intra_op_num_threads = threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(onnx_path, options, providers=['CPUExecutionProvider'])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {'input_ids': input_ids, 'attention_mask': attention_mask}
+        if 'token_type_ids' in self.input_names:
+            feeds['token_type_ids'] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(None, feeds)[0]
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return pooled / np.clip(norms, 1e-12, None)
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        # Sort by length so each batch pads to a similar sequence length
+        order = np.argsort([-len(t) for t in texts])
+        batches = [
+            self._encode_batch([texts[i] for i in order[start:start + batch_size]])
+            for start in range(0, len(texts), batch_size)
+        ]
+        embeddings = np.empty((len(texts), batches[0].shape[1]), dtype=np.float32)
+        embeddings[order] = np.concatenate(batches)
+        return embeddings[0] if single else embeddings
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP over a Unix domain socket"""
+
+    def __init__(self, socket_path: str, timeout: float = None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class RemoteEmbeddingModel:
+    """Client for the shared embedding server (see ``embedding_server.py``).
+
+    Mirrors the subset of ``SentenceTransformer.encode`` used by RAGService so
+    it can be swapped in transparently. ``url`` is either
+    ``http://host:port`` or ``unix:///path/to/socket``.
+    """
+
+    def __init__(self, url: str, timeout: float = None):
+        self.url = url
+        self.timeout = Config.EMBEDDING_SERVICE_TIMEOUT if timeout is None else timeout
+        parsed = urlparse(url)
+        self._unix_path = parsed.path if parsed.scheme == 'unix' else None
+        self._host = parsed.hostname
+        self._port = parsed.port
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if self._unix_path:
+                conn = UnixHTTPConnection(self._unix_path, timeout=self.timeout)
+            else:
+                conn = http.client.HTTPConnection(self._host, self._port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _post(self, path: str, payload: dict) -> dict:
+        body = json.dumps(payload)
+        headers = {'Content-Type': 'application/json'}
+        # Keep-alive connections can be closed by the server between calls;
+        # retry once on a fresh connection before giving up.
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request('POST', path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+            except (ConnectionError, http.client.HTTPException, socket.timeout, OSError):
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+                continue
+            if response.status != 200:
+                raise RuntimeError(f"Embedding service error {response.status}: {data[:200]!r}")
+            return json.loads(data)
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        result = self._post('/encode', {'texts': texts})
+        embeddings = np.asarray(result['embeddings'], dtype=np.float32)
+        return embeddings[0] if single else embeddings
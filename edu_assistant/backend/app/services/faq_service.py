@@ -0,0 +1,214 @@
+"""Pre-generated answers to a subject's most frequent questions.
+
+``build_subject_faqs`` clusters the subject's historical student questions
+(MiniLM embeddings, spherical k-means), and for the largest clusters asks the
+LLM - at batch priority, so students are never delayed - for an answer at
+every learning level. Chat then serves the stored answer whenever a new
+question lands within ``FAQ_MATCH_THRESHOLD`` cosine similarity of a cluster
+centroid, skipping classification, retrieval and generation entirely.
+"""
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+from app import db
+from app.config import Config
+from app.utils.metrics import record_cache
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+LEARNING_LEVELS = ('beginner', 'intermediate', 'advanced')
+# Greetings and one-word messages make poor FAQ entries
+MIN_QUESTION_CHARS = 12
+
+
+class FAQIndex:
+    """Per-process cache of FAQ centroids per subject and learning level.
+
+    Rebuilds invalidate the subject in the building process; other workers
+    pick up new FAQs after ``Config.FAQ_CACHE_TTL`` seconds.
+    """
+
+    def __init__(self, ttl: int = None):
+        self.ttl = Config.FAQ_CACHE_TTL if ttl is None else ttl
+        # Hits are counted per matched question (see match), not per load
+        self._subjects = TTLCache(self.ttl)
+
+    def _load(self, subject_id: int) -> Dict:
+        return self._subjects.get_or_load(subject_id, lambda: self._query(subject_id))
+
+    def _query(self, subject_id: int) -> Dict:
+        from app.models.faq import SubjectFAQ
+        rows = SubjectFAQ.query.filter_by(subject_id=subject_id).all()
+        levels = {}
+        if rows:
+            import numpy as np
+            for level in {r.learning_level for r in rows}:
+                level_rows = [r for r in rows if r.learning_level == level]
+                centroids = np.stack([np.frombuffer(r.centroid, dtype=np.float32) for r in level_rows])
+                faqs = [{'id': r.id, 'question': r.question, 'answer': r.answer, 'model_used': r.model_used}
+                        for r in level_rows]
+                levels[level] = (centroids, faqs)
+        return levels
+
+    def has_faqs(self, subject_id) -> bool:
+        return bool(self._load(int(subject_id)))
+
+    def match(self, subject_id, learning_level: str, query_embedding) -> Optional[Dict]:
+        """Stored FAQ closest to the (normalized) query embedding, if close enough"""
+        entry = self._load(int(subject_id)).get(learning_level)
+        if not entry:
+            return None
+        import numpy as np
+        centroids, faqs = entry
+        query = np.asarray(query_embedding, dtype=np.float32)
+        scores = centroids @ (query / max(float(np.linalg.norm(query)), 1e-12))
+        best = int(np.argmax(scores))
+        hit = float(scores[best]) >= Config.FAQ_MATCH_THRESHOLD
+        record_cache('faq', hit)
+        return {**faqs[best], 'score': float(scores[best])} if hit else None
+
+    def invalidate(self, subject_id):
+        self._subjects.invalidate(int(subject_id))
+
+
+faq_index = FAQIndex()
+
+
+def forget_faqs(subject_id: int):
+    """Delete a subject's FAQs, e.g. after the material they were answered from changed.
+
+    The caller commits, then calls ``faq_index.invalidate``; other workers
+    stop serving them within ``FAQ_CACHE_TTL``.
+    """
+    from app.models.faq import SubjectFAQ
+    SubjectFAQ.query.filter_by(subject_id=subject_id).delete()
+
+
+def historical_questions(subject_id: int, limit: int) -> List[str]:
+    """Most recent student questions asked in a subject"""
+    from app.models.chat import ChatMessage, ChatSession
+    rows = (db.session.query(ChatMessage.content)
+            .join(ChatSession, ChatMessage.session_id == ChatSession.id)
+            .filter(ChatSession.subject_id == subject_id, ChatMessage.message_type == 'user')
+            .order_by(ChatMessage.id.desc())
+            .limit(limit)
+            .all())
+    return [content.strip() for content, in rows if len(content.strip()) >= MIN_QUESTION_CHARS]
+
+
+def build_subject_faqs(subject_id: int) -> Dict:
+    """Cluster past questions and pre-generate answers; replaces the subject's FAQs"""
+    import numpy as np
+    from app.models.faq import SubjectFAQ
+    from app.services.access_cache import access_cache
+    from app.services.llm_manager import get_llm_manager
+    from app.services.llm_scheduler import PRIORITY_BATCH
+    from app.services.model_registry import model_registry
+    from app.services.rag_service import get_rag_service
+    from app.utils.kmeans import kmeans
+
+    start = time.perf_counter()
+    subject = access_cache.subject_info(subject_id)
+    if not subject:
+        raise LookupError(f"Subject {subject_id} not found")
+    rag, llm = get_rag_service(), get_llm_manager()
+    questions = historical_questions(subject_id, Config.FAQ_MAX_QUESTIONS)
+    min_size = Config.FAQ_MIN_CLUSTER_SIZE
+    if len(questions) < min_size:
+        return {'subject_id': subject_id, 'questions': len(questions), 'faqs': 0,
+                'message': 'Not enough questions to build FAQs'}
+
+    llm_model = model_registry.default()
+    if not llm_model:
+        raise RuntimeError('No active LLM models found')
+
+    embeddings = np.asarray(rag.embedding_model.encode(questions), dtype=np.float32)
+    k = max(1, min(Config.FAQ_CLUSTERS, len(questions) // min_size))
+    centroids, labels = kmeans(embeddings, k)
+    sizes = np.bincount(labels, minlength=len(centroids))
+    clusters = [c for c in np.argsort(-sizes) if sizes[c] >= min_size][:Config.FAQ_TOP_CLUSTERS]
+
+    requester = f"faq:{subject_id}"
+    collection_name = subject['collection']
+    faqs = []
+    for cluster in clusters:
+        members = np.flatnonzero(labels == cluster)
+        # The member closest to the centroid stands for the whole cluster
+        representative = questions[members[np.argmax(embeddings[members] @ centroids[cluster])]]
+        if llm.classify_intent(representative, subject['name'], requester=requester,
+                               priority=PRIORITY_BATCH) != 'SUBJECT_SPECIFIC':
+            continue
+        context = rag.retrieve_context(collection_name, representative, top_k=subject['top_k'],
+                                       query_embedding=centroids[cluster].tolist())
+        for level in LEARNING_LEVELS:
+            response = llm.generate_response(
+                provider=llm_model['provider'],
+                model_identifier=llm_model['model_identifier'],
+                context=context,
+                query=representative,
+                learning_level=level,
+                requester=requester,
+                priority=PRIORITY_BATCH,
+                subject_name=subject['name']
+            )
+            faqs.append(SubjectFAQ(
+                subject_id=subject_id,
+                learning_level=level,
+                question=representative,
+                answer=response['content'],
+                centroid=centroids[cluster].astype(np.float32).tobytes(),
+                cluster_size=int(sizes[cluster]),
+                model_used=response['model']
+            ))
+
+    SubjectFAQ.query.filter_by(subject_id=subject_id).delete()
+    db.session.add_all(faqs)
+    db.session.commit()
+    faq_index.invalidate(subject_id)
+
+    summary = {
+        'subject_id': subject_id,
+        'questions': len(questions),
+        'clusters': len(clusters),
+        'faqs': len(faqs),
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+    logger.info("FAQ build finished", extra=summary)
+    return summary
+
+
+_jobs: Dict[int, Dict] = {}
+_jobs_lock = threading.Lock()
+
+
+def _run_build(app, subject_id: int):
+    with app.app_context():
+        try:
+            result = {'status': 'finished', **build_subject_faqs(subject_id)}
+        except Exception as e:
+            logger.exception("FAQ build failed", extra={'subject_id': subject_id})
+            result = {'status': 'failed', 'error': str(e)}
+        finally:
+            db.session.remove()
+    with _jobs_lock:
+        _jobs[subject_id] = {**_jobs[subject_id], **result, 'finished_at': time.time()}
+
+
+def start_build(app, subject_id: int) -> bool:
+    """Build FAQs on a background thread; False if a build is already running here"""
+    with _jobs_lock:
+        if _jobs.get(subject_id, {}).get('status') == 'running':
+            return False
+        _jobs[subject_id] = {'status': 'running', 'started_at': time.time()}
+    threading.Thread(target=_run_build, args=(app, subject_id), name=f'faq-build-{subject_id}',
+                     daemon=True).start()
+    return True
+
+
+def build_status(subject_id: int) -> Optional[Dict]:
+    """Last build started in this process, if any"""
+    with _jobs_lock:
+        job = _jobs.get(subject_id)
+        return dict(job) if job else None
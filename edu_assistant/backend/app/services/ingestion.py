@@ -0,0 +1,246 @@
+"""Bulk ingestion of course PDFs for one subject.
+
+Uploaded files (PDFs or ZIP archives of PDFs) are copied to disk in blocks,
+extracted and chunked in a bounded process pool (``Config.INGEST_WORKERS``),
+embedded in the parent process - which already holds the embedding model or a
+connection to the shared embedding server - and recorded as
+``SubjectDocument`` rows in a single transaction.
+"""
+import logging
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Tuple
+from werkzeug.utils import secure_filename
+from app import db
+from app.config import Config
+from app.models.document import SubjectDocument
+from app.services import citations, faq_service
+from app.services.document_chunker import prepare_chunks
+from app.services.rag_service import rag_service
+from app.utils.metrics import span
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_ingest_pool() -> ProcessPoolExecutor:
+    """Per-process extraction pool, created on first use.
+
+    Workers are spawned rather than forked: the web process runs request
+    threads (and possibly the embedding model), neither of which is fork-safe.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=Config.INGEST_WORKERS,
+                                        mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def reserve_upload_path(upload_path: str, file_name: str, taken: set = frozenset()):
+    """Destination path for ``file_name`` or an error if it is already uploaded"""
+    filename = secure_filename(os.path.basename(file_name))
+    if not filename.lower().endswith('.pdf'):
+        return None, 'Only PDF files allowed'
+    file_path = os.path.join(upload_path, filename)
+    if file_path in taken or SubjectDocument.query.filter_by(file_path=file_path).first():
+        return None, 'A document with this name already exists'
+    return file_path, None
+
+
+def _extract_zip(upload, upload_path: str, taken: set, saved: list, errors: list):
+    try:
+        archive = zipfile.ZipFile(upload.stream)
+    except zipfile.BadZipFile:
+        errors.append({'file_name': upload.filename, 'error': 'Not a valid ZIP archive'})
+        return
+    with archive:
+        members = [m for m in archive.infolist()
+                   if not m.is_dir() and not os.path.basename(m.filename).startswith(('.', '__MACOSX'))]
+        if len(members) > Config.BULK_UPLOAD_MAX_FILES:
+            errors.append({'file_name': upload.filename,
+                           'error': f'Archive has more than {Config.BULK_UPLOAD_MAX_FILES} files'})
+            return
+        if sum(m.file_size for m in members) > Config.BULK_UPLOAD_MAX_BYTES:
+            errors.append({'file_name': upload.filename, 'error': 'Archive is too large when extracted'})
+            return
+        for member in members:
+            file_path, error = reserve_upload_path(upload_path, member.filename, taken)
+            if error:
+                errors.append({'file_name': member.filename, 'error': error})
+                continue
+            taken.add(file_path)
+            with archive.open(member) as src, open(file_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            saved.append((os.path.basename(file_path), file_path))
+
+
+def save_uploads(files, upload_path: str) -> Tuple[List[Tuple[str, str]], List[Dict]]:
+    """Write uploaded PDFs and ZIP contents to ``upload_path``.
+
+    Returns ``(saved, errors)`` where ``saved`` is a list of (file_name, path).
+    """
+    os.makedirs(upload_path, exist_ok=True)
+    saved, errors, taken = [], [], set()
+    for upload in files:
+        if not upload.filename:
+            continue
+        if upload.filename.lower().endswith('.zip'):
+            _extract_zip(upload, upload_path, taken, saved, errors)
+            continue
+        file_path, error = reserve_upload_path(upload_path, upload.filename, taken)
+        if error:
+            errors.append({'file_name': upload.filename, 'error': error})
+            continue
+        taken.add(file_path)
+        # werkzeug spools large parts to a temp file; save() copies it in blocks
+        upload.save(file_path)
+        saved.append((os.path.basename(file_path), file_path))
+    if len(saved) > Config.BULK_UPLOAD_MAX_FILES:
+        for _, file_path in saved[Config.BULK_UPLOAD_MAX_FILES:]:
+            os.remove(file_path)
+            errors.append({'file_name': os.path.basename(file_path),
+                           'error': f'More than {Config.BULK_UPLOAD_MAX_FILES} files in one upload'})
+        saved = saved[:Config.BULK_UPLOAD_MAX_FILES]
+    return saved, errors
+
+
+def _prepare_all(saved, chunk_size: int, chunk_overlap: int, subject_id: int):
+    """Yield (file_name, path, chunks or exception) as extraction finishes"""
+    if Config.INGEST_WORKERS <= 1 or len(saved) == 1:
+        for file_name, file_path in saved:
+            try:
+                yield file_name, file_path, prepare_chunks(file_path, chunk_size, chunk_overlap)
+            except Exception as e:
+                yield file_name, file_path, e
+        return
+
+    pool = get_ingest_pool()
+    futures = {pool.submit(prepare_chunks, file_path, chunk_size, chunk_overlap): (file_name, file_path)
+               for file_name, file_path in saved}
+    for done, future in enumerate(as_completed(futures), start=1):
+        file_name, file_path = futures[future]
+        try:
+            result = future.result()
+        except Exception as e:
+            result = e
+        logger.info("bulk extraction progress",
+                    extra={'subject_id': subject_id, 'done': done, 'total': len(futures)})
+        yield file_name, file_path, result
+
+
+def live_collection(subject_id: int) -> str:
+    """The subject's active collection, read from the database.
+
+    Writers skip the access cache: a reindex in another process may have moved
+    the subject to a new collection since the entry was cached.
+    """
+    from app.models.subject import Subject
+    subject = db.session.get(Subject, subject_id)
+    return subject.active_collection() if subject else f"subject_{subject_id}"
+
+
+def ingest_files(subject: Dict, user_id, saved: List[Tuple[str, str]]) -> Dict:
+    """Chunk, embed and record already-saved PDFs for ``subject`` (an access-cache dict).
+
+    Every successfully indexed file gets a ``SubjectDocument`` row; the rows
+    are committed together. Files that fail are removed from disk and
+    reported in ``errors``.
+    """
+    start = time.perf_counter()
+    collection_name = live_collection(subject['id'])
+    documents, errors, indexed = [], [], []
+
+    try:
+        with span('ingest_extract'):
+            prepared = list(_prepare_all(saved, subject['chunk_size'], subject['chunk_overlap'], subject['id']))
+
+        for file_name, file_path, result in prepared:
+            if isinstance(result, Exception):
+                errors.append({'file_name': file_name, 'error': str(result)})
+                os.remove(file_path)
+                continue
+            document = SubjectDocument(
+                subject_id=subject['id'],
+                file_name=file_name,
+                file_path=file_path,
+                file_size=os.path.getsize(file_path),
+                uploaded_by=user_id
+            )
+            db.session.add(document)
+            db.session.flush()
+            try:
+                chunk_count = rag_service.index_chunks(collection_name, document.id, result)
+            except Exception as e:
+                logger.exception("document indexing failed", extra={'file_name': file_name})
+                db.session.delete(document)
+                db.session.flush()
+                errors.append({'file_name': file_name, 'error': f'Processing failed: {str(e)}'})
+                os.remove(file_path)
+                continue
+            indexed.append(document.id)
+            citations.record_chunks(document.id, subject['id'], result)
+            document.is_processed = True
+            document.chroma_collection_name = collection_name
+            documents.append((document, chunk_count))
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        for document_id in indexed:
+            rag_service.delete_document_chunks(collection_name, document_id)
+        for _, file_path in saved:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        raise
+
+    elapsed = time.perf_counter() - start
+    chunks = sum(count for _, count in documents)
+    logger.info("bulk ingest finished", extra={
+        'subject_id': subject['id'], 'processed': len(documents), 'failed': len(errors),
+        'chunks': chunks, 'seconds': round(elapsed, 3)})
+    return {
+        'processed': len(documents),
+        'failed': len(errors),
+        'chunks': chunks,
+        'seconds': round(elapsed, 3),
+        'documents': [{**document.to_dict(), 'chunks': count} for document, count in documents],
+        'errors': errors,
+    }
+
+
+def reprocess_document(document: SubjectDocument, subject: Dict) -> int:
+    """Re-chunk and re-embed one document with the subject's current settings.
+
+    The new chunks are prepared before the old ones are removed, so a file
+    that no longer parses leaves the existing index entries in place.
+    """
+    chunks = prepare_chunks(document.file_path, subject['chunk_size'], subject['chunk_overlap'])
+    collection_name = live_collection(subject['id'])
+    rag_service.delete_document_chunks(collection_name, document.id)
+    citations.forget_document(document.id)
+    document.is_processed = False
+    chunk_count = rag_service.index_chunks(collection_name, document.id, chunks)
+    citations.record_chunks(document.id, subject['id'], chunks)
+    faq_service.forget_faqs(subject['id'])
+    document.is_processed = True
+    document.chroma_collection_name = collection_name
+    return chunk_count
+
+
+def delete_document(document: SubjectDocument):
+    """Remove one document's chunks, file and row (caller commits)"""
+    collection_name = live_collection(document.subject_id)
+    rag_service.delete_document_chunks(collection_name, document.id)
+    citations.forget_document(document.id)
+    faq_service.forget_faqs(document.subject_id)
+    if os.path.exists(document.file_path):
+        os.remove(document.file_path)
+    db.session.delete(document)
@@ -1,16 +1,68 @@
-from typing import Dict, List
-import openai
-import anthropic
+import logging
+import time
+from typing import Dict, List, Optional
 import requests
+from flask import current_app, has_app_context
+from werkzeug.local import LocalProxy
 from app.config import Config
+from app.services.model_registry import model_registry
+from app.services.ollama_pool import OllamaPool
+from app.services.llm_scheduler import (FairShareScheduler, SchedulerTimeout, PRIORITY_BATCH,
+                                        PRIORITY_CLASSIFY, PRIORITY_INTERACTIVE)
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Phrases that suggest the local model is unsure of its answer
+HEDGING_PHRASES = (
+    "i don't know", "i do not know", "i'm not sure", "i am not sure", "not certain",
+    "i cannot answer", "i can't answer", "unable to answer", "does not contain",
+    "doesn't contain", "no information", "not mentioned", "not provided in the context",
+)
+
+# Local models tried when the session's provider fails, and for classification
+FALLBACK_MODELS = ('llama3.2', 'mistral')
+CLASSIFY_MODELS = ('llama3.2', 'mistral', 'llama3')
+INTENTS = ('SUBJECT_SPECIFIC', 'GENERAL_CONVERSATION', 'OFF_TOPIC')
 
 class LLMManager:
-    def __init__(self):
+    def __init__(self, app=None):
         self.providers = {
             'openai': self._call_openai,
             'anthropic': self._call_anthropic,
             'ollama': self._call_ollama
         }
+        # Coroutine versions for the ASGI chat path (app/asgi.py)
+        self.async_providers = {
+            'openai': self._acall_openai,
+            'anthropic': self._acall_anthropic,
+            'ollama': self._acall_ollama
+        }
+        self._async_client = None
+        # Async OpenAI/Anthropic clients by (provider, base URL)
+        self._sdk_clients = {}
+        # Moving average of escalated call latency per model, used to
+        # estimate what answering locally saved
+        self._escalated_seconds = {}
+        self.ollama_pool = OllamaPool(
+            Config.OLLAMA_HOSTS,
+            health_interval=Config.OLLAMA_HEALTH_INTERVAL,
+            cold_penalty=Config.OLLAMA_COLD_PENALTY
+        )
+        # Bounds concurrent LLM calls, orders them by priority tier and shares
+        # each tier fairly between students
+        self.scheduler = FairShareScheduler(
+            Config.LLM_MAX_CONCURRENCY,
+            Config.LLM_QUEUE_TIMEOUT,
+            tier_limits={PRIORITY_BATCH: Config.LLM_BATCH_MAX_CONCURRENCY},
+            tier_timeouts={PRIORITY_CLASSIFY: Config.LLM_CLASSIFY_QUEUE_TIMEOUT}
+        )
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register as the process-wide LLM manager for this app"""
+        app.extensions['llm_manager'] = self
     
     def generate_response(
         self,
@@ -18,59 +70,208 @@ class LLMManager:
         model_identifier: str,
         context: List[Dict],
         query: str,
-        learning_level: str
+        learning_level: str,
+        requester=None,
+        priority: str = PRIORITY_INTERACTIVE,
+        subject_name: str = None
     ) -> Dict:
-        """Generate response using specified LLM"""
-        
-        # Build prompt based on learning level
-        system_prompt = self._build_system_prompt(learning_level)
-        context_text = "\n\n".join([c['content'] for c in context])
-        
-        prompt = f"""Context from course materials:
-{context_text}
+        """Generate response using specified LLM.
 
-Student Question: {query}
+        Queued per ``requester`` in the ``priority`` tier; background jobs
+        pass ``PRIORITY_BATCH`` so they never delay students.
+        """
+        with self.scheduler.slot(requester, priority):
+            return self._complete(self._answer(provider, model_identifier, context, query,
+                                               learning_level, subject_name))
 
-Based on the context provided, answer the student's question."""
+    # Routing, fallbacks and classification are written once, as generators
+    # that yield each provider call as (provider, model, system_prompt,
+    # user_prompt) and receive its result (or have its exception thrown in).
+    # _complete() makes the calls with the blocking clients and _acomplete()
+    # with the asyncio ones.
+
+    def _complete(self, steps):
+        """Run ``steps`` with the blocking provider calls; returns what it returns"""
+        try:
+            call = next(steps)
+            while True:
+                provider, model, system_prompt, user_prompt = call
+                try:
+                    result = self.providers[provider](model, system_prompt, user_prompt,
+                                                      **self._settings(provider, model))
+                except Exception as e:
+                    call = steps.throw(e)
+                else:
+                    call = steps.send(result)
+        except StopIteration as done:
+            return done.value
+
+    async def _acomplete(self, steps, settings: Dict):
+        """Run ``steps`` with the coroutine provider calls; ``settings`` from ``model_settings()``"""
+        try:
+            call = next(steps)
+            while True:
+                provider, model, system_prompt, user_prompt = call
+                try:
+                    result = await self.async_providers[provider](model, system_prompt, user_prompt,
+                                                                  **settings.get((provider, model), {}))
+                except Exception as e:
+                    call = steps.throw(e)
+                else:
+                    call = steps.send(result)
+        except StopIteration as done:
+            return done.value
+
+    def _answer(self, provider, model_identifier, context, query, learning_level, subject_name=None):
+        if Config.LLM_ROUTING_MODE == 'local_first' and provider != 'ollama':
+            return (yield from self._generate_local_first(provider, model_identifier, context, query,
+                                                          learning_level, subject_name))
+        return (yield from self._generate(provider, model_identifier, context, query, learning_level,
+                                          subject_name))
+
+    def _generate_local_first(self, provider, model_identifier, context, query, learning_level,
+                              subject_name=None):
+        """Answer with the local model; escalate to ``provider`` if the answer looks unreliable"""
+        local_model = Config.LLM_LOCAL_MODEL
+        start = time.perf_counter()
+        try:
+            local = yield ('ollama', local_model, self._build_system_prompt(learning_level, subject_name),
+                           self._build_user_prompt(context, query))
+            reasons = self._escalation_reasons(local.get('content'), context)
+        except Exception as e:
+            local, reasons = None, self._local_failed(local_model, e)
+        local_seconds = time.perf_counter() - start
+
+        if not reasons:
+            return self._answered_locally(local, model_identifier, local_seconds)
+
+        start = time.perf_counter()
+        result = yield from self._generate(provider, model_identifier, context, query, learning_level,
+                                           subject_name)
+        self._escalated(model_identifier, reasons, local_seconds, time.perf_counter() - start)
+        return result
+
+    def _local_failed(self, local_model: str, error: Exception) -> List[str]:
+        metrics.LLM_ERRORS.inc(provider='ollama')
+        logger.warning("local model failed", extra={'model': local_model, 'error': str(error)})
+        return ['local_error']
+
+    def _answered_locally(self, local: Dict, model_identifier: str, local_seconds: float) -> Dict:
+        saved = max(0.0, self._escalated_seconds.get(model_identifier, 0.0) - local_seconds)
+        metrics.LLM_ROUTING.inc(decision='local', reason='confident')
+        metrics.LLM_ROUTING_SAVED_SECONDS.inc(saved)
+        logger.info("llm routing", extra={
+            'decision': 'local', 'model': Config.LLM_LOCAL_MODEL, 'escalation_model': model_identifier,
+            'local_seconds': round(local_seconds, 3), 'estimated_saved_seconds': round(saved, 3)})
+        return self._record_usage('ollama', local)
+
+    def _escalated(self, model_identifier: str, reasons: List[str], local_seconds: float,
+                   escalated_seconds: float):
+        previous = self._escalated_seconds.get(model_identifier)
+        self._escalated_seconds[model_identifier] = (
+            escalated_seconds if previous is None else 0.8 * previous + 0.2 * escalated_seconds)
+        for reason in reasons:
+            metrics.LLM_ROUTING.inc(decision='escalated', reason=reason)
+        logger.info("llm routing", extra={
+            'decision': 'escalated', 'reasons': reasons, 'model': Config.LLM_LOCAL_MODEL,
+            'escalation_model': model_identifier, 'local_seconds': round(local_seconds, 3),
+            'escalated_seconds': round(escalated_seconds, 3)})
+
+    def _escalation_reasons(self, answer: str, context: List[Dict]) -> List[str]:
+        """Why a local answer should not be trusted (empty list if it can be)"""
+        answer = (answer or '').strip()
+        if not answer or answer.startswith('Ollama Error'):
+            return ['local_error']
+        reasons = []
+        if len(answer) < Config.LLM_LOCAL_MIN_ANSWER_CHARS:
+            reasons.append('short_answer')
+        lowered = answer.lower()
+        if any(phrase in lowered for phrase in HEDGING_PHRASES):
+            reasons.append('hedging')
+        distances = [c['distance'] for c in context if c.get('distance') is not None]
+        if distances and min(distances) > Config.LLM_ESCALATE_DISTANCE:
+            reasons.append('weak_retrieval')
+        return reasons
+
+    def _generate(self, provider, model_identifier, context, query, learning_level, subject_name=None):
+        # The system prompt depends only on level and subject, so it is the
+        # same prefix for every question and Ollama can reuse its KV cache;
+        # everything that varies goes in the user message after it
+        system_prompt = self._build_system_prompt(learning_level, subject_name)
+        prompt = self._build_user_prompt(context, query)
         
         # Call appropriate provider
         try:
             if provider not in self.providers:
                 raise ValueError(f"Unsupported provider: {provider}")
                 
-            result = self.providers[provider](
-                model_identifier, 
-                system_prompt, 
-                prompt
-            )
-            
-            # Check for empty or error content in the result
-            if not result.get('content') or result.get('content').startswith("Error") or "API Key not configured" in result.get('content'):
-                raise ValueError(result.get('content') or "Empty response from provider")
-                
-            return result
+            result = yield (provider, model_identifier, system_prompt, prompt)
+            return self._record_usage(provider, self._checked(result))
             
         except Exception as e:
-            print(f"DEBUG: Primary LLM ({provider}) failed: {str(e)}")
+            self._primary_failed(provider, e)
             if provider != 'ollama':
                 # Try verified local models if primary fails
-                for fallback_model in ['llama3.2', 'mistral']:
-                    print(f"DEBUG: Falling back to Ollama with '{fallback_model}'...")
+                for fallback_model in FALLBACK_MODELS:
+                    logger.info("falling back to Ollama", extra={'model': fallback_model})
                     try:
-                        return self._call_ollama(
-                            fallback_model,
-                            system_prompt,
-                            prompt
-                        )
+                        return self._record_usage('ollama', (yield ('ollama', fallback_model, system_prompt, prompt)))
                     except Exception as fallback_e:
-                        print(f"DEBUG: Fallback to {fallback_model} failed: {str(fallback_e)}")
+                        self._fallback_failed(fallback_model, fallback_e)
                         continue
             
             # Re-raise the exception so the route handler can handle it properly
             raise Exception(f"Failed to generate response: {str(e)}")
+
+    def _checked(self, result: Dict) -> Dict:
+        """Raise on empty or error content from a provider"""
+        content = result.get('content')
+        if not content or content.startswith("Error") or "API Key not configured" in content:
+            raise ValueError(content or "Empty response from provider")
+        return result
+
+    def _primary_failed(self, provider: str, error: Exception):
+        metrics.LLM_ERRORS.inc(provider=provider)
+        logger.warning("primary LLM failed", extra={'provider': provider, 'error': str(error)})
+
+    def _fallback_failed(self, model: str, error: Exception):
+        metrics.LLM_ERRORS.inc(provider='ollama')
+        logger.warning("Ollama fallback failed", extra={'model': model, 'error': str(error)})
     
-    def _build_system_prompt(self, learning_level: str) -> str:
-        """Build system prompt based on learning level"""
+    def _settings(self, provider: str, model_identifier: str) -> Dict:
+        """Per-model max_tokens/temperature/api_endpoint from the model registry"""
+        if not has_app_context():
+            # Standalone use (benchmarks, scripts): provider defaults
+            return {}
+        return model_registry.settings(provider, model_identifier)
+
+    def model_settings(self, llm_model: Optional[Dict]) -> Dict:
+        """Settings of every model a message to ``llm_model`` may use, keyed by (provider, model).
+
+        The coroutine methods take these instead of reading the model
+        registry, which may query the database, on the event loop.
+        """
+        pairs = {('ollama', model) for model in FALLBACK_MODELS + CLASSIFY_MODELS + (Config.LLM_LOCAL_MODEL,)}
+        if llm_model:
+            pairs.add((llm_model['provider'], llm_model['model_identifier']))
+        return {pair: self._settings(*pair) for pair in pairs}
+
+    def _record_usage(self, provider: str, result: Dict) -> Dict:
+        metrics.LLM_TOKENS.inc(result.get('tokens_used') or 0, provider=provider, model=result.get('model'))
+        return result
+
+    def _build_user_prompt(self, context: List[Dict], query: str) -> str:
+        """Retrieved context and the question; the part of the prompt that changes per message"""
+        context_text = "\n\n".join([c['content'] for c in context])
+        return f"""Context from course materials:
+{context_text}
+
+Student Question: {query}
+
+Based on the context provided, answer the student's question."""
+
+    def _build_system_prompt(self, learning_level: str, subject_name: str = None) -> str:
+        """Build system prompt based on learning level and subject"""
         prompts = {
             'beginner': """You are a patient and supportive educational assistant. 
 Explain concepts in simple terms, use analogies, and break down complex ideas 
@@ -87,125 +288,337 @@ Provide in-depth explanations, discuss nuances, edge cases, and connections
 to related concepts. Include technical details and theoretical foundations. 
 Assume the student has solid background knowledge."""
         }
-        return prompts.get(learning_level, prompts['intermediate'])
+        system_prompt = prompts.get(learning_level, prompts['intermediate'])
+        if subject_name:
+            system_prompt += f"""
+
+You are assisting students of the course "{subject_name}". Messages may start 
+with excerpts from the course materials, followed by the student's question. 
+Base your answer on those excerpts when present, and say so when they do not 
+cover the question."""
+        return system_prompt
     
-    def _call_openai(self, model: str, system_prompt: str, user_prompt: str) -> Dict:
-        """Call OpenAI API"""
+    def _call_openai(self, model: str, system_prompt: str, user_prompt: str, max_tokens: int = None,
+                     temperature: float = None, api_endpoint: str = None) -> Dict:
+        """Call OpenAI API (or an OpenAI-compatible ``api_endpoint``)"""
         if not Config.OPENAI_API_KEY:
-            return {'content': 'OpenAI API Key not configured.', 'tokens_used': 0, 'model': model}
+            return self._not_configured('OpenAI', model)
 
-        client = openai.OpenAI(api_key=Config.OPENAI_API_KEY)
-        
+        # Provider SDKs are only imported once a configured provider is used
+        import openai
+        client = openai.OpenAI(api_key=Config.OPENAI_API_KEY, base_url=api_endpoint)
         response = client.chat.completions.create(
-            model=model,
-            messages=[
+            **self._openai_request(model, system_prompt, user_prompt, max_tokens, temperature))
+        return self._openai_result(model, response)
+
+    def _openai_request(self, model: str, system_prompt: str, user_prompt: str, max_tokens: int = None,
+                        temperature: float = None) -> Dict:
+        return {
+            'model': model,
+            'messages': [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
-            temperature=0.7,
-            max_tokens=1500
-        )
-        
+            'temperature': Config.LLM_DEFAULT_TEMPERATURE if temperature is None else temperature,
+            'max_tokens': max_tokens or Config.LLM_DEFAULT_MAX_TOKENS
+        }
+
+    def _openai_result(self, model: str, response) -> Dict:
         return {
             'content': response.choices[0].message.content,
             'tokens_used': response.usage.total_tokens,
             'model': model
         }
     
-    def _call_anthropic(self, model: str, system_prompt: str, user_prompt: str) -> Dict:
+    def _call_anthropic(self, model: str, system_prompt: str, user_prompt: str, max_tokens: int = None,
+                        temperature: float = None, api_endpoint: str = None) -> Dict:
         """Call Anthropic Claude API"""
         if not Config.ANTHROPIC_API_KEY:
-            return {'content': 'Anthropic API Key not configured.', 'tokens_used': 0, 'model': model}
+            return self._not_configured('Anthropic', model)
 
-        client = anthropic.Anthropic(api_key=Config.ANTHROPIC_API_KEY)
-        
+        import anthropic
+        client = anthropic.Anthropic(api_key=Config.ANTHROPIC_API_KEY, base_url=api_endpoint)
         response = client.messages.create(
-            model=model,
-            max_tokens=1500,
-            system=system_prompt,
-            messages=[
+            **self._anthropic_request(model, system_prompt, user_prompt, max_tokens, temperature))
+        return self._anthropic_result(model, response)
+
+    def _anthropic_request(self, model: str, system_prompt: str, user_prompt: str, max_tokens: int = None,
+                           temperature: float = None) -> Dict:
+        return {
+            'model': model,
+            'max_tokens': max_tokens or Config.LLM_DEFAULT_MAX_TOKENS,
+            'temperature': Config.LLM_DEFAULT_TEMPERATURE if temperature is None else temperature,
+            'system': system_prompt,
+            'messages': [
                 {"role": "user", "content": user_prompt}
             ]
-        )
-        
+        }
+
+    def _anthropic_result(self, model: str, response) -> Dict:
         return {
             'content': response.content[0].text,
             'tokens_used': response.usage.input_tokens + response.usage.output_tokens,
             'model': model
         }
+
+    def _not_configured(self, provider_name: str, model: str) -> Dict:
+        return {'content': f'{provider_name} API Key not configured.', 'tokens_used': 0, 'model': model}
     
-    def _call_ollama(self, model: str, system_prompt: str, user_prompt: str) -> Dict:
-        """Call Ollama local LLM"""
-        url = f"{Config.OLLAMA_BASE_URL}/api/generate"
-        
-        payload = {
+    def _call_ollama(self, model: str, system_prompt: str, user_prompt: str, max_tokens: int = None,
+                     temperature: float = None, api_endpoint: str = None) -> Dict:
+        """Call Ollama local LLM.
+
+        Uses the chat endpoint with a separate system message: Ollama keeps the
+        evaluated prompt of a loaded model and only evaluates the part of the
+        next prompt after the longest common prefix, so a stable system message
+        is processed once rather than on every request. ``keep_alive`` keeps the
+        model, and with it that cache, loaded between requests.
+
+        Calls are spread over ``OLLAMA_HOSTS`` by the host pool; a host that
+        refuses the connection, times out or answers with a 5xx is marked down
+        and the next one is tried. A model with its own ``api_endpoint``
+        always goes to that host.
+        """
+        payload = self._ollama_payload(model, system_prompt, user_prompt, max_tokens, temperature)
+        exchange = self._ollama_exchange(model, api_endpoint)
+        try:
+            base_url = next(exchange)
+            while True:
+                try:
+                    response = self._post_ollama(base_url, payload)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    base_url = exchange.throw(ConnectionError(str(e)))
+                else:
+                    base_url = exchange.send(response)
+        except StopIteration as done:
+            return done.value
+
+    def _ollama_exchange(self, model: str, api_endpoint: str = None):
+        """Host selection and failover of one Ollama call, shared by both transports.
+
+        Yields the base URL to post to and receives the response; transport
+        failures are thrown in as ``ConnectionError``. Returns the result dict.
+        """
+        if api_endpoint:
+            try:
+                response = yield api_endpoint.rstrip('/')
+            except ConnectionError:
+                raise ConnectionError('Could not connect to Ollama. Ensure it is running.')
+            return self._parse_ollama(model, response)
+
+        tried, failed = [], None
+        while len(tried) < len(self.ollama_pool.hosts):
+            with self.ollama_pool.host(model, exclude=tried) as base_url:
+                tried.append(base_url)
+                try:
+                    response = yield base_url
+                except ConnectionError as e:
+                    self.ollama_pool.mark_down(base_url, str(e))
+                    continue
+            if response.status_code >= 500:
+                self.ollama_pool.mark_down(base_url, f"HTTP {response.status_code}")
+                failed = response
+                continue
+            if response.status_code == 404:
+                # Model not pulled on this host
+                failed = response
+                continue
+            if response.status_code == 200:
+                self.ollama_pool.model_loaded(base_url, model)
+            return self._parse_ollama(model, response)
+        if failed is not None:
+            return self._parse_ollama(model, failed)
+        raise ConnectionError('Could not connect to Ollama. Ensure it is running.')
+
+    def _ollama_payload(self, model: str, system_prompt: str, user_prompt: str, max_tokens: int = None,
+                        temperature: float = None) -> Dict:
+        return {
             "model": model,
-            "prompt": f"{system_prompt}\n\n{user_prompt}",
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
             "stream": False,
+            "keep_alive": Config.OLLAMA_KEEP_ALIVE,
             "options": {
-                "temperature": 0.7,
+                "temperature": Config.LLM_DEFAULT_TEMPERATURE if temperature is None else temperature,
+                "num_predict": max_tokens or Config.LLM_DEFAULT_MAX_TOKENS,
                 # Removed num_gpu: 0 to allow GPU acceleration if available
             }
         }
-        
-        try:
-            response = requests.post(url, json=payload, timeout=300) # Increased timeout
-            if response.status_code == 200:
-                result = response.json()
-                return {
-                    'content': result.get('response', ''),
-                    'tokens_used': result.get('eval_count', 0),
-                    'model': model
-                }
-            else:
-                 return {'content': f"Ollama Error: {response.text}", 'tokens_used': 0, 'model': model}
 
-        except requests.exceptions.ConnectionError:
-            raise ConnectionError('Could not connect to Ollama. Ensure it is running.')
+    def _post_ollama(self, base_url: str, payload: Dict) -> requests.Response:
+        return requests.post(f"{base_url}/api/chat", json=payload, timeout=300) # Increased timeout
 
-    def classify_intent(self, query: str, subject_name: str) -> str:
+    def _parse_ollama(self, model: str, response) -> Dict:
+        """Result dict from a ``requests`` or ``httpx`` response of /api/chat"""
+        if response.status_code == 200:
+            result = response.json()
+            if result.get('prompt_eval_duration'):
+                metrics.LLM_PROMPT_EVAL_SECONDS.observe(result['prompt_eval_duration'] / 1e9, model=model)
+            return {
+                'content': (result.get('message') or {}).get('content', ''),
+                'tokens_used': result.get('eval_count', 0),
+                'model': model
+            }
+        else:
+             return {'content': f"Ollama Error: {response.text}", 'tokens_used': 0, 'model': model}
+
+    def classify_intent(self, query: str, subject_name: str, requester=None,
+                        priority: str = PRIORITY_CLASSIFY) -> str:
         """
         Classify the intent of the user query.
         Returns: 'SUBJECT_SPECIFIC', 'GENERAL_CONVERSATION', or 'OFF_TOPIC'
         """
-        classification_prompt = f"""
-        You are an educational assistant for the subject: "{subject_name}".
-        Your task is to classify the user's input into one of three categories:
-        
-        1. SUBJECT_SPECIFIC: The user is asking a question about {subject_name} or related concepts that require course materials to answer.
-        2. GENERAL_CONVERSATION: The user is greeting you, asking how you are, or asking about your capabilities as an educational assistant.
-        3. OFF_TOPIC: The user is asking about something completely unrelated to {subject_name} or general educational support (e.g., sports, entertainment, or other unrelated subjects).
+        try:
+            with self.scheduler.slot(requester, priority):
+                return self._complete(self._classify(query, subject_name))
+        except SchedulerTimeout:
+            if priority != PRIORITY_CLASSIFY:
+                # Background jobs wait their turn; a timeout fails them like their other calls
+                raise
+            # Backend saturated: skip classification rather than delay the
+            # answer; retrieving context is harmless for any kind of message
+            logger.warning("classification skipped, LLM queue full", extra={'requester': requester})
+            return 'SUBJECT_SPECIFIC'
 
-        User Input: "{query}"
+    def _classification_prompt(self, subject_name: str) -> str:
+        """Classification instructions; sent as the system message so only the user input varies"""
+        return f"""You are an educational assistant for the subject: "{subject_name}".
+Your task is to classify the user's input into one of three categories:
 
-        Instructions:
-        - Respond ONLY with the category name: SUBJECT_SPECIFIC, GENERAL_CONVERSATION, or OFF_TOPIC.
-        - Do not provide any other text.
-        """
-        
+1. SUBJECT_SPECIFIC: The user is asking a question about {subject_name} or related concepts that require course materials to answer.
+2. GENERAL_CONVERSATION: The user is greeting you, asking how you are, or asking about your capabilities as an educational assistant.
+3. OFF_TOPIC: The user is asking about something completely unrelated to {subject_name} or general educational support (e.g., sports, entertainment, or other unrelated subjects).
+
+Instructions:
+- Respond ONLY with the category name: SUBJECT_SPECIFIC, GENERAL_CONVERSATION, or OFF_TOPIC.
+- Do not provide any other text."""
+
+    def _classify(self, query: str, subject_name: str):
+        classification_prompt = self._classification_prompt(subject_name)
+        for model in CLASSIFY_MODELS:
+            try:
+                classification = yield ('ollama', model, classification_prompt, query)
+                intent = self._parse_intent(model, classification['content'])
+                if intent:
+                    return intent
+            except Exception as e:
+                metrics.LLM_ERRORS.inc(provider='ollama')
+                logger.warning("classification failed", extra={'model': model, 'error': str(e)})
+        # If all else fails, default to general (allows user to keep talking)
+        return 'GENERAL_CONVERSATION'
+
+    def _parse_intent(self, model: str, content: str):
+        raw_intent = (content or '').strip().upper()
+        logger.debug("raw classification", extra={'model': model, 'raw_intent': raw_intent})
+        # More robust matching: check for keywords in the response
+        return next((intent for intent in INTENTS if intent in raw_intent), None)
+
+
+    # Coroutine variants for the ASGI chat path: same routing, fallbacks and
+    # scheduling, but waiting on the event loop instead of holding a thread
+
+    async def agenerate_response(
+        self,
+        provider: str,
+        model_identifier: str,
+        context: List[Dict],
+        query: str,
+        learning_level: str,
+        requester=None,
+        priority: str = PRIORITY_INTERACTIVE,
+        subject_name: str = None,
+        settings: Dict = None
+    ) -> Dict:
+        """``generate_response()`` for coroutines; ``settings`` from ``model_settings()``"""
+        async with self.scheduler.aslot(requester, priority):
+            return await self._acomplete(self._answer(provider, model_identifier, context, query,
+                                                      learning_level, subject_name), settings or {})
+
+    async def aclassify_intent(self, query: str, subject_name: str, requester=None, settings: Dict = None,
+                               priority: str = PRIORITY_CLASSIFY) -> str:
+        """``classify_intent()`` for coroutines; ``settings`` from ``model_settings()``"""
         try:
-            # Try mistral first if available, then llama3.2
-            models_to_try = ['llama3.2', 'mistral', 'llama3']
-            for model in models_to_try:
+            async with self.scheduler.aslot(requester, priority):
+                return await self._acomplete(self._classify(query, subject_name), settings or {})
+        except SchedulerTimeout:
+            if priority != PRIORITY_CLASSIFY:
+                raise
+            logger.warning("classification skipped, LLM queue full", extra={'requester': requester})
+            return 'SUBJECT_SPECIFIC'
+
+    async def _acall_openai(self, model: str, system_prompt: str, user_prompt: str, max_tokens: int = None,
+                            temperature: float = None, api_endpoint: str = None) -> Dict:
+        if not Config.OPENAI_API_KEY:
+            return self._not_configured('OpenAI', model)
+
+        response = await self._sdk_client('openai', api_endpoint).chat.completions.create(
+            **self._openai_request(model, system_prompt, user_prompt, max_tokens, temperature))
+        return self._openai_result(model, response)
+
+    async def _acall_anthropic(self, model: str, system_prompt: str, user_prompt: str, max_tokens: int = None,
+                               temperature: float = None, api_endpoint: str = None) -> Dict:
+        if not Config.ANTHROPIC_API_KEY:
+            return self._not_configured('Anthropic', model)
+
+        response = await self._sdk_client('anthropic', api_endpoint).messages.create(
+            **self._anthropic_request(model, system_prompt, user_prompt, max_tokens, temperature))
+        return self._anthropic_result(model, response)
+
+    async def _acall_ollama(self, model: str, system_prompt: str, user_prompt: str, max_tokens: int = None,
+                            temperature: float = None, api_endpoint: str = None) -> Dict:
+        """``_call_ollama()`` over a shared ``httpx.AsyncClient``"""
+        import httpx
+
+        payload = self._ollama_payload(model, system_prompt, user_prompt, max_tokens, temperature)
+        client = self._ollama_client()
+        exchange = self._ollama_exchange(model, api_endpoint)
+        try:
+            base_url = next(exchange)
+            while True:
                 try:
-                    classification = self._call_ollama(
-                        model,
-                        "You are a helpful assistant that classifies user intent.",
-                        classification_prompt
-                    )
-                    raw_intent = classification['content'].strip().upper()
-                    print(f"DEBUG: Raw classification from {model}: {raw_intent}")
-                    
-                    # More robust matching: check for keywords in the response
-                    if 'SUBJECT_SPECIFIC' in raw_intent: return 'SUBJECT_SPECIFIC'
-                    if 'GENERAL_CONVERSATION' in raw_intent: return 'GENERAL_CONVERSATION'
-                    if 'OFF_TOPIC' in raw_intent: return 'OFF_TOPIC'
-                    
-                except Exception as e:
-                    print(f"DEBUG: Classification with {model} failed: {str(e)}")
-                    continue
-            
-            # If all else fails, default to general (allows user to keep talking)
-            return 'GENERAL_CONVERSATION'
-        except Exception:
-            return 'GENERAL_CONVERSATION'
+                    response = await client.post(f"{base_url}/api/chat", json=payload)
+                except (httpx.ConnectError, httpx.TimeoutException) as e:
+                    base_url = exchange.throw(ConnectionError(str(e) or type(e).__name__))
+                else:
+                    base_url = exchange.send(response)
+        except StopIteration as done:
+            return done.value
+
+    def _ollama_client(self):
+        """HTTP client shared by all coroutines of this process (keeps connections to the hosts open)"""
+        if self._async_client is None:
+            import httpx
+            self._async_client = httpx.AsyncClient(timeout=300, limits=httpx.Limits(max_connections=None))
+        return self._async_client
+
+    def _sdk_client(self, provider: str, api_endpoint: str = None):
+        """Async OpenAI/Anthropic client per base URL, shared like ``_ollama_client()``"""
+        key = (provider, api_endpoint)
+        client = self._sdk_clients.get(key)
+        if client is None:
+            if provider == 'openai':
+                import openai
+                client = openai.AsyncOpenAI(api_key=Config.OPENAI_API_KEY, base_url=api_endpoint)
+            else:
+                import anthropic
+                client = anthropic.AsyncAnthropic(api_key=Config.ANTHROPIC_API_KEY, base_url=api_endpoint)
+            self._sdk_clients[key] = client
+        return client
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        clients, self._sdk_clients = list(self._sdk_clients.values()), {}
+        for client in clients:
+            await client.close()
+
+
+def get_llm_manager() -> LLMManager:
+    """LLM manager shared by all blueprints of the current app"""
+    return current_app.extensions['llm_manager']
+
+
+llm_manager = LocalProxy(get_llm_manager)
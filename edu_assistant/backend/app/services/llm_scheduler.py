@@ -0,0 +1,177 @@
+"""Priority and fair-share admission of LLM calls.
+
+At most ``LLM_MAX_CONCURRENCY`` LLM calls run at once per process. When all
+slots are busy, callers queue by priority tier and, within a tier, per
+requester (the student's JWT identity):
+
+- ``classify``: intent classification. Short calls, served first, with a short
+  queue deadline (``LLM_CLASSIFY_QUEUE_TIMEOUT``) so a busy backend delays a
+  message by seconds rather than minutes.
+- ``interactive``: student-facing answers.
+- ``batch``: background generation (FAQ pre-generation, summaries, evaluation
+  runs). Only dispatched when no interactive work is queued, and never holds
+  more than ``LLM_BATCH_MAX_CONCURRENCY`` slots.
+
+Freed slots go round-robin across requesters of the chosen tier, so one
+student firing many messages waits behind their own queue instead of
+everybody else's.
+
+Threads wait with ``slot()``; coroutines (the ASGI chat path) with ``aslot()``,
+which queues in the same tiers without holding a thread while waiting.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_CLASSIFY = 'classify'
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_BATCH = 'batch'
+# Highest priority first
+TIERS = (PRIORITY_CLASSIFY, PRIORITY_INTERACTIVE, PRIORITY_BATCH)
+
+
+class SchedulerTimeout(Exception):
+    """No LLM slot became free within the queue timeout"""
+
+
+class _Waiter:
+    __slots__ = ('event', 'granted', 'notify')
+
+    def __init__(self, notify=None):
+        self.event = threading.Event()
+        self.granted = False
+        # Called (under the scheduler lock) when granted; wakes async waiters
+        self.notify = notify
+
+
+class FairShareScheduler:
+    def __init__(self, max_concurrency: int, queue_timeout: float = None,
+                 tier_limits: Dict[str, int] = None, tier_timeouts: Dict[str, float] = None):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.tier_limits = tier_limits or {}
+        self.tier_timeouts = tier_timeouts or {}
+        self._lock = threading.Lock()
+        self._running = {tier: 0 for tier in TIERS}
+        # tier -> requester -> deque of waiters; key order is the round-robin order
+        self._queues = {tier: OrderedDict() for tier in TIERS}
+
+    def _can_start(self, tier: str) -> bool:
+        return (sum(self._running.values()) < self.max_concurrency
+                and self._running[tier] < self.tier_limits.get(tier, self.max_concurrency))
+
+    def _enqueue(self, key, tier: str, notify=None):
+        """Take a slot now (returns None) or queue and return a waiter"""
+        with self._lock:
+            # Start now only if nobody of equal or higher priority is waiting
+            ahead = any(self._queues[t] for t in TIERS[:TIERS.index(tier) + 1])
+            if not ahead and self._can_start(tier):
+                self._running[tier] += 1
+                return None
+            waiter = _Waiter(notify)
+            self._queues[tier].setdefault(key, deque()).append(waiter)
+            return waiter
+
+    def _abandon(self, key, tier: str, waiter: _Waiter) -> bool:
+        """Dequeue a waiter that gave up; False if it was granted meanwhile"""
+        with self._lock:
+            if waiter.granted:
+                return False
+            queue = self._queues[tier][key]
+            queue.remove(waiter)
+            if not queue:
+                del self._queues[tier][key]
+            return True
+
+    def _acquire(self, key, tier: str):
+        waiter = self._enqueue(key, tier)
+        if waiter is None or waiter.event.wait(self.tier_timeouts.get(tier, self.queue_timeout)):
+            return
+        if self._abandon(key, tier, waiter):
+            raise SchedulerTimeout('The assistant is busy, please try again shortly')
+        # Otherwise granted between the timeout and taking the lock
+
+    async def _aacquire(self, key, tier: str):
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def wake():
+            if not granted.done():
+                granted.set_result(True)
+
+        waiter = self._enqueue(key, tier, notify=lambda: loop.call_soon_threadsafe(wake))
+        if waiter is None:
+            return
+        try:
+            await asyncio.wait_for(granted, self.tier_timeouts.get(tier, self.queue_timeout))
+        except asyncio.TimeoutError:
+            if self._abandon(key, tier, waiter):
+                raise SchedulerTimeout('The assistant is busy, please try again shortly')
+        except asyncio.CancelledError:
+            # Client went away: give back a slot granted in the meantime
+            if not self._abandon(key, tier, waiter):
+                self._release(tier)
+            raise
+
+    def _dispatch(self):
+        """Hand free slots to waiters, highest tier first (lock held)"""
+        while True:
+            tier = next((t for t in TIERS if self._queues[t] and self._can_start(t)), None)
+            if tier is None:
+                return
+            queues = self._queues[tier]
+            key, queue = next(iter(queues.items()))
+            waiter = queue.popleft()
+            del queues[key]
+            if queue:
+                queues[key] = queue  # back of the line
+            self._running[tier] += 1
+            waiter.granted = True
+            waiter.event.set()
+            if waiter.notify:
+                waiter.notify()
+
+    def _release(self, tier: str):
+        with self._lock:
+            self._running[tier] -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, key=None, priority: str = PRIORITY_INTERACTIVE):
+        """Hold one LLM slot of the given priority tier for the duration of the block"""
+        start = time.perf_counter()
+        self._acquire(key, priority)
+        metrics.LLM_QUEUE_SECONDS.observe(time.perf_counter() - start, tier=priority)
+        try:
+            yield
+        finally:
+            self._release(priority)
+
+    @asynccontextmanager
+    async def aslot(self, key=None, priority: str = PRIORITY_INTERACTIVE):
+        """``slot()`` for coroutines: waits on the event loop instead of blocking a thread"""
+        start = time.perf_counter()
+        await self._aacquire(key, priority)
+        metrics.LLM_QUEUE_SECONDS.observe(time.perf_counter() - start, tier=priority)
+        try:
+            yield
+        finally:
+            self._release(priority)
+
+    def stats(self):
+        with self._lock:
+            return {
+                tier: {
+                    'running': self._running[tier],
+                    'waiting': sum(len(q) for q in self._queues[tier].values()),
+                    'requesters_waiting': len(self._queues[tier]),
+                }
+                for tier in TIERS
+            }
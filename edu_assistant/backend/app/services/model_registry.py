@@ -0,0 +1,60 @@
+from typing import Dict, List, Optional
+from app.config import Config
+from app.utils.ttl_cache import TTLCache
+
+
+class ModelRegistry:
+    """Per-process cache of the active LLM models and their generation settings.
+
+    Loaded from ``LLMModel`` in one query and kept for ``Config.MODEL_REGISTRY_TTL``
+    seconds; the admin model routes invalidate it explicitly.
+    """
+
+    def __init__(self, ttl: int = None):
+        self.ttl = Config.MODEL_REGISTRY_TTL if ttl is None else ttl
+        self._cache = TTLCache(self.ttl, 'models')
+
+    def _load(self) -> List[Dict]:
+        return self._cache.get_or_load('active', self._query)
+
+    def _query(self) -> List[Dict]:
+        from app.models.llm import LLMModel
+        rows = LLMModel.query.filter_by(is_active=True).order_by(LLMModel.id).all()
+        return [{
+            'id': m.id,
+            'name': m.name,
+            'provider': m.provider,
+            'model_identifier': m.model_identifier,
+            **m.generation_settings()
+        } for m in rows]
+
+    def active(self) -> List[Dict]:
+        return list(self._load())
+
+    def get(self, model_id) -> Optional[Dict]:
+        """Active model by id, or None"""
+        if model_id is None:
+            return None
+        return next((m for m in self._load() if m['id'] == int(model_id)), None)
+
+    def default(self) -> Optional[Dict]:
+        """First active model (what sessions without a valid model use)"""
+        models = self._load()
+        return models[0] if models else None
+
+    def settings(self, provider: str, model_identifier: str) -> Dict:
+        """Generation settings for a provider/model pair; defaults if it has no active row"""
+        for m in self._load():
+            if m['provider'] == provider and m['model_identifier'] == model_identifier:
+                return {k: m[k] for k in ('max_tokens', 'temperature', 'api_endpoint')}
+        return {
+            'max_tokens': Config.LLM_DEFAULT_MAX_TOKENS,
+            'temperature': Config.LLM_DEFAULT_TEMPERATURE,
+            'api_endpoint': None
+        }
+
+    def invalidate(self):
+        self._cache.clear()
+
+
+model_registry = ModelRegistry()
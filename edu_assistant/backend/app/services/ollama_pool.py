@@ -0,0 +1,130 @@
+"""Routing of Ollama calls across several hosts.
+
+``OLLAMA_HOSTS`` lists the Ollama servers (default: just ``OLLAMA_BASE_URL``).
+Each call goes to the healthy host with the fewest requests in flight from
+this process, where a host that does not have the model loaded counts as
+``OLLAMA_COLD_PENALTY`` extra requests: calls stick to hosts that already hold
+the model (and its prompt cache) until those are busier than loading it
+elsewhere would cost.
+
+A daemon thread polls every host's ``/api/ps`` each ``OLLAMA_HEALTH_INTERVAL``
+seconds for liveness and loaded models (only with two or more hosts). A host
+that refuses a connection is taken out of rotation until its next successful
+check or call; with every host down, calls still try them.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Set
+import requests
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaHost:
+    __slots__ = ('url', 'healthy', 'outstanding', 'models', 'checked_at')
+
+    def __init__(self, url: str):
+        self.url = url.rstrip('/')
+        # Assumed up until the first check says otherwise
+        self.healthy = True
+        self.outstanding = 0
+        self.models: Set[str] = set()
+        self.checked_at = None
+
+    def has_model(self, model: str) -> bool:
+        return model in self.models or f"{model}:latest" in self.models
+
+
+class OllamaPool:
+    def __init__(self, urls: List[str], health_interval: float = 15.0, cold_penalty: float = 2.0,
+                 check_timeout: float = 2.0):
+        self.hosts = [OllamaHost(url) for url in urls]
+        self.health_interval = health_interval
+        self.cold_penalty = cold_penalty
+        self.check_timeout = check_timeout
+        self._lock = threading.Lock()
+        self._checker_pid = None
+
+    def _pick(self, model: str, exclude) -> OllamaHost:
+        candidates = [h for h in self.hosts if h.url not in exclude]
+        # With every host marked down, try them anyway rather than fail outright
+        healthy = [h for h in candidates if h.healthy] or candidates
+        if not healthy:
+            raise ConnectionError('No Ollama hosts left to try')
+        return min(healthy, key=lambda h: h.outstanding + (0 if h.has_model(model) else self.cold_penalty))
+
+    @contextmanager
+    def host(self, model: str, exclude=()):
+        """Reserve the best host for ``model`` for the duration of the block; yields its base URL"""
+        self._ensure_checker()
+        with self._lock:
+            chosen = self._pick(model, exclude)
+            chosen.outstanding += 1
+        metrics.OLLAMA_REQUESTS.inc(host=chosen.url)
+        try:
+            yield chosen.url
+        finally:
+            with self._lock:
+                chosen.outstanding -= 1
+
+    def model_loaded(self, url: str, model: str):
+        """Record that a successful call left ``model`` loaded on ``url`` (so the host is up)"""
+        with self._lock:
+            for h in self.hosts:
+                if h.url == url:
+                    h.models.add(model)
+                    if not h.healthy:
+                        h.healthy = True
+                        logger.info("Ollama host back up", extra={'host': url})
+
+    def mark_down(self, url: str, error: str = None):
+        with self._lock:
+            for h in self.hosts:
+                if h.url == url and h.healthy:
+                    h.healthy = False
+                    logger.warning("Ollama host marked down", extra={'host': url, 'error': error})
+
+    def check(self):
+        """Poll every host's /api/ps once"""
+        for h in self.hosts:
+            try:
+                response = requests.get(f"{h.url}/api/ps", timeout=self.check_timeout)
+                response.raise_for_status()
+                models = {m.get('name') or m.get('model') for m in response.json().get('models', [])}
+                healthy = True
+            except Exception as e:
+                models, healthy = set(), False
+                logger.debug("Ollama health check failed", extra={'host': h.url, 'error': str(e)})
+            with self._lock:
+                if healthy and not h.healthy:
+                    logger.info("Ollama host back up", extra={'host': h.url})
+                h.healthy, h.models, h.checked_at = healthy, models, time.time()
+
+    def _check_loop(self):
+        while True:
+            self.check()
+            time.sleep(self.health_interval)
+
+    def _ensure_checker(self):
+        """Start the health-check thread once per process (threads do not survive fork)"""
+        if len(self.hosts) < 2 or self._checker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._checker_pid == os.getpid():
+                return
+            self._checker_pid = os.getpid()
+        threading.Thread(target=self._check_loop, name='ollama-health', daemon=True).start()
+
+    def stats(self) -> List[Dict]:
+        with self._lock:
+            return [{
+                'url': h.url,
+                'healthy': h.healthy,
+                'outstanding': h.outstanding,
+                'models': sorted(h.models),
+                'checked_at': h.checked_at,
+            } for h in self.hosts]
@@ -1,142 +1,284 @@
-import chromadb
-from chromadb.config import Settings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from sentence_transformers import SentenceTransformer
-import PyPDF2
+import hashlib
+import logging
 from typing import List, Dict
 from app.config import Config
+from app.services.document_chunker import chunk_pages, extract_pages
+from app.utils.metrics import record_cache, span
 import os
+import threading
+from flask import current_app
+from werkzeug.local import LocalProxy
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_ids(document_id: int, chunks: List[Dict]) -> List[str]:
+    """Ids of a document's chunks in the vector store and the citation index.
+
+    Derived from each chunk's text, page, heading and offset: re-indexing
+    keeps a chunk's id only if everything a citation shows for it is
+    unchanged, so stored message citations never point at different text.
+    """
+    ids, seen = [], {}
+    for chunk in chunks:
+        key = f"{chunk.get('page_number')}\0{chunk.get('heading') or ''}\0{chunk.get('offset')}\0{chunk['text']}"
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        # Identical chunks (rare) still need distinct ids
+        seen[digest] = seen.get(digest, 0) + 1
+        ids.append(f"doc_{document_id}_{digest}" + (f"_{seen[digest]}" if seen[digest] > 1 else ""))
+    return ids
+
 
 class RAGService:
-    def __init__(self):
-        # Initialize chroma client
-        self.client = chromadb.PersistentClient(
-            path=Config.CHROMA_PERSIST_DIRECTORY,
-            settings=Settings(anonymized_telemetry=False)
-        )
+    def __init__(self, app=None):
+        # Chroma client and embedding model are opened on first use so that a
+        # preloading server (gunicorn --preload) only loads them after fork.
+        # Their libraries (chromadb, sentence-transformers, langchain, PyPDF2)
+        # are imported lazily too, keeping app startup and CLI commands fast.
+        self._client = None
         self._embedding_model = None
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=Config.CHUNK_SIZE,
-            chunk_overlap=Config.CHUNK_OVERLAP
-        )
+        self._text_splitters = {}
+        # Collection handles by name, so queries skip Chroma's metadata lookup
+        self._collections = {}
+        # Warm-up and request threads may race to open the client or the same handle
+        self._lock = threading.Lock()
+        self._collections_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register as the process-wide RAG service for this app"""
+        app.extensions['rag_service'] = self
+
+    def reset(self):
+        """Drop handles inherited from a parent process (call after fork)"""
+        self._lock = threading.Lock()
+        self._collections_lock = threading.Lock()
+        self._client = None
+        self._embedding_model = None
+        self._collections = {}
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import chromadb
+                    from chromadb.config import Settings
+                    self._client = chromadb.PersistentClient(
+                        path=Config.CHROMA_PERSIST_DIRECTORY,
+                        settings=Settings(anonymized_telemetry=False)
+                    )
+        return self._client
+
+    def get_collection(self, collection_name: str, create: bool = False, metadata: Dict = None):
+        """Cached collection handle; raises Chroma's ``NotFoundError`` if missing and not ``create``"""
+        collection = self._collections.get(collection_name)
+        record_cache('collection', collection is not None)
+        if collection is None:
+            with self._collections_lock:
+                collection = self._collections.get(collection_name)
+                if collection is None:
+                    if create:
+                        collection = self.client.get_or_create_collection(name=collection_name,
+                                                                          metadata=metadata)
+                    else:
+                        collection = self.client.get_collection(collection_name)
+                    self._collections[collection_name] = collection
+        return collection
+
+    def invalidate_collection(self, *collection_names: str):
+        for name in collection_names:
+            self._collections.pop(name, None)
+
+    def _with_collection(self, collection_name: str, fn, create: bool = False):
+        """``fn(collection)``, refetching the handle once if it went stale.
+
+        Handles point at a collection id; if another process deleted or
+        swapped the collection since, Chroma reports it not found.
+        """
+        from chromadb.errors import NotFoundError
+        try:
+            return fn(self.get_collection(collection_name, create))
+        except NotFoundError:
+            self.invalidate_collection(collection_name)
+            return fn(self.get_collection(collection_name, create))
 
     @property
     def embedding_model(self):
         if self._embedding_model is None:
-            print("Loading embedding model...")
-            self._embedding_model = SentenceTransformer(Config.EMBEDDING_MODEL)
+            with self._lock:
+                if self._embedding_model is None:
+                    self._embedding_model = self._load_embedding_model()
         return self._embedding_model
+
+    def _load_embedding_model(self):
+        from app.services.embeddings import RemoteEmbeddingModel, load_local_embedding_model
+        if Config.EMBEDDING_SERVICE_URL:
+            logger.info("using embedding service", extra={'url': Config.EMBEDDING_SERVICE_URL})
+            return RemoteEmbeddingModel(Config.EMBEDDING_SERVICE_URL)
+        logger.info("loading embedding model", extra={'backend': Config.EMBEDDING_BACKEND})
+        return load_local_embedding_model()
+
+    @property
+    def text_splitter(self):
+        return self.get_text_splitter()
+
+    def get_text_splitter(self, chunk_size: int = None, chunk_overlap: int = None):
+        """Text splitter for the given settings (Config defaults when omitted)"""
+        key = (chunk_size or Config.CHUNK_SIZE,
+               Config.CHUNK_OVERLAP if chunk_overlap is None else chunk_overlap)
+        splitter = self._text_splitters.get(key)
+        if splitter is None:
+            from langchain_text_splitters import RecursiveCharacterTextSplitter
+            splitter = self._text_splitters[key] = RecursiveCharacterTextSplitter(
+                chunk_size=key[0],
+                chunk_overlap=key[1]
+            )
+        return splitter
     
-    def extract_text_from_pdf(self, pdf_path: str) -> str:
-        """Extract text from PDF file"""
-        text = ""
+    def extract_pages_from_pdf(self, pdf_path: str) -> List[str]:
+        """Extract per-page text from PDF file"""
         try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text += page.extract_text()
+            return extract_pages(pdf_path)
         except Exception as e:
-            print(f"Error reading PDF {pdf_path}: {e}")
-            return ""
-        return text
+            logger.error("error reading PDF", extra={'path': pdf_path, 'error': str(e)})
+            return []
+
+    def extract_text_from_pdf(self, pdf_path: str) -> str:
+        """Extract text from PDF file"""
+        return "".join(self.extract_pages_from_pdf(pdf_path))
     
     def create_subject_collection(self, subject_id: int) -> str:
         """Create a ChromaDB collection for a subject"""
         collection_name = f"subject_{subject_id}"
-        try:
-            self.client.get_collection(collection_name)
-        except:
-            self.client.create_collection(
-                name=collection_name,
-                metadata={"subject_id": subject_id}
-            )
+        self.get_collection(collection_name, create=True, metadata={"subject_id": subject_id})
         return collection_name
     
     def add_document_to_collection(
         self, 
         collection_name: str, 
         pdf_path: str, 
-        document_id: int
+        document_id: int,
+        chunk_size: int = None,
+        chunk_overlap: int = None
     ):
         """Process PDF and add to vector store"""
-        # Extract text
-        text = self.extract_text_from_pdf(pdf_path)
-        if not text:
+        # Extract text page by page
+        with span('ingest_extract'):
+            pages = self.extract_pages_from_pdf(pdf_path)
+        if not any(p.strip() for p in pages):
             raise ValueError("Empty or unreadable PDF")
 
-        # Split into chunks
-        chunks = self.text_splitter.split_text(text)
-        
-        # Get collection
-        try:
-            collection = self.client.get_collection(collection_name)
-        except:
-            # Create if not exists (fallback)
-            collection = self.client.create_collection(name=collection_name)
-        
-        # Generate embeddings and add to collection
-        # processing in batches if needed, here simple loop
-        embeddings = []
-        documents_list = []
-        ids = []
+        # Split each page/section separately so chunks keep their page and heading
+        chunks = chunk_pages(pages, self.get_text_splitter(chunk_size, chunk_overlap))
+        return self.index_chunks(collection_name, document_id, chunks)
+
+    def index_chunks(self, collection_name: str, document_id: int, chunks: List[Dict]) -> int:
+        """Embed prepared chunks (see document_chunker) and add them to the collection"""
+        # Generate embeddings in one batched call (a single round trip when
+        # the shared embedding service is used) and add to collection
+        with span('ingest_embed'):
+            documents_list = [c['text'] for c in chunks]
+            embeddings = self.embedding_model.encode(documents_list).tolist() if chunks else []
+        ids = chunk_ids(document_id, chunks)
         metadatas = []
-        
         for i, chunk in enumerate(chunks):
-            embedding = self.embedding_model.encode(chunk).tolist()
-            
-            embeddings.append(embedding)
-            documents_list.append(chunk)
-            ids.append(f"doc_{document_id}_chunk_{i}")
-            metadatas.append({"document_id": document_id, "chunk_index": i})
+            metadata = {"document_id": document_id, "chunk_index": i, "page_number": chunk['page_number']}
+            if chunk['heading']:
+                metadata["heading"] = chunk['heading']
+            if chunk.get('offset') is not None:
+                metadata["offset"] = chunk['offset']
+            metadatas.append(metadata)
             
         if ids:
-            collection.add(
+            self._with_collection(collection_name, lambda collection: collection.add(
                 embeddings=embeddings,
                 documents=documents_list,
                 ids=ids,
                 metadatas=metadatas
-            )
+            ), create=True)
+        return len(ids)
+
+    def delete_document_chunks(self, collection_name: str, document_id: int):
+        """Remove every chunk of one document from a collection"""
+        from chromadb.errors import NotFoundError
+        try:
+            self._with_collection(collection_name,
+                                  lambda collection: collection.delete(where={"document_id": document_id}))
+        except NotFoundError:
+            return
     
+    def embed_query(self, query: str) -> List[float]:
+        """Embedding of a single query, as stored in the collections"""
+        with span('embed'):
+            return self.embedding_model.encode(query).tolist()
+
     def retrieve_context(
         self, 
         collection_name: str, 
         query: str, 
-        top_k: int = 5
+        top_k: int = 5,
+        query_embedding: List[float] = None
     ) -> List[Dict]:
-        """Retrieve relevant context for a query"""
-        try:
-            collection = self.client.get_collection(collection_name)
-        except Exception:
-            return []
-        
+        """Retrieve relevant context for a query (pass ``query_embedding`` if already computed)"""
+        from chromadb.errors import NotFoundError
         try:
             # Generate query embedding
-            query_embedding = self.embedding_model.encode(query).tolist()
+            if query_embedding is None:
+                query_embedding = self.embed_query(query)
             
             # Query collection
-            results = collection.query(
-                query_embeddings=[query_embedding],
-                n_results=top_k
-            )
+            with span('vector_query'):
+                results = self._with_collection(collection_name, lambda collection: collection.query(
+                    query_embeddings=[query_embedding],
+                    n_results=top_k
+                ))
             
             context_chunks = []
             if results and results['documents']:
                 for i, doc in enumerate(results['documents'][0]):
                     context_chunks.append({
+                        'id': results['ids'][0][i],
                         'content': doc,
                         'metadata': results['metadatas'][0][i] if results['metadatas'] else {},
                         'distance': results['distances'][0][i] if results['distances'] else None
                     })
             
             return context_chunks
+        except NotFoundError:
+            # Subject without a collection yet
+            return []
         except Exception as e:
-            print(f"Error during RAG query: {str(e)}")
+            logger.error("error during RAG query", extra={'collection': collection_name, 'error': str(e)})
             return []
 
-    def delete_subject_collection(self, subject_id: int):
-        """Delete ChromaDB collection for a subject"""
-        collection_name = f"subject_{subject_id}"
+    def delete_subject_collection(self, collection_name: str):
+        """Delete a subject's ChromaDB collection"""
+        self.invalidate_collection(collection_name)
         try:
             self.client.delete_collection(name=collection_name)
         except Exception as e:
-            print(f"Error deleting collection {collection_name}: {e}")
+            logger.error("error deleting collection", extra={'collection': collection_name, 'error': str(e)})
+
+    def collection_exists(self, collection_name: str) -> bool:
+        from chromadb.errors import NotFoundError
+        try:
+            self.client.get_collection(collection_name)
+            return True
+        except NotFoundError:
+            return False
+
+    def drop_collection(self, collection_name: str):
+        """Delete a collection if it exists"""
+        self.invalidate_collection(collection_name)
+        if self.collection_exists(collection_name):
+            self.client.delete_collection(name=collection_name)
+
+
+def get_rag_service() -> RAGService:
+    """RAG service shared by all blueprints of the current app"""
+    return current_app.extensions['rag_service']
+
+
+rag_service = LocalProxy(get_rag_service)
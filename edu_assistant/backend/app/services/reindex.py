@@ -0,0 +1,181 @@
+"""Rebuild subject collections from ``SubjectDocument`` rows and uploaded files.
+
+Used by ``flask reindex`` after changing the embedding model or chunking.
+Each subject is rebuilt into a new collection (``subject_<id>_<random suffix>``)
+while chat keeps reading the active one. ``Subject.collection_name`` is then
+pointed at the new collection in the same commit as the documents and
+citations, and the old collection is dropped. Progress is checkpointed per
+document, so an interrupted run continues with ``--resume`` instead of
+re-embedding everything.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+from app import db
+from app.config import Config
+from app.models.document import SubjectDocument
+from app.models.subject import Subject
+from app.services import citations, faq_service
+from app.services.access_cache import access_cache
+from app.services.document_chunker import prepare_chunks
+from app.services.rag_service import rag_service
+
+logger = logging.getLogger(__name__)
+
+class Checkpoint:
+    """Per-subject set of documents already indexed into the shadow collection"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.data = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.data = json.load(f)
+
+    def subject(self, subject_id: int, settings: Dict, resume: bool) -> Tuple[str, set]:
+        """Collection being built for ``subject_id`` and its documents done; restarts if settings changed"""
+        entry = self.data.get(str(subject_id))
+        if (not resume or not entry or entry['settings'] != settings
+                or not rag_service.collection_exists(entry['collection'])):
+            entry = self.data[str(subject_id)] = {
+                'settings': settings,
+                'collection': f"subject_{subject_id}_{uuid.uuid4().hex[:12]}",
+                'done': []
+            }
+            self.save()
+        return entry['collection'], set(entry['done'])
+
+    def mark_done(self, subject_id: int, document_id: int):
+        self.data[str(subject_id)]['done'].append(document_id)
+        self.save()
+
+    def finish(self, subject_id: int):
+        self.data.pop(str(subject_id), None)
+        self.save()
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.data, f)
+        os.replace(tmp_path, self.path)
+
+
+def _settings(subject: Dict) -> Dict:
+    # Anything that changes chunk text or vectors invalidates a checkpoint
+    return {
+        'embedding_model': Config.EMBEDDING_SERVICE_URL or Config.EMBEDDING_MODEL,
+        'embedding_backend': Config.EMBEDDING_BACKEND,
+        'chunk_size': subject['chunk_size'],
+        'chunk_overlap': subject['chunk_overlap'],
+    }
+
+
+def _pending_documents(subject_id: int, done: set):
+    return [d for d in SubjectDocument.query.filter_by(subject_id=subject_id).order_by(SubjectDocument.id)
+            if d.id not in done]
+
+
+def reindex_subject(subject_id: int, checkpoint: Checkpoint, pool: Optional[ProcessPoolExecutor],
+                    resume: bool = False) -> Dict:
+    """Rebuild one subject's collection; returns a summary"""
+    start = time.perf_counter()
+    subject = access_cache.subject_info(subject_id)
+    if not subject:
+        raise LookupError(f"Subject {subject_id} not found")
+    settings = _settings(subject)
+
+    shadow_name, done = checkpoint.subject(subject_id, settings, resume)
+    rag_service.get_collection(shadow_name, create=True, metadata={"subject_id": subject_id})
+
+    failed = {}
+    # Loop until no new documents appear, so uploads made during the rebuild are included
+    while True:
+        pending = _pending_documents(subject_id, done | set(failed))
+        if not pending:
+            break
+        by_path = {d.file_path: d for d in pending}
+        if pool:
+            futures = {pool.submit(prepare_chunks, path, subject['chunk_size'], subject['chunk_overlap']): path
+                       for path in by_path}
+            results = ((futures[f], f) for f in as_completed(futures))
+        else:
+            results = ((path, None) for path in by_path)
+
+        for path, future in results:
+            document = by_path[path]
+            try:
+                chunks = future.result() if future else prepare_chunks(
+                    path, subject['chunk_size'], subject['chunk_overlap'])
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                # A missing or unreadable file skips that document only
+                logger.warning("reindex skipped document",
+                               extra={'subject_id': subject_id, 'document_id': document.id, 'error': str(e)})
+                failed[document.id] = str(e)
+                continue
+            # Embedding/store errors abort the run before the swap; --resume continues it
+            rag_service.index_chunks(shadow_name, document.id, chunks)
+            done.add(document.id)
+            checkpoint.mark_done(subject_id, document.id)
+            logger.info("reindex progress", extra={
+                'subject_id': subject_id, 'document_id': document.id, 'done': len(done)})
+
+    # Documents deleted while the rebuild was running
+    existing = {d.id for d in SubjectDocument.query.filter_by(subject_id=subject_id)}
+    for document_id in done - existing:
+        rag_service.delete_document_chunks(shadow_name, document_id)
+
+    if failed and not done & existing:
+        raise RuntimeError(f"no document of subject {subject_id} could be indexed; "
+                           f"live collection left unchanged")
+    # Switch the subject, its documents and citations over in one commit
+    subject_row = db.session.get(Subject, subject_id)
+    old_name = subject_row.active_collection()
+    subject_row.collection_name = shadow_name
+    for document in SubjectDocument.query.filter_by(subject_id=subject_id):
+        document.is_processed = document.id in done
+        document.chroma_collection_name = shadow_name
+        # Point the citation index at the rebuilt chunks
+        if document.is_processed:
+            citations.rebuild_from_collection(shadow_name, document.id, subject_id)
+        else:
+            citations.forget_document(document.id)
+    # Stored FAQ answers were generated from the old index
+    faq_service.forget_faqs(subject_id)
+    db.session.commit()
+    access_cache.invalidate_subject(subject_id)
+    faq_service.faq_index.invalidate(subject_id)
+    checkpoint.finish(subject_id)
+    # Other processes find the new name when their cached one is gone (see chat_service)
+    rag_service.drop_collection(old_name)
+
+    summary = {
+        'subject_id': subject_id,
+        'documents': len(done & existing),
+        'failed': failed,
+        'chunks': rag_service.get_collection(shadow_name).count(),
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+    logger.info("reindex finished", extra={k: v for k, v in summary.items() if k != 'failed'})
+    return summary
+
+
+def reindex(subject_ids, workers: int, resume: bool = False, checkpoint_path: str = None):
+    """Rebuild several subjects, extracting PDFs in a pool of ``workers`` processes"""
+    checkpoint = Checkpoint(checkpoint_path or Config.REINDEX_CHECKPOINT)
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        for subject_id in subject_ids:
+            yield reindex_subject(subject_id, checkpoint, pool, resume)
+    finally:
+        if pool:
+            pool.shutdown()
@@ -0,0 +1,223 @@
+"""Resumable chunked uploads for large documents.
+
+A session lives in ``UPLOAD_FOLDER/_incoming/<upload_id>``: ``manifest.json``
+is written once at init, and every part is streamed to its own file with a
+``.sha256`` sidecar holding the checksum verified on receipt. Parts can arrive
+in any order, in parallel, and be re-sent after a dropped connection; the
+status is derived from the directory listing, so no manifest rewrites are
+needed. ``assemble`` concatenates the parts into the subject's upload
+directory; ``completing`` keeps a second ``/complete`` of the same session out
+while that runs.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Optional
+from app.config import Config
+
+INCOMING_DIR = '_incoming'
+UPLOAD_ID = re.compile(r'^[0-9a-f]{32}$')
+BLOCK_SIZE = 1024 * 1024
+COMPLETE_LOCK = 'complete.lock'
+# A completion lock this old was left by a worker that died mid-way
+COMPLETE_LOCK_STALE = 15 * 60
+
+
+class UploadError(Exception):
+    """Client-side problem with an upload session; carries an HTTP status"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def _incoming_root() -> str:
+    return os.path.join(Config.UPLOAD_FOLDER, INCOMING_DIR)
+
+
+def _session_dir(upload_id: str) -> str:
+    if not UPLOAD_ID.match(upload_id or ''):
+        raise UploadError('Upload not found', 404)
+    return os.path.join(_incoming_root(), upload_id)
+
+
+def _part_path(session_dir: str, part_number: int) -> str:
+    return os.path.join(session_dir, f"part_{part_number:05d}")
+
+
+def purge_expired(now: Optional[float] = None):
+    """Remove sessions untouched for longer than ``UPLOAD_SESSION_TTL``"""
+    root = _incoming_root()
+    if not os.path.isdir(root):
+        return
+    cutoff = (now or time.time()) - Config.UPLOAD_SESSION_TTL
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if UPLOAD_ID.match(name) and os.path.getmtime(path) < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def create_session(subject_id: int, user_id, file_name: str, file_size: int,
+                   sha256: Optional[str] = None) -> Dict:
+    if file_size <= 0:
+        raise UploadError('file_size must be positive')
+    if file_size > Config.UPLOAD_MAX_FILE_SIZE:
+        raise UploadError(f'File is larger than {Config.UPLOAD_MAX_FILE_SIZE} bytes', 413)
+    purge_expired()
+
+    upload_id = uuid.uuid4().hex
+    part_size = Config.UPLOAD_PART_SIZE
+    manifest = {
+        'upload_id': upload_id,
+        'subject_id': subject_id,
+        'user_id': str(user_id),
+        'file_name': file_name,
+        'file_size': file_size,
+        'sha256': sha256.lower() if sha256 else None,
+        'part_size': part_size,
+        'total_parts': -(-file_size // part_size),
+        'created_at': time.time(),
+    }
+    session_dir = os.path.join(_incoming_root(), upload_id)
+    os.makedirs(session_dir)
+    with open(os.path.join(session_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def load_session(upload_id: str, user_id) -> Dict:
+    """Manifest of an upload owned by ``user_id``"""
+    purge_expired()
+    try:
+        with open(os.path.join(_session_dir(upload_id), 'manifest.json')) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise UploadError('Upload not found', 404)
+    if manifest['user_id'] != str(user_id):
+        raise UploadError('Not authorized', 403)
+    return manifest
+
+
+def expected_part_size(manifest: Dict, part_number: int) -> int:
+    if part_number == manifest['total_parts']:
+        return manifest['file_size'] - manifest['part_size'] * (manifest['total_parts'] - 1)
+    return manifest['part_size']
+
+
+def write_part(manifest: Dict, part_number: int, stream, sha256: Optional[str]) -> Dict:
+    """Stream one part to disk, verifying its size and (if given) checksum"""
+    if not 1 <= part_number <= manifest['total_parts']:
+        raise UploadError(f"part_number must be between 1 and {manifest['total_parts']}")
+    session_dir = _session_dir(manifest['upload_id'])
+    expected = expected_part_size(manifest, part_number)
+    part_path = _part_path(session_dir, part_number)
+    tmp_path = f"{part_path}.{uuid.uuid4().hex}.tmp"
+
+    digest, size = hashlib.sha256(), 0
+    try:
+        with open(tmp_path, 'wb') as f:
+            while True:
+                block = stream.read(BLOCK_SIZE)
+                if not block:
+                    break
+                size += len(block)
+                if size > expected:
+                    raise UploadError(f'Part {part_number} is larger than {expected} bytes')
+                digest.update(block)
+                f.write(block)
+        if size != expected:
+            raise UploadError(f'Part {part_number} has {size} bytes, expected {expected}')
+        if sha256 and digest.hexdigest() != sha256.lower():
+            raise UploadError(f'Checksum mismatch for part {part_number}', 422)
+        os.replace(tmp_path, part_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    with open(f"{part_path}.sha256", 'w') as f:
+        f.write(digest.hexdigest())
+    # Keep the session alive for purge_expired while parts are still arriving
+    os.utime(session_dir)
+    return {'part_number': part_number, 'size': size, 'sha256': digest.hexdigest()}
+
+
+def session_status(manifest: Dict) -> Dict:
+    session_dir = _session_dir(manifest['upload_id'])
+    received = sorted(n for n in range(1, manifest['total_parts'] + 1)
+                      if os.path.exists(f"{_part_path(session_dir, n)}.sha256"))
+    received_set = set(received)
+    return {
+        **{k: manifest[k] for k in ('upload_id', 'subject_id', 'file_name', 'file_size',
+                                    'part_size', 'total_parts')},
+        'received_parts': received,
+        'missing_parts': [n for n in range(1, manifest['total_parts'] + 1) if n not in received_set],
+        'bytes_received': sum(expected_part_size(manifest, n) for n in received),
+    }
+
+
+def assemble(manifest: Dict, file_path: str):
+    """Concatenate all parts into ``file_path`` and verify the whole-file checksum"""
+    status = session_status(manifest)
+    if status['missing_parts']:
+        raise UploadError(f"Missing parts: {status['missing_parts'][:20]}", 409)
+
+    session_dir = _session_dir(manifest['upload_id'])
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=session_dir)
+    digest = hashlib.sha256()
+    try:
+        with os.fdopen(fd, 'wb') as dst:
+            for n in range(1, manifest['total_parts'] + 1):
+                with open(_part_path(session_dir, n), 'rb') as src:
+                    while True:
+                        block = src.read(BLOCK_SIZE)
+                        if not block:
+                            break
+                        digest.update(block)
+                        dst.write(block)
+        if manifest['sha256'] and digest.hexdigest() != manifest['sha256']:
+            raise UploadError('Checksum mismatch for assembled file', 422)
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@contextmanager
+def completing(manifest: Dict):
+    """Hold the session while it is assembled and processed (409 if already held)"""
+    lock_path = os.path.join(_session_dir(manifest['upload_id']), COMPLETE_LOCK)
+    for _ in range(2):
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileNotFoundError:
+            raise UploadError('Upload not found', 404)
+        except FileExistsError:
+            try:
+                stale = time.time() - os.path.getmtime(lock_path) > COMPLETE_LOCK_STALE
+            except FileNotFoundError:
+                continue
+            if not stale:
+                raise UploadError('Upload is already being completed', 409)
+            os.remove(lock_path)
+    else:
+        raise UploadError('Upload is already being completed', 409)
+    try:
+        yield
+    finally:
+        try:
+            os.remove(lock_path)
+        except FileNotFoundError:
+            # Discarded on success
+            pass
+
+
+def discard_session(upload_id: str):
+    shutil.rmtree(_session_dir(upload_id), ignore_errors=True)
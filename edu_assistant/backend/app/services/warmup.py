@@ -0,0 +1,131 @@
+"""Background warm-up of the per-process RAG state.
+
+Loads the embedding model, runs a dummy encode so lazily initialised kernels
+and thread pools are ready, and queries the most-used subject collections so
+Chroma has their segments open before the first student asks. Runs once per
+process on a daemon thread, started from gunicorn's ``post_fork`` or by the
+first request a worker serves; ``GET /api/health`` reports 503 until done.
+A failed warm-up is retried by a later request, with exponential backoff.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+# Longest wait between retries of a failed warm-up
+MAX_RETRY_SECONDS = 300
+WARMUP_TEXT = "warm-up query for the embedding model"
+
+
+class WarmupState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = None
+        self.status = 'idle'   # idle -> warming -> ready | failed (-> warming)
+        self.error = None
+        self.failures = 0
+        self.failed_at = None
+        self.seconds = None
+        self.collections = []
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            return {
+                'status': self.status,
+                'seconds': self.seconds,
+                'collections': list(self.collections),
+                'error': self.error,
+                'failures': self.failures,
+            }
+
+    def retry_due(self, base_seconds: float) -> bool:
+        """Whether a failed warm-up has waited out its backoff (call with the lock held)"""
+        delay = min(base_seconds * 2 ** (self.failures - 1), MAX_RETRY_SECONDS)
+        return time.monotonic() - self.failed_at >= delay
+
+
+state = WarmupState()
+
+
+def _most_used_subjects(limit: int):
+    from sqlalchemy import func
+    from app import db
+    from app.models.chat import ChatSession
+
+    rows = (db.session.query(ChatSession.subject_id, func.count(ChatSession.id))
+            .group_by(ChatSession.subject_id)
+            .order_by(func.count(ChatSession.id).desc())
+            .limit(limit)
+            .all())
+    return [subject_id for subject_id, _ in rows]
+
+
+def warm_up(app):
+    """Load the model and open the busiest collections (blocking)"""
+    from app.services.access_cache import access_cache
+    from app.services.rag_service import get_rag_service
+
+    start = time.perf_counter()
+    with app.app_context():
+        rag = get_rag_service()
+        embedding = rag.embedding_model.encode(WARMUP_TEXT).tolist()
+
+        opened = []
+        limit = app.config['WARMUP_COLLECTIONS']
+        for subject_id in (_most_used_subjects(limit) if limit else []):
+            subject = access_cache.subject_info(subject_id)
+            if not subject:
+                continue
+            collection_name = subject['collection']
+            try:
+                collection = rag.get_collection(collection_name)
+                if collection.count():
+                    collection.query(query_embeddings=[embedding], n_results=1)
+                opened.append(collection_name)
+            except Exception as e:
+                logger.warning("warm-up skipped collection", extra={'collection': collection_name, 'error': str(e)})
+    return opened, time.perf_counter() - start
+
+
+def _run(app):
+    try:
+        opened, seconds = warm_up(app)
+    except Exception as e:
+        logger.exception("warm-up failed")
+        with state.lock:
+            state.status, state.error = 'failed', str(e)
+            state.failures += 1
+            state.failed_at = time.monotonic()
+        return
+    with state.lock:
+        state.status, state.collections, state.seconds, state.error = 'ready', opened, round(seconds, 3), None
+    logger.info("warm-up finished", extra={'seconds': round(seconds, 3), 'collections': len(opened)})
+
+
+def start_warmup(app):
+    """Start warming this process in the background.
+
+    A no-op if already started, unless the last attempt failed and its
+    backoff has passed.
+    """
+    if not app.config['WARMUP_ON_STARTUP']:
+        return
+    pid = os.getpid()
+    with state.lock:
+        # A forked child inherits the parent's state but not its thread
+        if state.pid == pid:
+            if state.status != 'failed' or not state.retry_due(app.config['WARMUP_RETRY_SECONDS']):
+                return
+            logger.info("retrying warm-up", extra={'attempt': state.failures + 1})
+        else:
+            state.error, state.failures, state.failed_at = None, 0, None
+        state.pid, state.status, state.collections, state.seconds = pid, 'warming', [], None
+    threading.Thread(target=_run, args=(app,), name='warmup', daemon=True).start()
+
+
+def readiness() -> Dict:
+    """Warm-up status of this process, for the health endpoint"""
+    return state.snapshot()
@@ -0,0 +1,52 @@
+"""Spherical k-means for L2-normalized embeddings (numpy only).
+
+Assignment is by cosine similarity (a single matrix product per iteration)
+and centroids are re-normalized means, which matches how queries are later
+matched against them.
+"""
+import numpy as np
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _init_centroids(x: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """k-means++ seeding on cosine distance"""
+    centroids = [x[rng.integers(len(x))]]
+    closest = 1.0 - x @ centroids[0]
+    for _ in range(1, k):
+        weights = np.clip(closest, 0, None) ** 2
+        total = weights.sum()
+        index = rng.choice(len(x), p=weights / total) if total > 0 else rng.integers(len(x))
+        centroids.append(x[index])
+        closest = np.minimum(closest, 1.0 - x @ x[index])
+    return np.stack(centroids)
+
+
+def kmeans(x: np.ndarray, k: int, iterations: int = 25, seed: int = 0):
+    """Cluster normalized rows of ``x``; returns (centroids [k, d], labels [n])"""
+    x = normalize(np.asarray(x, dtype=np.float32))
+    k = min(k, len(x))
+    rng = np.random.default_rng(seed)
+    centroids = _init_centroids(x, k, rng)
+
+    labels = None
+    for _ in range(iterations):
+        new_labels = np.argmax(x @ centroids.T, axis=1)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, x)
+        counts = np.bincount(labels, minlength=k)
+        # Re-seed empty clusters on the point worst served by its centroid
+        for empty in np.flatnonzero(counts == 0):
+            worst = np.argmin(np.sum(x * centroids[labels], axis=1))
+            sums[labels[worst]] -= x[worst]
+            counts[labels[worst]] -= 1
+            sums[empty], counts[empty] = x[worst], 1
+            labels[worst] = empty
+        centroids = normalize(sums)
+    return centroids, labels
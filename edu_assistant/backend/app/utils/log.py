@@ -0,0 +1,48 @@
+import json
+import logging
+import sys
+
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class KeyValueFormatter(logging.Formatter):
+    """``time level logger message key=value ...`` with fields passed via ``extra``"""
+
+    def format(self, record):
+        line = super().format(record)
+        fields = {k: v for k, v in vars(record).items() if k not in _RESERVED}
+        if fields:
+            line += ' ' + ' '.join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers"""
+
+    def format(self, record):
+        payload = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        payload.update({k: v for k, v in vars(record).items() if k not in _RESERVED})
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+def configure_logging(level: str = 'INFO', fmt: str = 'text'):
+    """Configure the ``app`` logger hierarchy once per process"""
+    logger = logging.getLogger('app')
+    logger.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    if not any(getattr(h, '_edu_handler', False) for h in logger.handlers):
+        handler = logging.StreamHandler(sys.stderr)
+        handler._edu_handler = True
+        logger.addHandler(handler)
+        logger.propagate = False
+    for handler in logger.handlers:
+        if getattr(handler, '_edu_handler', False):
+            handler.setFormatter(JSONFormatter() if fmt == 'json' else KeyValueFormatter(
+                '%(asctime)s %(levelname)s %(name)s %(message)s'))
+    return logger
@@ -0,0 +1,188 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Sequence, Tuple
+from flask import g, has_request_context
+
+# Seconds; spans cover sub-millisecond cache hits up to multi-minute generations
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{k}="{v}"' for k, v in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, optionally labelled"""
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._children[key] = self._children.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._children.get(self._key(labels), 0)
+
+    def render(self) -> str:
+        with self._lock:
+            children = sorted(self._children.items())
+        lines = self._header()
+        for key, value in children:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return "\n".join(lines)
+
+
+class Histogram(_Metric):
+    """Cumulative histogram rendered in the Prometheus text format"""
+    kind = 'histogram'
+
+    def __init__(self, name: str, description: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                 labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        index = bisect.bisect_left(self.buckets, value)
+        key = self._key(labels)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            child[0][index] += 1
+            child[1] += value
+            child[2] += 1
+
+    def snapshot(self, **labels) -> dict:
+        with self._lock:
+            child = self._children.get(self._key(labels))
+            counts, total, count = (list(child[0]), child[1], child[2]) if child else (
+                [0] * (len(self.buckets) + 1), 0.0, 0)
+        cumulative, running = [], 0
+        for bound, c in zip(self.buckets + (float('inf'),), counts):
+            running += c
+            cumulative.append((bound, running))
+        return {'buckets': cumulative, 'sum': total, 'count': count}
+
+    def render(self) -> str:
+        with self._lock:
+            keys = sorted(self._children)
+        lines = self._header()
+        for key in keys:
+            snap = self.snapshot(**dict(zip(self.labelnames, key)))
+            for bound, running in snap['buckets']:
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                bucket_labels = _format_labels(self.labelnames, key, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{bucket_labels} {running}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {snap['sum']}")
+            lines.append(f"{self.name}_count{labels} {snap['count']}")
+        return "\n".join(lines)
+
+
+class Registry:
+    """Named collection of metrics exposed together at /api/metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return render(*metrics)
+
+
+def render(*metrics) -> str:
+    """Prometheus exposition text for the given metrics"""
+    return "\n".join(m.render() for m in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, description: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, description, labelnames))
+
+
+def histogram(name: str, description: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, description, buckets, labelnames))
+
+
+# Application-wide metrics
+REQUEST_SECONDS = histogram(
+    'edu_request_seconds', 'HTTP request latency', ('endpoint', 'method', 'status'))
+STAGE_SECONDS = histogram(
+    'edu_stage_seconds', 'Latency of pipeline stages (classify, embed, retrieve, generate, ...)', ('stage',))
+LLM_TOKENS = counter('edu_llm_tokens_total', 'Tokens reported by LLM providers', ('provider', 'model'))
+LLM_ERRORS = counter('edu_llm_errors_total', 'Failed LLM provider calls', ('provider',))
+CACHE_REQUESTS = counter('edu_cache_requests_total', 'Cache lookups by result', ('cache', 'result'))
+RATE_LIMITED = counter('edu_rate_limited_total', 'Requests rejected by the rate limiter', ('scope',))
+LLM_QUEUE_SECONDS = histogram('edu_llm_queue_seconds', 'Time spent waiting for an LLM slot', ('tier',))
+LLM_ROUTING = counter('edu_llm_routing_total', 'Local-first routing decisions', ('decision', 'reason'))
+LLM_ROUTING_SAVED_SECONDS = counter(
+    'edu_llm_routing_saved_seconds_total', 'Estimated latency saved by answers kept local')
+OLLAMA_REQUESTS = counter('edu_ollama_requests_total', 'Ollama calls routed to each host', ('host',))
+LLM_PROMPT_EVAL_SECONDS = histogram(
+    'edu_llm_prompt_eval_seconds', 'Prompt evaluation time reported by Ollama', ('model',))
+
+_enabled = True
+
+
+def set_enabled(value: bool):
+    """Turn span timing off entirely (spans become no-ops)"""
+    global _enabled
+    _enabled = value
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def record_cache(cache: str, hit: bool):
+    if _enabled:
+        CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+@contextmanager
+def span(stage: str):
+    """Time a pipeline stage into STAGE_SECONDS and the current request's span list"""
+    if not _enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        if has_request_context():
+            g.setdefault('spans', []).append((stage, elapsed))
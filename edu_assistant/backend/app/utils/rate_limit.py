@@ -0,0 +1,149 @@
+"""Token-bucket rate limiting keyed by JWT identity.
+
+Limits are written as ``"<count>/<period>"`` (e.g. ``"10/minute"``): a bucket
+holds up to ``count`` tokens and refills at ``count`` per ``period``, so short
+bursts are allowed while the sustained rate is capped.
+
+Buckets live in process memory by default, which means each gunicorn worker
+enforces the limit on its own. Set ``RATE_LIMIT_STORAGE_URL`` to a Redis (or
+Redis-compatible, e.g. Valkey/KeyDB) URL to share buckets between workers; the
+``redis`` client is then imported on first use.
+"""
+import logging
+import math
+import threading
+import time
+from functools import lru_cache, wraps
+from typing import Tuple
+from flask import current_app, jsonify
+from flask_jwt_extended import get_jwt_identity
+from app.config import Config
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+@lru_cache(maxsize=None)
+def parse_limit(limit: str) -> Tuple[int, float]:
+    """``"10/minute"`` -> (capacity 10, refill 10/60 tokens per second)"""
+    count, _, period = limit.partition('/')
+    seconds = PERIODS[period.strip().rstrip('s') or 'second']
+    return int(count), int(count) / seconds
+
+
+class MemoryRateLimitStore:
+    """Per-process buckets: key -> (tokens, last refill time)"""
+
+    # Buckets idle this long are full again and can be dropped
+    PRUNE_INTERVAL = 300
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._last_prune = time.monotonic()
+
+    def take(self, key: str, capacity: int, rate: float, cost: float = 1) -> Tuple[bool, float]:
+        """Consume ``cost`` tokens; returns (allowed, seconds until allowed)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - last) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            if now - self._last_prune > self.PRUNE_INTERVAL:
+                self._prune(now, capacity, rate)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+    def _prune(self, now: float, capacity: int, rate: float):
+        full_after = capacity / rate
+        self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < full_after}
+        self._last_prune = now
+
+
+class RedisRateLimitStore:
+    """Buckets in Redis, updated atomically by a Lua script"""
+
+    SCRIPT = """
+local capacity, rate, cost, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+    def __init__(self, url: str):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self._script = self._redis.register_script(self.SCRIPT)
+
+    def take(self, key: str, capacity: int, rate: float, cost: float = 1) -> Tuple[bool, float]:
+        allowed, tokens = self._script(keys=[f"edu:ratelimit:{key}"],
+                                       args=[capacity, rate, cost, time.time()])
+        tokens = float(tokens)
+        return bool(allowed), 0.0 if allowed else (cost - tokens) / rate
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            if Config.RATE_LIMIT_STORAGE_URL:
+                try:
+                    _store = RedisRateLimitStore(Config.RATE_LIMIT_STORAGE_URL)
+                except ImportError:
+                    logger.warning("redis client not installed; using per-process rate limits")
+            if _store is None:
+                _store = MemoryRateLimitStore()
+        return _store
+
+
+def check_rate_limit(scope: str, identity, capacity: int, rate: float):
+    """Take a token for ``identity``; None if allowed, else whole seconds until it would be"""
+    if not current_app.config['RATE_LIMIT_ENABLED']:
+        return None
+    try:
+        allowed, retry_after = get_store().take(f"{scope}:{identity}", capacity, rate)
+    except Exception as e:
+        # Never fail requests because the limiter backend is down
+        logger.warning("rate limiter unavailable", extra={'error': str(e)})
+        return None
+    if allowed:
+        return None
+    metrics.RATE_LIMITED.inc(scope=scope)
+    return max(1, math.ceil(retry_after))
+
+
+def rate_limit(scope: str, config_key: str):
+    """Limit a JWT-protected route per user; place below ``@jwt_required()``.
+
+    The limit is read from ``app.config[config_key]`` on each request.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            capacity, rate = parse_limit(current_app.config[config_key])
+            retry_after = check_rate_limit(scope, get_jwt_identity(), capacity, rate)
+            if retry_after is not None:
+                response = jsonify({'error': 'Too many requests, please slow down',
+                                    'retry_after': retry_after})
+                response.headers['Retry-After'] = str(retry_after)
+                return response, 429
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,57 @@
+"""Per-process key/value cache whose entries expire after a fixed TTL.
+
+The shared base of the access cache, the model registry and the FAQ index:
+each is invalidated explicitly by the process that changes the data, and
+other worker processes pick the change up once their entry expires.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from app.utils.metrics import record_cache
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe dict of ``key -> value`` entries kept for ``ttl`` seconds.
+
+    With a ``name``, lookups are counted as cache hits/misses under it.
+    """
+
+    def __init__(self, ttl: float, name: Optional[str] = None):
+        self.ttl = ttl
+        self.name = name
+        self._lock = threading.Lock()
+        self._entries: Dict[Any, tuple] = {}
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+        hit = entry is not None and entry[0] > time.monotonic()
+        if self.name:
+            record_cache(self.name, hit)
+        return entry[1] if hit else default
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+        return value
+
+    def get_or_load(self, key, load: Callable[[], Any]):
+        """Cached value, or ``load()``'s result (cached unless it is None).
+
+        Loads run outside the lock, so two threads missing at once may both load.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = load()
+        return value if value is None else self.put(key, value)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
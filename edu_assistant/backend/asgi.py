@@ -0,0 +1,10 @@
+"""ASGI entry point: async chat path, everything else served by the Flask app.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 2
+
+See app/asgi.py. ``wsgi.py`` with gunicorn remains the synchronous option.
+"""
+from app import create_app
+from app.asgi import create_asgi_app
+
+app = create_asgi_app(create_app())
@@ -0,0 +1,6 @@
+"""Benchmarks for the EduAssistant backend.
+
+Run from the backend directory, e.g. ``python -m benchmarks.embedding_backends``.
+Every benchmark prints a human-readable summary and accepts ``--output`` to
+write machine-readable JSON for comparing runs.
+"""
@@ -0,0 +1,156 @@
+"""Concurrent load test of the full student chat path.
+
+    python -m benchmarks.chat_load --students 16 --messages 10 --latency-ms 200 --output chat.json
+    python -m benchmarks.chat_load --students 16 --ollama-hosts 3 --ollama-parallel 2
+
+Builds an isolated app (SQLite, Chroma and uploads in a temp dir), starts the
+fake Ollama server, seeds a department, staff member, students and an Ollama
+model, uploads synthetic PDFs through ``/api/staff/subjects/<id>/upload`` and
+then drives ``/api/student/chat/<id>/message`` from one thread per student.
+Reports throughput, p50/p95/p99 latency, error counts and peak memory.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from benchmarks.common import isolated_environment, latency_summary, peak_rss_mb, write_results
+from benchmarks.fake_ollama import start_fake_ollama
+from benchmarks.synthetic_pdf import generate_corpus
+
+PASSWORD = 'bench-password'
+
+
+def seed(app, students: int):
+    from app import db
+    from app.models import Department, LLMModel, StaffDepartment, StudentDepartment, User
+
+    with app.app_context():
+        db.create_all()
+        dept = Department(name='Benchmark', code='BENCH')
+        db.session.add(dept)
+        db.session.flush()
+        staff = User(email='staff@bench', full_name='Bench Staff', role='staff')
+        staff.set_password(PASSWORD)
+        db.session.add(staff)
+        db.session.flush()
+        db.session.add(StaffDepartment(staff_id=staff.id, department_id=dept.id))
+        for i in range(students):
+            student = User(email=f'student{i}@bench', full_name=f'Student {i}', role='student')
+            student.set_password(PASSWORD)
+            db.session.add(student)
+            db.session.flush()
+            db.session.add(StudentDepartment(student_id=student.id, department_id=dept.id))
+        db.session.add(LLMModel(name='Llama 3.2 (fake)', provider='ollama',
+                                model_identifier='llama3.2', is_active=True))
+        db.session.commit()
+        return dept.id
+
+
+def login(client, email: str) -> dict:
+    response = client.post('/api/auth/login', json={'email': email, 'password': PASSWORD})
+    return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+
+def run(students: int, messages: int, docs: int, pages: int, latency_ms: float,
+        jitter_ms: float, workdir: str, ollama_hosts: int = 1, ollama_parallel: int = None):
+    fakes = [start_fake_ollama(latency_ms=latency_ms, jitter_ms=jitter_ms, parallel=ollama_parallel)
+             for _ in range(ollama_hosts)]
+    urls = [url for _, url, _ in fakes]
+    # The benchmark measures throughput, not the per-student limits. With
+    # bounded fake hosts, let the app use every slot they offer.
+    isolated_environment(workdir, OLLAMA_BASE_URL=urls[0], OLLAMA_HOSTS=','.join(urls),
+                         RATE_LIMIT_ENABLED='false',
+                         LLM_MAX_CONCURRENCY=ollama_hosts * ollama_parallel if ollama_parallel else None)
+    from app import create_app
+
+    app = create_app()
+    dept_id = seed(app, students)
+    corpus = generate_corpus(os.path.join(workdir, 'corpus'), docs, pages)
+
+    staff_client = app.test_client()
+    staff_headers = login(staff_client, 'staff@bench')
+    subject = staff_client.post('/api/staff/subjects', headers=staff_headers, json={
+        'name': 'Benchmark Subject', 'code': 'BENCH-101', 'department_id': dept_id}).get_json()
+
+    upload_times = []
+    for path in corpus['documents']:
+        start = time.perf_counter()
+        with open(path, 'rb') as f:
+            response = staff_client.post(
+                f"/api/staff/subjects/{subject['id']}/upload", headers=staff_headers,
+                data={'file': (f, os.path.basename(path))}, content_type='multipart/form-data')
+        upload_times.append(time.perf_counter() - start)
+        if response.status_code != 201:
+            raise RuntimeError(f"Upload failed: {response.get_json()}")
+
+    questions = corpus['questions']
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+    barrier = threading.Barrier(students)
+
+    def student_worker(index: int):
+        client = app.test_client()
+        headers = login(client, f'student{index}@bench')
+        session = client.post('/api/student/chat/start', headers=headers,
+                              json={'subject_id': subject['id']}).get_json()
+        barrier.wait()
+        for n in range(messages):
+            question = questions[(index * messages + n) % len(questions)]['question']
+            start = time.perf_counter()
+            response = client.post(f"/api/student/chat/{session['id']}/message",
+                                   headers=headers, json={'message': question})
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    threads = [threading.Thread(target=student_worker, args=(i,)) for i in range(students)]
+    wall_start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - wall_start
+    for server, _, _ in fakes:
+        server.shutdown()
+
+    return {
+        'config': {'students': students, 'messages_per_student': messages, 'docs': docs,
+                   'pages_per_doc': pages, 'ollama_latency_ms': latency_ms, 'jitter_ms': jitter_ms,
+                   'ollama_hosts': ollama_hosts, 'ollama_parallel': ollama_parallel},
+        'upload': latency_summary(upload_times),
+        'chat': {
+            **latency_summary(latencies),
+            'wall_seconds': wall,
+            'throughput_rps': len(latencies) / wall if wall else 0.0,
+            'status_codes': statuses,
+        },
+        'ollama': [{'url': url, 'requests': state.requests, 'max_in_flight': state.max_in_flight}
+                   for _, url, state in fakes],
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=8)
+    parser.add_argument('--messages', type=int, default=5)
+    parser.add_argument('--docs', type=int, default=3)
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--latency-ms', type=float, default=200.0)
+    parser.add_argument('--jitter-ms', type=float, default=50.0)
+    parser.add_argument('--ollama-hosts', type=int, default=1, help='Fake Ollama servers to spread calls over')
+    parser.add_argument('--ollama-parallel', type=int, help='Concurrent requests per fake host (default: unlimited)')
+    parser.add_argument('--workdir', help='Keep generated data here (default: temp dir)')
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='edu_bench_')
+    results = run(args.students, args.messages, args.docs, args.pages,
+                  args.latency_ms, args.jitter_ms, workdir, args.ollama_hosts, args.ollama_parallel)
+    write_results('chat_load', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
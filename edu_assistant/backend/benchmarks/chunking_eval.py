@@ -0,0 +1,143 @@
+"""Retrieval quality vs. speed over a grid of chunking and top_k settings.
+
+    python -m benchmarks.chunking_eval --chunk-sizes 500,1000,1500 --overlaps 0,100,200 --top-ks 3,5,8
+    python -m benchmarks.chunking_eval --corpus-dir ./course_pdfs --questions labelled.json
+
+For each (chunk_size, chunk_overlap) the corpus is re-indexed into its own
+collection; every top_k is then evaluated against the labelled questions.
+Recall@k counts a question as answered when its ``answer`` string occurs in
+one of the k retrieved chunks. Without ``--corpus-dir`` a synthetic corpus is
+generated (see ``synthetic_pdf.py``).
+
+Questions file: JSON list of ``{"question": ..., "answer": ...}``.
+
+The recommended row is printed as the payload for
+``PUT /api/staff/subjects/<id>``, which stores it as per-subject overrides.
+"""
+import argparse
+import glob
+import json
+import os
+import tempfile
+import time
+from benchmarks.common import isolated_environment, latency_summary, write_results
+from benchmarks.synthetic_pdf import generate_corpus
+
+
+def _ints(value: str):
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def evaluate(rag, documents, questions, chunk_size: int, overlap: int, top_ks, embed_cache):
+    collection_name = f"eval_{chunk_size}_{overlap}"
+    try:
+        rag.client.delete_collection(collection_name)
+    except Exception:
+        pass
+    rag.client.create_collection(collection_name)
+
+    start = time.perf_counter()
+    for document_id, path in enumerate(documents, start=1):
+        rag.add_document_to_collection(collection_name, path, document_id,
+                                       chunk_size=chunk_size, chunk_overlap=overlap)
+    ingest_seconds = time.perf_counter() - start
+
+    collection = rag.client.get_collection(collection_name)
+    stored = collection.get(include=['documents'])
+    chunk_count = len(stored['ids'])
+    text_bytes = sum(len(d.encode('utf-8')) for d in stored['documents'])
+    dims = len(rag.embedding_model.encode("dimension probe"))
+
+    rows = []
+    for top_k in top_ks:
+        latencies, hits = [], 0
+        for q in questions:
+            embedding = embed_cache.get(q['question'])
+            if embedding is None:
+                embedding = embed_cache[q['question']] = rag.embedding_model.encode(q['question']).tolist()
+            begin = time.perf_counter()
+            result = collection.query(query_embeddings=[embedding], n_results=top_k)
+            latencies.append(time.perf_counter() - begin)
+            hits += any(q['answer'] in doc for doc in result['documents'][0])
+        rows.append({
+            'chunk_size': chunk_size,
+            'chunk_overlap': overlap,
+            'top_k': top_k,
+            'recall_at_k': hits / len(questions) if questions else 0.0,
+            'chunks': chunk_count,
+            'index_mb': (text_bytes + chunk_count * dims * 4) / (1024 * 1024),
+            'ingest_seconds': ingest_seconds,
+            'query': latency_summary(latencies),
+            # Prompt size drives LLM latency more than the vector query does
+            'context_chars_per_query': top_k * (text_bytes / chunk_count if chunk_count else 0),
+        })
+    rag.client.delete_collection(collection_name)
+    return rows
+
+
+def recommend(rows, tolerance: float):
+    """Smallest prompt among settings within ``tolerance`` of the best recall"""
+    best = max(r['recall_at_k'] for r in rows)
+    candidates = [r for r in rows if r['recall_at_k'] >= best - tolerance]
+    return min(candidates, key=lambda r: (r['context_chars_per_query'], r['query']['p95_ms']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--chunk-sizes', default='500,1000,1500')
+    parser.add_argument('--overlaps', default='0,100,200')
+    parser.add_argument('--top-ks', default='3,5,8')
+    parser.add_argument('--corpus-dir', help='Directory of PDFs (default: synthetic corpus)')
+    parser.add_argument('--questions', help='Labelled questions JSON (required with --corpus-dir)')
+    parser.add_argument('--docs', type=int, default=5)
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--tolerance', type=float, default=0.02,
+                        help='Recall slack when picking the cheapest setting')
+    parser.add_argument('--workdir')
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='edu_eval_')
+    isolated_environment(workdir)
+    from app.services.rag_service import RAGService
+
+    if args.corpus_dir:
+        if not args.questions:
+            parser.error('--questions is required with --corpus-dir')
+        documents = sorted(glob.glob(os.path.join(args.corpus_dir, '*.pdf')))
+        with open(args.questions) as f:
+            questions = json.load(f)
+    else:
+        corpus = generate_corpus(os.path.join(workdir, 'corpus'), args.docs, args.pages)
+        documents, questions = corpus['documents'], corpus['questions']
+
+    rag = RAGService()
+    embed_cache = {}
+    rows = []
+    for chunk_size in _ints(args.chunk_sizes):
+        for overlap in _ints(args.overlaps):
+            if overlap >= chunk_size:
+                continue
+            rows.extend(evaluate(rag, documents, questions, chunk_size, overlap,
+                                 _ints(args.top_ks), embed_cache))
+
+    print(f"{'size':>6} {'overlap':>7} {'k':>3} {'recall':>7} {'chunks':>7} {'index MB':>9} "
+          f"{'ingest s':>9} {'p50 ms':>7} {'p95 ms':>7}")
+    for r in rows:
+        print(f"{r['chunk_size']:>6} {r['chunk_overlap']:>7} {r['top_k']:>3} {r['recall_at_k']:>7.3f} "
+              f"{r['chunks']:>7} {r['index_mb']:>9.2f} {r['ingest_seconds']:>9.2f} "
+              f"{r['query']['p50_ms']:>7.2f} {r['query']['p95_ms']:>7.2f}")
+
+    best = recommend(rows, args.tolerance) if rows else None
+    if best:
+        payload = {k: best[k] for k in ('chunk_size', 'chunk_overlap', 'top_k')}
+        print(f"\nRecommended per-subject settings: {json.dumps(payload)}")
+        print("Apply with PUT /api/staff/subjects/<id>, then re-index the subject's documents.")
+    write_results('chunking_eval', {
+        'documents': len(documents), 'questions': len(questions),
+        'grid': rows, 'recommended': best,
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
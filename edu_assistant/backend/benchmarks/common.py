@@ -0,0 +1,76 @@
+import json
+import math
+import os
+import platform
+import time
+from typing import Dict, List, Sequence
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile (pct in 0-100); 0.0 for no values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/mean/max in milliseconds"""
+    if not latencies:
+        return {'count': 0}
+    return {
+        'count': len(latencies),
+        'mean_ms': 1000 * sum(latencies) / len(latencies),
+        'p50_ms': 1000 * percentile(latencies, 50),
+        'p95_ms': 1000 * percentile(latencies, 95),
+        'p99_ms': 1000 * percentile(latencies, 99),
+        'max_ms': 1000 * max(latencies),
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process in MB (0.0 where unsupported)"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if platform.system() == 'Darwin' else peak / 1024
+
+
+def isolated_environment(directory: str, **overrides) -> Dict[str, str]:
+    """Point the backend's database, uploads and Chroma store into ``directory``.
+
+    Must run before ``app.config`` is first imported, since Config reads the
+    environment at import time.
+    """
+    os.makedirs(directory, exist_ok=True)
+    env = {
+        'DATABASE_URL': f"sqlite:///{os.path.join(directory, 'bench.db')}",
+        'UPLOAD_FOLDER': os.path.join(directory, 'uploads'),
+        'CHROMA_PERSIST_DIR': os.path.join(directory, 'chroma_db'),
+        'LOG_LEVEL': 'WARNING',
+    }
+    env.update({k: str(v) for k, v in overrides.items() if v is not None})
+    os.environ.update(env)
+    return env
+
+
+def write_results(name: str, results: Dict, output: str = None):
+    """Print a summary and optionally write JSON (with run metadata) to ``output``"""
+    payload = {
+        'benchmark': name,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'results': results,
+    }
+    print(json.dumps(results, indent=2, default=str))
+    if output:
+        with open(output, 'w') as f:
+            json.dump(payload, f, indent=2, default=str)
+        print(f"Results written to {output}")
+    return payload
@@ -0,0 +1,158 @@
+"""Chat-message write throughput on SQLite, before and after engine tuning.
+
+    python -m benchmarks.db_write_throughput --threads 16 --messages 200 --output db_writes.json
+    python -m benchmarks.db_write_throughput --mode tuned --llm-ms 50
+
+Each thread plays one student: it reads its chat session, as the route does,
+and stores the question and the answer. Two modes, each on a fresh database
+file:
+
+- ``baseline``: default SQLite settings (rollback journal, full sync), and the
+  question and the answer committed separately.
+- ``tuned``: WAL, ``synchronous=NORMAL`` and ``SQLITE_BUSY_TIMEOUT_MS`` (see
+  ``app.utils.database``), and both messages in one commit.
+
+``--llm-ms`` sleeps between reading the session and storing the answer, in
+place of the LLM call. Reports messages/s, per-message latency and how many
+messages failed with "database is locked".
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+from benchmarks.common import latency_summary, write_results
+
+MODES = ('baseline', 'tuned')
+
+
+def _engine(path: str, mode: str, busy_timeout_ms: int):
+    from sqlalchemy import create_engine
+    from app.utils.database import tune_sqlite
+
+    engine = create_engine(f"sqlite:///{path}")
+    if mode == 'tuned':
+        tune_sqlite(engine, wal=True, busy_timeout_ms=busy_timeout_ms)
+    return engine
+
+
+def _setup(engine, students: int):
+    from sqlalchemy.orm import Session
+    from app import db
+    from app.models.chat import ChatSession
+    from app.models.user import User
+
+    db.metadata.create_all(engine)
+    with Session(engine) as session:
+        users = [User(email=f"student{n}@bench.local", password_hash='x', full_name=f"Student {n}",
+                      role='student') for n in range(students)]
+        session.add_all(users)
+        session.flush()
+        chats = [ChatSession(student_id=u.id, subject_id=1, llm_model_id=1, learning_level='intermediate')
+                 for u in users]
+        session.add_all(chats)
+        session.commit()
+        return [c.id for c in chats]
+
+
+def _student(engine, mode: str, session_id: int, messages: int, llm_seconds: float,
+             latencies, errors, lock):
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.orm import Session
+    from app.models.chat import ChatMessage, ChatSession
+
+    for n in range(messages):
+        start = time.perf_counter()
+        with Session(engine) as session:
+            try:
+                session.get(ChatSession, session_id)
+                question = ChatMessage(session_id=session_id, message_type='user',
+                                       content=f"Question {n}?", created_at=datetime.utcnow())
+                if mode == 'baseline':
+                    session.add(question)
+                    session.commit()
+                if llm_seconds:
+                    time.sleep(llm_seconds)
+                answer = ChatMessage(session_id=session_id, message_type='assistant',
+                                     content=f"Answer {n}. " * 20, model_used='bench', tokens_used=100)
+                session.add_all([answer] if mode == 'baseline' else [question, answer])
+                session.commit()
+            except OperationalError as e:
+                session.rollback()
+                with lock:
+                    errors.append(str(e.orig))
+                continue
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+
+def run_mode(directory: str, mode: str, threads: int, messages: int, llm_ms: float,
+             busy_timeout_ms: int):
+    from sqlalchemy import text
+
+    path = os.path.join(directory, f"{mode}.db")
+    engine = _engine(path, mode, busy_timeout_ms)
+    session_ids = _setup(engine, threads)
+    # Timings exclude waiting for the LLM
+    llm_seconds = llm_ms / 1000.0
+    latencies, errors, lock = [], [], threading.Lock()
+    workers = [threading.Thread(target=_student, args=(engine, mode, sid, messages, llm_seconds,
+                                                       latencies, errors, lock))
+               for sid in session_ids]
+    wall_start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    wall = time.perf_counter() - wall_start
+
+    with engine.connect() as conn:
+        journal_mode = conn.execute(text("PRAGMA journal_mode")).scalar()
+    engine.dispose()
+    return {
+        'journal_mode': journal_mode,
+        'wall_seconds': wall,
+        'messages_stored': len(latencies),
+        'messages_per_second': len(latencies) / wall if wall else 0.0,
+        'locked_errors': sum('locked' in e for e in errors),
+        'other_errors': sum('locked' not in e for e in errors),
+        'latency': latency_summary([max(0.0, l - llm_seconds) for l in latencies]),
+    }
+
+
+def run(threads: int, messages: int, modes, llm_ms: float = 0.0, busy_timeout_ms: int = 5000):
+    results = {'config': {'threads': threads, 'messages_per_thread': messages, 'llm_ms': llm_ms,
+                          'busy_timeout_ms': busy_timeout_ms}}
+    directory = tempfile.mkdtemp(prefix='db_bench_')
+    try:
+        for mode in modes:
+            results[mode] = run_mode(directory, mode, threads, messages, llm_ms, busy_timeout_ms)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    if 'baseline' in results and 'tuned' in results:
+        before = results['baseline']['messages_per_second']
+        after = results['tuned']['messages_per_second']
+        results['throughput_speedup'] = after / before if before else 0.0
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16, help='Concurrent students')
+    parser.add_argument('--messages', type=int, default=200, help='Messages per student')
+    parser.add_argument('--mode', choices=MODES, action='append',
+                        help='Mode to run (repeatable; default: both)')
+    parser.add_argument('--llm-ms', type=float, default=0.0, help='Simulated LLM time per message')
+    parser.add_argument('--busy-timeout-ms', type=int, default=5000)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    results = run(args.threads, args.messages, args.mode or MODES, args.llm_ms, args.busy_timeout_ms)
+    write_results('db_write_throughput', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
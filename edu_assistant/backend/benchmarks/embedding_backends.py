@@ -0,0 +1,91 @@
+"""Compare embedding backends: throughput and agreement with the PyTorch model.
+
+    python download_model.py --onnx
+    python -m benchmarks.embedding_backends --sentences 512 --output emb.json
+
+Cosine agreement is measured per sentence between each backend and the
+reference ``torch`` embeddings; retrieval only depends on these vectors, so a
+mean cosine close to 1.0 means rankings are effectively unchanged.
+"""
+import argparse
+import random
+import time
+import numpy as np
+from app.services.embeddings import load_local_embedding_model
+from benchmarks.common import write_results
+
+WORDS = (
+    "algorithm data structure recursion matrix derivative integral entropy "
+    "protocol network latency throughput kernel process thread memory cache "
+    "photosynthesis enzyme molecule reaction equilibrium momentum velocity "
+    "theorem proof lemma graph vertex edge probability distribution variance"
+).split()
+
+
+def synthetic_sentences(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 120))) for _ in range(count)]
+
+
+def measure(model, sentences, batch_size: int, repeats: int):
+    model.encode(sentences[:batch_size], batch_size=batch_size)  # warm-up
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        embeddings = model.encode(sentences, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    single = []
+    for sentence in sentences[:50]:
+        start = time.perf_counter()
+        model.encode(sentence)
+        single.append(time.perf_counter() - start)
+    return np.asarray(embeddings, dtype=np.float32), {
+        'batch_seconds': best,
+        'sentences_per_second': len(sentences) / best,
+        'single_query_ms': 1000 * float(np.median(single)),
+    }
+
+
+def cosine_agreement(reference: np.ndarray, candidate: np.ndarray):
+    ref = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    cand = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    cosines = (ref * cand).sum(axis=1)
+    return {'mean_cosine': float(cosines.mean()), 'min_cosine': float(cosines.min())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backends', default='torch,onnx,onnx-int8')
+    parser.add_argument('--sentences', type=int, default=512)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    sentences = synthetic_sentences(args.sentences)
+    results, reference = {}, None
+    for backend in args.backends.split(','):
+        try:
+            model = load_local_embedding_model(backend)
+        except (ImportError, FileNotFoundError) as e:
+            results[backend] = {'error': str(e)}
+            continue
+        embeddings, stats = measure(model, sentences, args.batch_size, args.repeats)
+        if backend == 'torch':
+            reference = embeddings
+        elif reference is not None:
+            stats.update(cosine_agreement(reference, embeddings))
+        results[backend] = stats
+
+    if 'torch' in results and 'sentences_per_second' in results['torch']:
+        base = results['torch']['sentences_per_second']
+        for stats in results.values():
+            if 'sentences_per_second' in stats:
+                stats['speedup_vs_torch'] = stats['sentences_per_second'] / base
+
+    write_results('embedding_backends', {'sentences': args.sentences, 'backends': results}, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""Stand-in for an Ollama server with configurable latency.
+
+Implements enough of the Ollama HTTP API (``/api/generate``, ``/api/chat``,
+``/api/tags``, ``/api/ps``) for the backend to run end to end without a model.
+Intent-classification prompts are answered with ``SUBJECT_SPECIFIC`` so chat
+requests exercise the full RAG path.
+
+    python -m benchmarks.fake_ollama --port 11435 --latency-ms 200
+    python -m benchmarks.fake_ollama --port 11436 --parallel 2 --load-ms 3000  # second "host"
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CLASSIFY_MARKERS = ('SUBJECT_SPECIFIC', 'classif')
+
+
+class FakeOllamaState:
+    """Latency model and request counters shared by all handler threads"""
+
+    # Shorter shared prefixes do not win a cache slot from another conversation
+    MIN_REUSE_CHARS = 256
+
+    def __init__(self, latency_ms: float = 100.0, jitter_ms: float = 0.0,
+                 classify_latency_ms: float = None, tokens: int = 120,
+                 models=('llama3.2', 'mistral'), prompt_eval_ms_per_char: float = 0.05,
+                 cache_slots: int = 4, parallel: int = None, load_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.classify_latency_ms = latency_ms / 4 if classify_latency_ms is None else classify_latency_ms
+        self.tokens = tokens
+        self.models = list(models)
+        self.prompt_eval_ms_per_char = prompt_eval_ms_per_char
+        self.cache_slots = cache_slots
+        # Like OLLAMA_NUM_PARALLEL: requests beyond this wait for a free slot
+        self.slots = threading.BoundedSemaphore(parallel) if parallel else None
+        self.load_ms = load_ms
+        self.loaded = set()
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._cached_prompts = {}
+
+    def count(self, path: str):
+        with self.lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def prompt_eval_chars(self, model: str, prompt: str) -> int:
+        """Simulate Ollama's KV cache reuse.
+
+        Each model keeps the last ``cache_slots`` prompts it evaluated. A new
+        prompt takes over the slot sharing its longest prefix (when that prefix
+        is at least ``MIN_REUSE_CHARS`` long, otherwise the least recently used
+        slot) and only the part after the shared prefix is evaluated.
+        """
+        with self.lock:
+            slots = self._cached_prompts.setdefault(model, [])
+            shared = [len(os.path.commonprefix([cached, prompt])) for cached in slots]
+            best = max(range(len(slots)), key=shared.__getitem__, default=None)
+            if best is not None and shared[best] >= self.MIN_REUSE_CHARS:
+                slot = best
+            elif len(slots) >= self.cache_slots:
+                slot = 0
+            else:
+                slot = None
+            reused = shared[slot] if slot is not None else 0
+            if slot is not None:
+                slots.pop(slot)
+            slots.append(prompt)
+        return len(prompt) - reused
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state: FakeOllamaState = None
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.state.count(self.path)
+        if self.path == '/api/tags':
+            return self._send_json({'models': [{'name': m, 'model': m} for m in self.state.models]})
+        if self.path == '/api/ps':
+            with self.state.lock:
+                loaded = sorted(self.state.loaded)
+            return self._send_json({'models': [{'name': f"{m}:latest", 'model': f"{m}:latest"} for m in loaded]})
+        if self.path == '/':
+            return self._send_json({'status': 'Ollama is running'})
+        self._send_json({'error': 'not found'}, 404)
+
+    def do_POST(self):
+        self.state.count(self.path)
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        model = payload.get('model', '')
+
+        if self.path == '/api/generate':
+            text = payload.get('prompt', '')
+        elif self.path == '/api/chat':
+            # Rendered roughly the way a chat template would
+            text = ''.join(f"<|{m.get('role')}|>{m.get('content', '')}" for m in payload.get('messages', []))
+        else:
+            return self._send_json({'error': 'not found'}, 404)
+        if self.state.models and model not in self.state.models:
+            return self._send_json({'error': f"model '{model}' not found"}, 404)
+
+        classify = any(marker in text for marker in CLASSIFY_MARKERS)
+        latency = self.state.classify_latency_ms if classify else self.state.latency_ms
+        latency += random.uniform(0, self.state.jitter_ms)
+        evaluated = self.state.prompt_eval_chars(model, text)
+        prompt_eval_ms = evaluated * self.state.prompt_eval_ms_per_char
+
+        if self.state.slots:
+            self.state.slots.acquire()
+        with self.state.lock:
+            self.state.in_flight += 1
+            self.state.max_in_flight = max(self.state.max_in_flight, self.state.in_flight)
+            # First use of a model pays its load time
+            if model not in self.state.loaded:
+                latency += self.state.load_ms
+                self.state.loaded.add(model)
+        try:
+            time.sleep((latency + prompt_eval_ms) / 1000.0)
+        finally:
+            with self.state.lock:
+                self.state.in_flight -= 1
+            if self.state.slots:
+                self.state.slots.release()
+
+        content = 'SUBJECT_SPECIFIC' if classify else (
+            'Here is an explanation based on the course material. ' * max(1, self.state.tokens // 10))
+        result = {
+            'model': model,
+            'done': True,
+            'eval_count': 3 if classify else self.state.tokens,
+            'prompt_eval_count': evaluated // 4,
+            'prompt_eval_duration': int(prompt_eval_ms * 1e6),
+            'total_duration': int((latency + prompt_eval_ms) * 1e6),
+        }
+        if self.path == '/api/generate':
+            result['response'] = content
+        else:
+            result['message'] = {'role': 'assistant', 'content': content}
+        self._send_json(result)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_ollama(host: str = '127.0.0.1', port: int = 0, **state_kwargs):
+    """Start a fake server on a background thread; returns (server, base_url, state)"""
+    state = FakeOllamaState(**state_kwargs)
+    handler = type('BoundFakeOllamaHandler', (FakeOllamaHandler,), {'state': state})
+    server = ThreadingHTTPServer((host, port), handler, bind_and_activate=False)
+    # The default listen backlog of 5 resets connections under concurrent load
+    server.request_queue_size = 256
+    server.server_bind()
+    server.server_activate()
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='fake-ollama', daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}", state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--latency-ms', type=float, default=100.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--tokens', type=int, default=120)
+    parser.add_argument('--parallel', type=int, help='Concurrent requests served (default: unlimited)')
+    parser.add_argument('--load-ms', type=float, default=0.0, help='Extra latency of the first call per model')
+    args = parser.parse_args()
+    server, url, _ = start_fake_ollama(args.host, args.port, latency_ms=args.latency_ms,
+                                       jitter_ms=args.jitter_ms, tokens=args.tokens,
+                                       parallel=args.parallel, load_ms=args.load_ms)
+    print(f"Fake Ollama listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""Prompt-evaluation time of the Ollama prompt layouts.
+
+    python -m benchmarks.prompt_cache --questions 30 --output prompt_cache.json
+    python -m benchmarks.prompt_cache --ollama-url http://localhost:11434 --model llama3.2
+
+Replays the chat path's LLM calls (intent classification, then the answer with
+retrieved context) for a stream of questions, once per layout:
+
+- ``legacy``: one concatenated ``/api/generate`` prompt, with the student's
+  question in the middle of the classification instructions.
+- ``chat``: ``/api/chat`` with the stable system message (learning-level
+  prompt plus subject preamble, or the classification instructions) first and
+  everything that varies in the user message, plus ``keep_alive``.
+
+Reports Ollama's own ``prompt_eval_duration`` / ``prompt_eval_count`` per call
+kind. Without ``--ollama-url`` the fake Ollama server is used, which models
+prefix reuse across ``--cache-slots`` cached prompts per model; against a real
+server run each layout separately (``--layout``) after a restart so one does
+not warm the cache for the other.
+"""
+import argparse
+import random
+import time
+import requests
+from benchmarks.common import latency_summary, write_results
+from benchmarks.fake_ollama import start_fake_ollama
+from benchmarks.synthetic_pdf import _paragraph
+
+LAYOUTS = ('legacy', 'chat')
+LEARNING_LEVELS = ('beginner', 'intermediate', 'advanced')
+
+
+def legacy_classification_prompt(query: str, subject_name: str) -> str:
+    """Classification prompt as sent before the switch to /api/chat"""
+    return f"""
+        You are an educational assistant for the subject: "{subject_name}".
+        Your task is to classify the user's input into one of three categories:
+
+        1. SUBJECT_SPECIFIC: The user is asking a question about {subject_name} or related concepts that require course materials to answer.
+        2. GENERAL_CONVERSATION: The user is greeting you, asking how you are, or asking about your capabilities as an educational assistant.
+        3. OFF_TOPIC: The user is asking about something completely unrelated to {subject_name} or general educational support (e.g., sports, entertainment, or other unrelated subjects).
+
+        User Input: "{query}"
+
+        Instructions:
+        - Respond ONLY with the category name: SUBJECT_SPECIFIC, GENERAL_CONVERSATION, or OFF_TOPIC.
+        - Do not provide any other text.
+        """
+
+
+def build_requests(manager, layout: str, model: str, subject_name: str, level: str,
+                   query: str, context: list, keep_alive: str):
+    """(path, payload) for the classification and the answer call of one message"""
+    user_prompt = manager._build_user_prompt(context, query)
+    if layout == 'legacy':
+        system_prompt = manager._build_system_prompt(level)
+        return [
+            ('/api/generate', {'model': model, 'stream': False, 'prompt':
+                "You are a helpful assistant that classifies user intent.\n\n"
+                + legacy_classification_prompt(query, subject_name)}),
+            ('/api/generate', {'model': model, 'stream': False,
+                               'prompt': f"{system_prompt}\n\n{user_prompt}"}),
+        ]
+    system_prompt = manager._build_system_prompt(level, subject_name)
+    return [
+        ('/api/chat', {'model': model, 'stream': False, 'keep_alive': keep_alive, 'messages': [
+            {'role': 'system', 'content': manager._classification_prompt(subject_name)},
+            {'role': 'user', 'content': query}]}),
+        ('/api/chat', {'model': model, 'stream': False, 'keep_alive': keep_alive, 'messages': [
+            {'role': 'system', 'content': system_prompt},
+            {'role': 'user', 'content': user_prompt}]}),
+    ]
+
+
+def run_layout(base_url: str, layout: str, model: str, questions: int, top_k: int,
+               keep_alive: str, seed: int):
+    from app.services.llm_manager import LLMManager
+
+    manager = LLMManager()
+    rng = random.Random(seed)
+    subject_name = 'Introduction to Data Structures'
+    durations = {'classify': [], 'generate': []}
+    tokens = {'classify': 0, 'generate': 0}
+    wall_start = time.perf_counter()
+    for n in range(questions):
+        query = f"Can you explain the {rng.choice(('notation', 'mechanism', 'operation'))} in section {n}?"
+        context = [{'content': _paragraph(rng, 8)} for _ in range(top_k)]
+        level = LEARNING_LEVELS[n % len(LEARNING_LEVELS)]
+        calls = build_requests(manager, layout, model, subject_name, level, query, context, keep_alive)
+        for kind, (path, payload) in zip(('classify', 'generate'), calls):
+            response = requests.post(f"{base_url}{path}", json=payload, timeout=600)
+            response.raise_for_status()
+            result = response.json()
+            durations[kind].append(result.get('prompt_eval_duration', 0) / 1e9)
+            tokens[kind] += result.get('prompt_eval_count', 0)
+
+    total = sum(sum(d) for d in durations.values())
+    return {
+        'wall_seconds': time.perf_counter() - wall_start,
+        'prompt_eval_seconds_total': total,
+        **{f"{kind}_prompt_eval": {**latency_summary(d), 'prompt_tokens': tokens[kind]}
+           for kind, d in durations.items()},
+    }
+
+
+def run(questions: int, top_k: int, model: str, keep_alive: str, layouts, ollama_url: str = None,
+        cache_slots: int = 4, ms_per_char: float = 0.05, seed: int = 42):
+    results = {'config': {'questions': questions, 'top_k': top_k, 'model': model,
+                          'ollama': ollama_url or 'fake', 'cache_slots': cache_slots}}
+    for layout in layouts:
+        server = None
+        base_url = ollama_url
+        if not ollama_url:
+            # A fresh fake per layout, so neither starts with a warm cache
+            server, base_url, _ = start_fake_ollama(latency_ms=0, models=(model,), cache_slots=cache_slots,
+                                                    prompt_eval_ms_per_char=ms_per_char)
+        try:
+            results[layout] = run_layout(base_url, layout, model, questions, top_k, keep_alive, seed)
+        finally:
+            if server:
+                server.shutdown()
+
+    if 'legacy' in results and 'chat' in results:
+        before = results['legacy']['prompt_eval_seconds_total']
+        after = results['chat']['prompt_eval_seconds_total']
+        results['prompt_eval_reduction_pct'] = 100.0 * (before - after) / before if before else 0.0
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--questions', type=int, default=30)
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--model', default='llama3.2')
+    parser.add_argument('--keep-alive', default='30m')
+    parser.add_argument('--layout', choices=LAYOUTS, action='append',
+                        help='Layout to run (repeatable; default: both)')
+    parser.add_argument('--ollama-url', help='Real Ollama server (default: fake Ollama)')
+    parser.add_argument('--cache-slots', type=int, default=4, help='Cached prompts per model (fake only)')
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    results = run(args.questions, args.top_k, args.model, args.keep_alive, args.layout or LAYOUTS,
+                  args.ollama_url, args.cache_slots)
+    write_results('prompt_cache', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
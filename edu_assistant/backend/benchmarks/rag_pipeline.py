@@ -0,0 +1,83 @@
+"""RAG ingestion and retrieval benchmark on a synthetic PDF corpus.
+
+    python -m benchmarks.rag_pipeline --docs 10 --pages 20 --queries 200 --output rag.json
+
+Ingests every generated PDF through ``RAGService.add_document_to_collection``
+into a throwaway Chroma store, then replays the labelled questions through
+``retrieve_context``. Reports ingestion throughput, retrieval latency
+percentiles, hit rate (answer present in the retrieved chunks) and peak memory.
+"""
+import argparse
+import os
+import tempfile
+import time
+from benchmarks.common import isolated_environment, latency_summary, peak_rss_mb, write_results
+from benchmarks.synthetic_pdf import generate_corpus
+
+
+def run(docs: int, pages: int, queries: int, top_k: int, workdir: str):
+    isolated_environment(workdir)
+    from app.services.rag_service import RAGService
+
+    corpus = generate_corpus(os.path.join(workdir, 'corpus'), docs, pages)
+    rag = RAGService()
+    collection_name = rag.create_subject_collection(1)
+
+    load_start = time.perf_counter()
+    rag.embedding_model.encode("warm up")
+    model_load_seconds = time.perf_counter() - load_start
+
+    ingest_times = []
+    for document_id, path in enumerate(corpus['documents'], start=1):
+        start = time.perf_counter()
+        rag.add_document_to_collection(collection_name, path, document_id)
+        ingest_times.append(time.perf_counter() - start)
+    chunk_count = rag.client.get_collection(collection_name).count()
+
+    questions = corpus['questions']
+    latencies, hits = [], 0
+    for i in range(queries):
+        question = questions[i % len(questions)]
+        start = time.perf_counter()
+        context = rag.retrieve_context(collection_name, question['question'], top_k=top_k)
+        latencies.append(time.perf_counter() - start)
+        hits += any(question['answer'] in chunk['content'] for chunk in context)
+
+    total_ingest = sum(ingest_times)
+    return {
+        'config': {'docs': docs, 'pages_per_doc': pages, 'queries': queries, 'top_k': top_k},
+        'model_load_seconds': model_load_seconds,
+        'ingestion': {
+            'documents': len(ingest_times),
+            'chunks': chunk_count,
+            'total_seconds': total_ingest,
+            'documents_per_second': len(ingest_times) / total_ingest if total_ingest else 0.0,
+            'chunks_per_second': chunk_count / total_ingest if total_ingest else 0.0,
+            'per_document': latency_summary(ingest_times),
+        },
+        'retrieval': {
+            **latency_summary(latencies),
+            'queries_per_second': len(latencies) / sum(latencies) if latencies else 0.0,
+            'hit_rate': hits / queries if queries else 0.0,
+        },
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--docs', type=int, default=5)
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--workdir', help='Keep generated data here (default: temp dir)')
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='edu_bench_')
+    results = run(args.docs, args.pages, args.queries, args.top_k, workdir)
+    write_results('rag_pipeline', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
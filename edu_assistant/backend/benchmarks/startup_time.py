@@ -0,0 +1,91 @@
+"""Measure cold-start import cost of the API with ``python -X importtime``.
+
+    python -m benchmarks.startup_time --budget-ms 1500 --output startup.json
+
+Exits non-zero if startup exceeds ``--budget-ms`` or if any module listed in
+``--forbid`` (heavy ML / provider SDKs that must stay lazy) is imported while
+building the app, so it can be used as a regression check.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from benchmarks.common import write_results
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+STARTUP_SNIPPET = "from app import create_app; create_app()"
+HEAVY_MODULES = ('chromadb', 'sentence_transformers', 'torch', 'transformers', 'onnxruntime',
+                 'langchain_text_splitters', 'PyPDF2', 'openai', 'anthropic', 'numpy')
+
+
+def parse_importtime(stderr: str):
+    """(top-level package -> cumulative import microseconds, every module imported)"""
+    packages, modules = {}, set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        # Nested imports are indented under their parent; only top-level
+        # entries are summed so no time is counted twice
+        name = fields[2][1:]
+        modules.add(name.strip())
+        if name and not name.startswith(' '):
+            packages[name] = packages.get(name, 0) + int(fields[1])
+    return packages, modules
+
+
+def run_once(snippet: str):
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', snippet],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    return wall, parse_importtime(proc.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--budget-ms', type=float, help='Fail if median wall time exceeds this')
+    parser.add_argument('--forbid', default=','.join(HEAVY_MODULES),
+                        help='Comma-separated modules that must not be imported at startup')
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    walls, packages, modules = [], {}, set()
+    for _ in range(args.runs):
+        wall, (packages, modules) = run_once(STARTUP_SNIPPET)
+        walls.append(wall)
+    walls.sort()
+    median_ms = 1000 * walls[len(walls) // 2]
+
+    forbidden = [m for m in args.forbid.split(',') if m and m in modules]
+    top = sorted(packages.items(), key=lambda kv: kv[1], reverse=True)[:args.top]
+    results = {
+        'median_wall_ms': median_ms,
+        'min_wall_ms': 1000 * walls[0],
+        'import_total_ms': sum(packages.values()) / 1000,
+        'top_imports_ms': {name: us / 1000 for name, us in top},
+        'forbidden_imported': forbidden,
+    }
+    write_results('startup_time', results, args.output)
+
+    failed = False
+    if forbidden:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(forbidden)}")
+        failed = True
+    if args.budget_ms is not None and median_ms > args.budget_ms:
+        print(f"FAIL: startup {median_ms:.0f}ms exceeds budget {args.budget_ms:.0f}ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
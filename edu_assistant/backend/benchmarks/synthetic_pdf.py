@@ -0,0 +1,129 @@
+"""Deterministic synthetic course PDFs for benchmarks.
+
+Pages are written with a tiny hand-rolled PDF writer (Helvetica text only) so
+no PDF library is needed to produce them; PyPDF2 reads them like any other
+upload. Every page carries one unique, searchable *fact*, which gives the
+retrieval benchmarks a labelled question set for free.
+"""
+import json
+import os
+import random
+import textwrap
+from typing import Dict, List
+
+VOCABULARY = (
+    "analysis approach architecture assumption boundary calculation concept "
+    "condition constraint definition derivation design distribution element "
+    "equation estimate example experiment function hypothesis implementation "
+    "interaction interpretation iteration limit measurement mechanism method "
+    "model notation observation operation parameter pattern principle process "
+    "property relation representation result sequence signal solution "
+    "structure system technique theory transformation variable"
+).split()
+TOPICS = (
+    "Sorting Algorithms", "Graph Traversal", "Dynamic Programming", "Thermodynamics",
+    "Cell Biology", "Linear Algebra", "Probability", "Operating Systems",
+    "Computer Networks", "Organic Chemistry", "Microeconomics", "Signal Processing",
+)
+LINE_WIDTH = 90
+LINES_PER_PAGE = 48
+
+
+def _escape(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def write_pdf(path: str, pages: List[List[str]]):
+    """Write ``pages`` (each a list of text lines) as a minimal PDF"""
+    objects = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(b'')  # placeholders, filled once page ids are known
+    pages_id = add(b'')
+    font = add(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>')
+    page_ids = []
+    for lines in pages:
+        ops = ['BT', '/F1 10 Tf', '14 TL', '56 760 Td']
+        ops += [f'({_escape(line)}) Tj T*' for line in lines]
+        ops.append('ET')
+        stream = '\n'.join(ops).encode('latin-1', 'replace')
+        content = add(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        page_ids.append(add(
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] '
+            b'/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>' % (pages_id, font, content)))
+    objects[catalog - 1] = b'<< /Type /Catalog /Pages %d 0 R >>' % pages_id
+    kids = b' '.join(b'%d 0 R' % pid for pid in page_ids)
+    objects[pages_id - 1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(page_ids))
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    out += b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+        len(objects) + 1, catalog, xref)
+    with open(path, 'wb') as f:
+        f.write(out)
+
+
+def _paragraph(rng: random.Random, sentences: int) -> str:
+    out = []
+    for _ in range(sentences):
+        words = [rng.choice(VOCABULARY) for _ in range(rng.randint(8, 18))]
+        out.append(' '.join(words).capitalize() + '.')
+    return ' '.join(out)
+
+
+def generate_corpus(directory: str, num_docs: int = 5, pages_per_doc: int = 10,
+                    seed: int = 42) -> Dict:
+    """Write ``num_docs`` PDFs into ``directory``.
+
+    Returns ``{'documents': [path, ...], 'questions': [...]}`` where each
+    question names the document file and 1-based page holding its answer.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    documents, questions = [], []
+    for doc_index in range(num_docs):
+        topic = TOPICS[doc_index % len(TOPICS)]
+        file_name = f"course_{doc_index + 1:03d}.pdf"
+        pages = []
+        for page_index in range(pages_per_doc):
+            term = f"{rng.choice(VOCABULARY)} {rng.choice(VOCABULARY)} {doc_index * pages_per_doc + page_index}"
+            answer = f"{rng.randint(100, 999)}-{rng.choice(VOCABULARY)}"
+            fact = f"The reference value for the {term} is {answer}."
+            body = _paragraph(rng, rng.randint(6, 10)) + ' ' + fact + ' ' + _paragraph(rng, rng.randint(6, 10))
+            lines = [f"{topic} - Section {page_index + 1}", '']
+            lines += textwrap.wrap(body, LINE_WIDTH)[:LINES_PER_PAGE - 4]
+            lines += ['', f"{topic} | Page {page_index + 1}"]
+            pages.append(lines)
+            questions.append({
+                'question': f"What is the reference value for the {term}?",
+                'answer': answer,
+                'file_name': file_name,
+                'page_number': page_index + 1,
+            })
+        path = os.path.join(directory, file_name)
+        write_pdf(path, pages)
+        documents.append(path)
+    with open(os.path.join(directory, 'questions.json'), 'w') as f:
+        json.dump(questions, f, indent=2)
+    return {'documents': documents, 'questions': questions}
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Generate a synthetic PDF corpus')
+    parser.add_argument('directory')
+    parser.add_argument('--docs', type=int, default=5)
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    corpus = generate_corpus(args.directory, args.docs, args.pages, args.seed)
+    print(f"Wrote {len(corpus['documents'])} PDFs and {len(corpus['questions'])} questions to {args.directory}")
@@ -1,21 +1,67 @@
+import argparse
 import os
 from sentence_transformers import SentenceTransformer
 
-def download_model():
+def download_model(output_path=None):
     model_name = 'sentence-transformers/all-MiniLM-L6-v2'
-    output_path = os.path.join(os.getcwd(), 'models', 'all-MiniLM-L6-v2')
-    
+    output_path = output_path or os.path.join(os.getcwd(), 'models', 'all-MiniLM-L6-v2')
+
     if os.path.exists(output_path) and os.listdir(output_path):
         print(f"Model already exists at {output_path}")
-        return
+        return output_path
 
     print(f"Downloading model {model_name} to {output_path}...")
     os.makedirs(output_path, exist_ok=True)
-    
+
     # helper to download
     model = SentenceTransformer(model_name)
     model.save(output_path)
     print("Model downloaded successfully.")
+    return output_path
+
+def export_onnx(model_path, quantize=True):
+    """Export the transformer to ONNX (and a dynamic int8 copy) under <model_path>/onnx"""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    onnx_dir = os.path.join(model_path, 'onnx')
+    os.makedirs(onnx_dir, exist_ok=True)
+    onnx_path = os.path.join(onnx_dir, 'model.onnx')
+
+    print(f"Exporting {model_path} to {onnx_path}...")
+    model = AutoModel.from_pretrained(model_path)
+    model.eval()
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    dummy = tokenizer(["EduAssistant export sample"], return_tensors='pt')
+    input_names = ['input_ids', 'attention_mask', 'token_type_ids']
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names + ['last_hidden_state']}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(dummy[name] for name in input_names),
+            onnx_path,
+            input_names=input_names,
+            output_names=['last_hidden_state'],
+            dynamic_axes=dynamic_axes,
+            opset_version=14
+        )
+    print("ONNX export completed.")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        int8_path = os.path.join(onnx_dir, 'model_int8.onnx')
+        print(f"Quantizing to {int8_path}...")
+        quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QInt8)
+        print("Int8 quantization completed.")
 
 if __name__ == "__main__":
-    download_model()
+    parser = argparse.ArgumentParser(description="Download the embedding model")
+    parser.add_argument('--onnx', action='store_true',
+                        help="Also export ONNX + int8 models for EMBEDDING_BACKEND=onnx / onnx-int8")
+    parser.add_argument('--no-quantize', action='store_true', help="Skip the int8 export")
+    args = parser.parse_args()
+
+    path = download_model()
+    if args.onnx:
+        export_onnx(path, quantize=not args.no_quantize)
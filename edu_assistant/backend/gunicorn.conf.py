@@ -0,0 +1,47 @@
+"""Gunicorn settings for serving EduAssistant in production.
+
+The app is preloaded in the master so Python modules are shared copy-on-write
+between workers. The Chroma client and the embedding model are only opened
+inside each worker (after fork), so every worker holds exactly one copy of
+each and memory per worker stays predictable.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', max(2, multiprocessing.cpu_count() // 2)))
+# Chat requests mostly wait on the LLM, so threads keep a worker responsive
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+# Ollama generations on CPU can take minutes
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 360))
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers periodically to cap slow memory growth
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = 100
+preload_app = True
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    # Everything imported so far is shared with the workers; move it out of
+    # the garbage collector's reach so collections don't dirty those pages.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from app import db
+    from app.services.rag_service import get_rag_service
+    from app.services.warmup import start_warmup
+
+    # With preload_app this returns the app already built in the master
+    app = server.app.wsgi()
+    with app.app_context():
+        # Never share DB connections or Chroma handles across processes
+        db.engine.dispose()
+        get_rag_service().reset()
+    # Load the model and busiest collections before traffic arrives
+    start_warmup(app)
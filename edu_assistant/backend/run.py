@@ -1,6 +1,9 @@
 from app import create_app, db
 from app.models.user import User
 from app.models.llm import LLMModel
+from app.models.subject import Subject
+from app.config import Config
+import click
 import os
 
 app = create_app()
@@ -61,5 +64,52 @@ def seed_data():
         print(f"Error seeding data: {e}")
         db.session.rollback()
 
+@app.cli.command()
+@click.option('--subject-id', type=int, multiple=True, help='Subject to rebuild (repeatable; default: all)')
+@click.option('--workers', type=int, default=Config.INGEST_WORKERS, show_default=True,
+              help='Processes for PDF extraction and chunking')
+@click.option('--resume', is_flag=True, help='Continue an interrupted run from its checkpoint')
+def reindex(subject_id, workers, resume):
+    """Rebuild vector collections from uploaded documents"""
+    from app.services.reindex import reindex as reindex_subjects
+    
+    query = Subject.query.order_by(Subject.id)
+    if subject_id:
+        query = query.filter(Subject.id.in_(subject_id))
+    subject_ids = [s.id for s in query]
+    missing = set(subject_id) - set(subject_ids)
+    if missing:
+        raise click.BadParameter(f"unknown subject ids: {sorted(missing)}", param_hint='--subject-id')
+    
+    for summary in reindex_subjects(subject_ids, workers, resume):
+        print(f"Subject {summary['subject_id']}: {summary['documents']} documents, "
+              f"{summary['chunks']} chunks in {summary['seconds']}s")
+        for document_id, error in summary['failed'].items():
+            print(f"  document {document_id} skipped: {error}")
+    print("Reindex complete!")
+
+@app.cli.command('build-faqs')
+@click.option('--subject-id', type=int, multiple=True, help='Subject to build (repeatable; default: all)')
+def build_faqs(subject_id):
+    """Pre-generate answers to each subject's most frequent questions"""
+    from app.services.faq_service import build_subject_faqs
+    
+    query = Subject.query.order_by(Subject.id)
+    if subject_id:
+        query = query.filter(Subject.id.in_(subject_id))
+    failed = []
+    for subject in query:
+        try:
+            summary = build_subject_faqs(subject.id)
+        except Exception as e:
+            # One subject failing (LLM down, no active model) must not stop the others
+            db.session.rollback()
+            failed.append(subject.id)
+            print(f"Subject {subject.id}: failed: {e}")
+            continue
+        print(f"Subject {subject.id}: {summary['faqs']} FAQ answers from {summary['questions']} questions")
+    if failed:
+        raise click.ClickException(f"FAQ build failed for subjects {failed}")
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
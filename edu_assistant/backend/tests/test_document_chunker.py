@@ -0,0 +1,92 @@
+import pytest
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from app.services.document_chunker import (
+    chunk_pages, detect_boilerplate, is_heading, is_toc_page, prepare_chunks
+)
+from benchmarks.synthetic_pdf import generate_corpus
+
+BODY = ('Photosynthesis converts light energy into chemical energy stored in glucose. '
+        'It takes place in the chloroplasts of plant cells.')
+TOPICS = ['Light', 'Water', 'Carbon', 'Oxygen']
+
+
+def page(number, *lines):
+    return '\n'.join(['Biology 101 - Lecture Notes', *lines, f'Page {number} of 9'])
+
+
+@pytest.fixture
+def splitter():
+    return RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=20)
+
+
+@pytest.mark.parametrize('line, expected', [
+    ('Chapter 3 Cell Biology', True),
+    ('2.1 Membrane transport', True),
+    ('INTRODUCTION', True),
+    ('Photosynthesis converts light energy.', False),
+    ('The following terms:', False),
+    ('DNA', False),
+    ('', False),
+])
+def test_is_heading(line, expected):
+    assert is_heading(line) is expected
+
+
+def test_is_toc_page():
+    assert is_toc_page(['Table of Contents', '1 Cells ..... 3'])
+    assert is_toc_page([f'{n} Topic number {n} ..... {n * 4}' for n in range(1, 7)])
+    assert not is_toc_page(BODY.split('. '))
+    assert not is_toc_page(['', '  '])
+
+
+def test_detect_boilerplate_ignores_page_numbers():
+    pages = [page(n, f'{topic}: {BODY}').splitlines() for n, topic in enumerate(TOPICS, start=1)]
+    assert detect_boilerplate(pages) == {'biology # - lecture notes', 'page # of #'}
+    # Too few pages to tell boilerplate from content
+    assert detect_boilerplate(pages[:2]) == set()
+
+
+def test_chunk_pages_keeps_page_heading_and_offset(splitter):
+    pages = [
+        page(1, 'Contents', '1 Light reactions ..... 2', '2 Calvin cycle ..... 3'),
+        page(2, '1 Light reactions', BODY),
+        page(3, BODY.upper().lower(), '2 Calvin cycle', BODY),
+        page(4, 'short'),
+    ]
+    chunks = chunk_pages(pages, splitter)
+
+    assert [(c['page_number'], c['heading']) for c in chunks] == [
+        (2, '1 Light reactions'),
+        # A section continues onto the next page until a new heading starts
+        (3, '1 Light reactions'),
+        (3, '2 Calvin cycle'),
+    ]
+    for chunk in chunks:
+        assert 'Lecture Notes' not in chunk['text'] and 'of 9' not in chunk['text']
+        text = pages[chunk['page_number'] - 1]
+        assert text[chunk['offset']:chunk['offset'] + len(chunk['text'])] == chunk['text']
+
+
+def test_chunk_pages_respects_chunk_size(splitter):
+    pages = [page(n, f'1 {topic} reactions', ' '.join([topic] + [BODY] * 6))
+             for n, topic in enumerate(TOPICS, start=1)]
+    chunks = chunk_pages(pages, splitter)
+    assert len(chunks) > len(pages)
+    assert all(len(c['text']) <= 200 for c in chunks)
+
+
+def test_prepare_chunks_on_synthetic_pdfs(tmp_path):
+    pytest.importorskip('PyPDF2')
+    corpus = generate_corpus(str(tmp_path), num_docs=2, pages_per_doc=4)
+    for path in corpus['documents']:
+        chunks = prepare_chunks(path, chunk_size=300, chunk_overlap=30)
+        assert {c['page_number'] for c in chunks} == {1, 2, 3, 4}
+        assert not any('| Page' in c['text'] for c in chunks)
+
+    # Each question's answer sits in a chunk of the page it names
+    for question in corpus['questions']:
+        path = str(tmp_path / question['file_name'])
+        chunks = prepare_chunks(path, chunk_size=300, chunk_overlap=30)
+        pages = {c['page_number'] for c in chunks if question['answer'] in c['text']}
+        assert question['page_number'] in pages
@@ -0,0 +1,38 @@
+import numpy as np
+
+from app.utils.kmeans import kmeans, normalize
+
+
+def test_normalize():
+    vectors = normalize(np.array([[3.0, 4.0], [0.0, 0.0]]))
+    assert np.allclose(vectors[0], [0.6, 0.8])
+    # Zero vectors stay zero instead of turning into NaN
+    assert np.allclose(vectors[1], [0.0, 0.0])
+
+
+def test_kmeans_recovers_clusters():
+    rng = np.random.default_rng(1)
+    directions = np.eye(3, 16, dtype=np.float32)
+    x = np.concatenate([d + rng.normal(0, 0.05, (20, 16)) for d in directions])
+
+    centroids, labels = kmeans(x, 3)
+
+    assert centroids.shape == (3, 16)
+    assert np.allclose(np.linalg.norm(centroids, axis=1), 1.0, atol=1e-5)
+    # Every true cluster maps onto exactly one label
+    groups = [set(labels[i * 20:(i + 1) * 20]) for i in range(3)]
+    assert all(len(g) == 1 for g in groups)
+    assert len(set.union(*groups)) == 3
+
+
+def test_kmeans_is_deterministic_per_seed():
+    x = np.random.default_rng(2).normal(size=(50, 8))
+    first, second = kmeans(x, 4, seed=7), kmeans(x, 4, seed=7)
+    assert np.array_equal(first[0], second[0])
+    assert np.array_equal(first[1], second[1])
+
+
+def test_kmeans_caps_k_at_sample_count():
+    centroids, labels = kmeans(np.eye(2, 4), 5)
+    assert len(centroids) == 2
+    assert sorted(labels) == [0, 1]
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.llm_scheduler import (
+    PRIORITY_BATCH, PRIORITY_CLASSIFY, PRIORITY_INTERACTIVE, FairShareScheduler, SchedulerTimeout
+)
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('condition not reached')
+        time.sleep(0.005)
+
+
+def hold(scheduler, key, priority, granted: list, release: threading.Event):
+    def run():
+        with scheduler.slot(key, priority):
+            granted.append((key, priority))
+            release.wait(2)
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_batch_tier_limit_leaves_slots_for_interactive():
+    scheduler = FairShareScheduler(4, queue_timeout=2, tier_limits={PRIORITY_BATCH: 1})
+    granted, release = [], threading.Event()
+    threads = [hold(scheduler, f'faq:{n}', PRIORITY_BATCH, granted, release) for n in range(2)]
+    wait_until(lambda: scheduler.stats()[PRIORITY_BATCH]['waiting'] == 1)
+    assert scheduler.stats()[PRIORITY_BATCH]['running'] == 1
+
+    # The batch tier is full, the scheduler is not
+    with scheduler.slot('student', PRIORITY_INTERACTIVE):
+        assert scheduler.stats()[PRIORITY_INTERACTIVE]['running'] == 1
+
+    release.set()
+    for thread in threads:
+        thread.join(2)
+    assert len(granted) == 2
+    assert all(s['running'] == 0 and s['waiting'] == 0 for s in scheduler.stats().values())
+
+
+def test_classify_tier_times_out_before_queue_timeout():
+    scheduler = FairShareScheduler(1, queue_timeout=5, tier_timeouts={PRIORITY_CLASSIFY: 0.05})
+    with scheduler.slot('a', PRIORITY_INTERACTIVE):
+        start = time.monotonic()
+        with pytest.raises(SchedulerTimeout):
+            with scheduler.slot('b', PRIORITY_CLASSIFY):
+                pass
+        assert time.monotonic() - start < 1
+    # The abandoned waiter left no trace
+    assert scheduler.stats()[PRIORITY_CLASSIFY] == {'running': 0, 'waiting': 0, 'requesters_waiting': 0}
+
+
+def test_async_slot_times_out():
+    scheduler = FairShareScheduler(1, queue_timeout=0.05)
+
+    async def run():
+        async with scheduler.aslot('a'):
+            with pytest.raises(SchedulerTimeout):
+                async with scheduler.aslot('b'):
+                    pass
+
+    asyncio.run(run())
+    assert scheduler.stats()[PRIORITY_INTERACTIVE]['running'] == 0
+
+
+def test_higher_tier_is_served_first():
+    scheduler = FairShareScheduler(1, queue_timeout=2)
+    granted, release = [], threading.Event()
+    release.set()
+    with scheduler.slot('holder'):
+        threads = [hold(scheduler, 'faq', PRIORITY_BATCH, granted, release)]
+        wait_until(lambda: scheduler.stats()[PRIORITY_BATCH]['waiting'] == 1)
+        threads.append(hold(scheduler, 'student', PRIORITY_INTERACTIVE, granted, release))
+        wait_until(lambda: scheduler.stats()[PRIORITY_INTERACTIVE]['waiting'] == 1)
+    for thread in threads:
+        thread.join(2)
+    assert granted == [('student', PRIORITY_INTERACTIVE), ('faq', PRIORITY_BATCH)]
+
+
+def test_requesters_take_turns_within_a_tier():
+    scheduler = FairShareScheduler(1, queue_timeout=2)
+    granted, release = [], threading.Event()
+    release.set()
+    threads = []
+    with scheduler.slot('holder'):
+        # Student a queues three requests before student b queues one
+        for key in ('a', 'a', 'a', 'b'):
+            threads.append(hold(scheduler, key, PRIORITY_INTERACTIVE, granted, release))
+            wait_until(lambda n=len(threads): scheduler.stats()[PRIORITY_INTERACTIVE]['waiting'] == n)
+    for thread in threads:
+        thread.join(2)
+    assert [key for key, _ in granted] == ['a', 'b', 'a', 'a']
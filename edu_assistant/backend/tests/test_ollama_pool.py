@@ -0,0 +1,107 @@
+import asyncio
+import os
+import socket
+
+import pytest
+
+from app.services.llm_manager import LLMManager
+from app.services.ollama_pool import OllamaPool
+from benchmarks.fake_ollama import start_fake_ollama
+
+
+def dead_url():
+    """Base URL of a local port nothing listens on"""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+@pytest.fixture
+def fake_ollama():
+    servers = []
+
+    def start(**kwargs):
+        server, url, state = start_fake_ollama(latency_ms=1, **kwargs)
+        servers.append(server)
+        return url, state
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def manager(*urls):
+    llm = LLMManager()
+    llm.ollama_pool = OllamaPool(list(urls))
+    # Keep the background health checker out of the way: the tests drive host state
+    llm.ollama_pool._checker_pid = os.getpid()
+    return llm
+
+
+def host(llm, url):
+    return next(h for h in llm.ollama_pool.stats() if h['url'] == url)
+
+
+def chat_requests(state):
+    return state.requests.get('/api/chat', 0)
+
+
+def test_unreachable_host_is_marked_down_and_skipped(fake_ollama):
+    down = dead_url()
+    url, state = fake_ollama()
+    llm = manager(down, url)
+
+    result = llm._call_ollama('llama3.2', 'You are a tutor.', 'Explain osmosis.')
+
+    assert result['content'].startswith('Here is an explanation')
+    assert not host(llm, down)['healthy']
+    assert host(llm, url)['healthy'] and host(llm, url)['models'] == ['llama3.2']
+    assert chat_requests(state) == 1
+
+    llm._call_ollama('llama3.2', 'You are a tutor.', 'Explain diffusion.')
+    assert chat_requests(state) == 2
+    assert all(h['outstanding'] == 0 for h in llm.ollama_pool.stats())
+
+
+def test_async_call_fails_over(fake_ollama):
+    down = dead_url()
+    url, state = fake_ollama()
+    llm = manager(down, url)
+
+    result = asyncio.run(llm._acall_ollama('llama3.2', 'You are a tutor.', 'Explain osmosis.'))
+
+    assert result['content'].startswith('Here is an explanation')
+    assert not host(llm, down)['healthy']
+    assert chat_requests(state) == 1
+
+
+def test_missing_model_fails_over_without_marking_host_down(fake_ollama):
+    other_url, other_state = fake_ollama(models=('mistral',))
+    url, state = fake_ollama(models=('llama3.2',))
+    llm = manager(other_url, url)
+
+    result = llm._call_ollama('llama3.2', 'You are a tutor.', 'Explain osmosis.')
+
+    assert result['content'].startswith('Here is an explanation')
+    assert (chat_requests(other_state), chat_requests(state)) == (1, 1)
+    assert host(llm, other_url)['healthy']
+
+    # The host known to have the model loaded is now preferred
+    llm._call_ollama('llama3.2', 'You are a tutor.', 'Explain diffusion.')
+    assert (chat_requests(other_state), chat_requests(state)) == (1, 2)
+
+
+def test_model_missing_everywhere_returns_the_error(fake_ollama):
+    url, _ = fake_ollama(models=('mistral',))
+    llm = manager(url)
+    result = llm._call_ollama('llama3.2', 'You are a tutor.', 'Explain osmosis.')
+    assert result['content'].startswith('Ollama Error:')
+
+
+def test_all_hosts_unreachable_raises():
+    llm = manager(dead_url(), dead_url())
+    with pytest.raises(ConnectionError):
+        llm._call_ollama('llama3.2', 'You are a tutor.', 'Explain osmosis.')
+    assert not any(h['healthy'] for h in llm.ollama_pool.stats())
@@ -0,0 +1,58 @@
+import os
+import time
+import uuid
+
+import pytest
+
+from app.utils.rate_limit import MemoryRateLimitStore, RedisRateLimitStore, parse_limit
+
+
+def test_parse_limit():
+    assert parse_limit('10/minute') == (10, 10 / 60)
+    assert parse_limit('5/seconds') == (5, 5.0)
+    assert parse_limit('100/hour') == (100, 100 / 3600)
+
+
+def check_bucket(store, key):
+    # Burst of 2, then one token every 10 seconds
+    assert store.take(key, 2, 0.1) == (True, 0.0)
+    assert store.take(key, 2, 0.1) == (True, 0.0)
+    allowed, retry_after = store.take(key, 2, 0.1)
+    assert not allowed
+    assert 9 < retry_after <= 10
+    # Buckets are per key
+    assert store.take(f'{key}:other', 2, 0.1)[0]
+
+
+def check_refill(store, key):
+    assert store.take(key, 1, 20)[0]
+    assert not store.take(key, 1, 20)[0]
+    time.sleep(0.1)
+    assert store.take(key, 1, 20)[0]
+
+
+def test_memory_store_limits_bursts():
+    check_bucket(MemoryRateLimitStore(), 'chat:1')
+
+
+def test_memory_store_refills():
+    check_refill(MemoryRateLimitStore(), 'chat:1')
+
+
+@pytest.fixture
+def redis_store():
+    redis = pytest.importorskip('redis')
+    url = os.getenv('REDIS_URL', 'redis://localhost:6379/15')
+    try:
+        redis.Redis.from_url(url).ping()
+    except redis.exceptions.ConnectionError:
+        pytest.skip(f'no Redis server at {url}')
+    return RedisRateLimitStore(url)
+
+
+def test_redis_store_limits_bursts(redis_store):
+    check_bucket(redis_store, f'test:{uuid.uuid4().hex}')
+
+
+def test_redis_store_refills(redis_store):
+    check_refill(redis_store, f'test:{uuid.uuid4().hex}')
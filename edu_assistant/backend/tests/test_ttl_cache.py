@@ -0,0 +1,38 @@
+import time
+
+from app.utils.ttl_cache import TTLCache
+
+
+def test_entries_expire():
+    cache = TTLCache(0.05)
+    cache.put('a', 1)
+    assert cache.get('a') == 1
+    time.sleep(0.1)
+    assert cache.get('a') is None
+    assert cache.get('a', 'missing') == 'missing'
+
+
+def test_get_or_load_caches_values_but_not_none():
+    cache, calls = TTLCache(60), []
+
+    def load(value):
+        def loader():
+            calls.append(value)
+            return value
+        return loader
+
+    assert cache.get_or_load('a', load(1)) == 1
+    assert cache.get_or_load('a', load(2)) == 1
+    assert cache.get_or_load('b', load(None)) is None
+    assert cache.get_or_load('b', load(3)) == 3
+    assert calls == [1, None, 3]
+
+
+def test_invalidate_and_clear():
+    cache = TTLCache(60)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.invalidate('a')
+    assert (cache.get('a'), cache.get('b')) == (None, 2)
+    cache.clear()
+    assert cache.get('b') is None
@@ -0,0 +1,128 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+from app.config import Config
+from app.services import upload_sessions
+from app.services.upload_sessions import UploadError
+
+DATA = bytes(range(256)) * 40  # 10240 bytes: parts of 4096, 4096 and 2048
+
+
+@pytest.fixture(autouse=True)
+def upload_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setattr(Config, 'UPLOAD_PART_SIZE', 4096)
+    return tmp_path
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def parts(data=DATA, size=4096):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def new_session(sha=None):
+    return upload_sessions.create_session(1, 7, 'notes.pdf', len(DATA), sha)
+
+
+def upload_all(manifest, data=DATA):
+    for number, part in enumerate(parts(data), start=1):
+        upload_sessions.write_part(manifest, number, io.BytesIO(part), sha256(part))
+
+
+def test_create_session_splits_into_parts():
+    manifest = new_session()
+    assert manifest['total_parts'] == 3
+    assert upload_sessions.expected_part_size(manifest, 3) == 2048
+    assert upload_sessions.load_session(manifest['upload_id'], 7) == manifest
+    with pytest.raises(UploadError) as e:
+        upload_sessions.load_session(manifest['upload_id'], 8)
+    assert e.value.status == 403
+
+
+def test_write_part_rejects_checksum_mismatch():
+    manifest = new_session()
+    with pytest.raises(UploadError) as e:
+        upload_sessions.write_part(manifest, 1, io.BytesIO(parts()[0]), sha256(b'other'))
+    assert e.value.status == 422
+    assert upload_sessions.session_status(manifest)['received_parts'] == []
+
+
+def test_write_part_rejects_wrong_size():
+    manifest = new_session()
+    with pytest.raises(UploadError) as e:
+        upload_sessions.write_part(manifest, 1, io.BytesIO(DATA), None)
+    assert e.value.status == 400
+    with pytest.raises(UploadError):
+        upload_sessions.write_part(manifest, 4, io.BytesIO(b''), None)
+
+
+def test_assemble_out_of_order_parts(upload_folder):
+    manifest = new_session(sha256(DATA))
+    for number in (3, 1, 2):
+        part = parts()[number - 1]
+        upload_sessions.write_part(manifest, number, io.BytesIO(part), sha256(part))
+    status = upload_sessions.session_status(manifest)
+    assert status['missing_parts'] == [] and status['bytes_received'] == len(DATA)
+
+    target = upload_folder / 'subject_1' / 'notes.pdf'
+    upload_sessions.assemble(manifest, str(target))
+    assert target.read_bytes() == DATA
+
+
+def test_assemble_reports_missing_parts(upload_folder):
+    manifest = new_session()
+    upload_sessions.write_part(manifest, 2, io.BytesIO(parts()[1]), None)
+    with pytest.raises(UploadError) as e:
+        upload_sessions.assemble(manifest, str(upload_folder / 'notes.pdf'))
+    assert e.value.status == 409
+    assert 'Missing parts: [1, 3]' in str(e.value)
+
+
+def test_assemble_verifies_whole_file_checksum(upload_folder):
+    manifest = new_session(sha256(b'something else'))
+    upload_all(manifest)
+    target = upload_folder / 'notes.pdf'
+    with pytest.raises(UploadError) as e:
+        upload_sessions.assemble(manifest, str(target))
+    assert e.value.status == 422
+    assert not target.exists()
+    # No temporary file is left behind either
+    session_dir = upload_folder / upload_sessions.INCOMING_DIR / manifest['upload_id']
+    assert not [name for name in os.listdir(session_dir) if name.endswith('.tmp')]
+
+
+def test_completing_is_exclusive():
+    manifest = new_session()
+    with upload_sessions.completing(manifest):
+        with pytest.raises(UploadError) as e:
+            with upload_sessions.completing(manifest):
+                pass
+        assert e.value.status == 409
+    # Released afterwards
+    with upload_sessions.completing(manifest):
+        pass
+
+
+def test_completing_takes_over_stale_lock(upload_folder):
+    manifest = new_session()
+    lock_path = upload_folder / upload_sessions.INCOMING_DIR / manifest['upload_id'] / upload_sessions.COMPLETE_LOCK
+    lock_path.touch()
+    stale = os.path.getmtime(lock_path) - upload_sessions.COMPLETE_LOCK_STALE - 1
+    os.utime(lock_path, (stale, stale))
+    with upload_sessions.completing(manifest):
+        assert lock_path.exists()
+    assert not lock_path.exists()
+
+
+def test_expired_sessions_are_purged(monkeypatch):
+    manifest = new_session()
+    monkeypatch.setattr(Config, 'UPLOAD_SESSION_TTL', -1)
+    with pytest.raises(UploadError) as e:
+        upload_sessions.load_session(manifest['upload_id'], 7)
+    assert e.value.status == 404
@@ -0,0 +1,9 @@
+"""Production entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+`run.py` keeps the Flask development server and the CLI commands.
+"""
+from app import create_app
+
+app = create_app()